@@ -1,37 +1,70 @@
 from flask import Flask, render_template, request, redirect, url_for, flash, send_file, session, jsonify
 import os
-import json
 import uuid
+import shutil
+import tempfile
 from werkzeug.utils import secure_filename
-from dotenv import load_dotenv
 from datetime import timedelta, datetime
 from resume_parser import extract_text_from_pdf
 from email_agent import generate_job_application_email
 from resume_matcher import find_best_resume
-from utils import extract_email, save_to_excel, create_gmail_url, get_tracker_path, get_resumes_dir
-from outlook_sender import send_smtp_email, send_email_via_local_outlook, LOCAL_OUTLOOK_AVAILABLE
-from github_export import get_cached_projects, save_projects_cache, generate_pdf_report, generate_word_report, get_github_data_dir
-
-load_dotenv()
+from utils import save_application, create_gmail_url, load_env
+from jd_analyzer import get_analysis, jd_hash, condense, summary as jd_summary, ranking_query, pick_resume_locally
+import near_duplicates
+from outlook_sender import send_email_via_local_outlook, LOCAL_OUTLOOK_AVAILABLE
+import outbox
+import user_store
+import working_set
+from report_queue import submit_reports, request_report
+from session_store import SQLiteSessionInterface
+import tracing
+import metrics
+import static_assets
+from tracing import span
+from github_export import load_projects_cache, get_cached_projects, get_cached_index, get_cached_features, save_projects_cache
+
+load_env()
 
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', 'job-email-sender-secret-key-2024')
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=365)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB
+# Session data lives server-side; the cookie only carries a signed session id
+app.session_interface = SQLiteSessionInterface()
+# Per-stage timings as JSON logs / Server-Timing (TRACING_ENABLED=1)
+tracing.init_app(app)
+# Request latency histograms and the Prometheus /metrics endpoint
+metrics.init_app(app)
+# Fingerprinted, precompressed static files with immutable caching (asset_url() in templates)
+static_assets.init_app(app)
 
 # ─── Session Management ─────────────────────────────────────────────
 
 @app.before_request
 def ensure_user_id():
+    if request.endpoint in ('assets', 'static', 'metrics'):
+        return
     session.permanent = True
     ls_user_id = request.args.get('sync_user_id')
     if ls_user_id and len(ls_user_id) == 36:
         session['user_id'] = ls_user_id
     elif 'user_id' not in session:
         session['user_id'] = str(uuid.uuid4())
+        # Not stored until the visitor writes something (see keep_new_session)
+        session.provisional = session.new
+
+
+@app.after_request
+def keep_new_session(response):
+    """A generated user id is kept (session stored, cookie set) once the user has data under it."""
+    if getattr(session, 'provisional', False) and user_store.has_store(session.get('user_id')):
+        session.provisional = False
+    return response
 
 @app.route('/api/get_user_id')
 def get_user_id():
+    # The page stores this id in localStorage, so keep it
+    session.provisional = False
     return jsonify({'user_id': session.get('user_id', '')})
 
 @app.route('/api/set_user_id', methods=['POST'])
@@ -48,30 +81,84 @@ def set_user_id():
 
 def _get_app_stats(user_id):
     """Returns dict with total_applications, today_applications, this_week counts."""
-    import pandas as pd
-    path = get_tracker_path(user_id)
-    stats = {'total_applications': 0, 'today_applications': 0, 'this_week': 0}
-    if os.path.exists(path):
-        try:
-            df = pd.read_excel(path)
-            if not df.empty:
-                stats['total_applications'] = len(df)
-                today = datetime.now().date()
-                week_ago = today - timedelta(days=7)
-                for _, row in df.iterrows():
-                    try:
-                        date_str = str(row.get('Date Applied', ''))
-                        if date_str:
-                            applied_date = pd.to_datetime(date_str).date()
-                            if applied_date == today:
-                                stats['today_applications'] += 1
-                            if applied_date >= week_ago:
-                                stats['this_week'] += 1
-                    except Exception:
-                        pass
-        except Exception as e:
-            print(f"Error reading tracker: {e}")
-    return stats
+    try:
+        return user_store.application_stats(user_id)
+    except Exception as e:
+        print(f"Error reading tracker: {e}")
+        return {'total_applications': 0, 'today_applications': 0, 'this_week': 0}
+
+
+def _duplicate_notice(duplicate):
+    """What the generate page tells the user about a posting they've seen before."""
+    if not duplicate:
+        return None
+    return {
+        "similarity": round(duplicate["similarity"] * 100),
+        "seen_on": datetime.fromtimestamp(duplicate["seen_at"]).strftime("%Y-%m-%d"),
+        "applied_at": duplicate["applied_at"],
+        "status": duplicate["status"],
+        "reused": False,
+    }
+
+
+def _previous_application(user_id, recipient, job_title, company):
+    """The latest application already sent (or queued) to this recipient for this role, or None."""
+    try:
+        found = user_store.find_applications(user_id, recipient, job_title, company)
+    except Exception as e:
+        print(f"Error checking previous applications: {e}")
+        return None
+    if not found:
+        return None
+    return {"date": str(found[0]["Date Applied"])[:10], "status": found[0]["Status"],
+            "recipient": found[0]["Email Address"].strip().lower()}
+
+
+def _email_data(user_id, draft, analysis, job_description, posting, notice, github_error=None):
+    """What the generate page shows (and /send reads) for a draft, new or reused."""
+    email_data = dict(draft, recruiter_emails=analysis["emails"], github_error=github_error,
+                      posting=posting, duplicate=notice, job_description=job_description)
+    email_data['previous_application'] = _previous_application(
+        user_id, draft['recruiter_email'], draft['job_title'], draft['company'])
+    return email_data
+
+
+def _resume_texts(user_id):
+    """
+    {name: text} of the user's resumes that have text (None if there are no
+    resumes), extracting any not read yet. Kept in the user's working set.
+    """
+    def load():
+        local_resumes = user_store.get_resume_texts(user_id)
+        if not local_resumes:
+            return None
+        texts = {}
+        for name, entry in local_resumes.items():
+            if entry['has_text'] is not None:
+                metrics.CACHE_REQUESTS.inc(cache="resume_text", result="hit")
+                if entry['text']:
+                    texts[name] = entry['text']
+                continue
+
+            metrics.CACHE_REQUESTS.inc(cache="resume_text", result="miss")
+            try:
+                with open(user_store.blob_path(user_id, entry['sha256']), "rb") as f:
+                    text = extract_text_from_pdf(f.read())
+                user_store.set_resume_text(user_id, name, entry['sha256'], text)
+                if text:
+                    texts[name] = text
+            except Exception as e:
+                print(f"Error reading {name}: {e}")
+        return texts
+
+    return working_set.get(user_id, "resume_texts", load)
+
+
+def _prewarm(user_id):
+    """Load the user's resume texts and project features in the background before they generate."""
+    # Never create a store for visitors without one (first visits, crawlers, health probes)
+    if user_store.has_store(user_id):
+        working_set.prewarm(user_id, (_resume_texts, get_cached_features))
 
 
 # ─── Routes ──────────────────────────────────────────────────────────
@@ -80,9 +167,15 @@ def _get_app_stats(user_id):
 def index():
     """Home page: JD input + stats."""
     user_id = session.get('user_id')
-    user_resumes_dir = get_resumes_dir(user_id)
-    local_resumes = [f for f in os.listdir(user_resumes_dir) if f.lower().endswith('.pdf')]
-    stats = _get_app_stats(user_id)
+    if session.new and not user_store.has_store(user_id):
+        # A visitor without data yet: don't create a store just to show zeros
+        local_resumes = {}
+        stats = {'total_applications': 0, 'today_applications': 0, 'this_week': 0}
+    else:
+        local_resumes = user_store.list_resumes(user_id)
+        stats = _get_app_stats(user_id)
+        if local_resumes and not session.new:
+            _prewarm(user_id)
     return render_template('index.html',
                            resume_count=len(local_resumes),
                            has_resume=len(local_resumes) > 0,
@@ -93,118 +186,118 @@ def index():
 def generate():
     """Process JD, match resumes, scrape GitHub, generate email → preview."""
     user_id = session.get('user_id')
-    user_resumes_dir = get_resumes_dir(user_id)
     job_description = request.form.get('job_description')
 
     if not job_description:
         flash('Please enter a Job Description.')
         return redirect(url_for('index'))
 
-    # --- Resume Processing with Caching ---
-    user_resumes_dir = get_resumes_dir(user_id)
-    local_resumes = [f for f in os.listdir(user_resumes_dir) if f.lower().endswith('.pdf')]
-    
-    if not local_resumes:
+    # --- Resume texts: extracted once per uploaded version, kept warm in memory ---
+    with span("cache.load_resume_texts") as s:
+        resume_texts = _resume_texts(user_id)
+        s.set(resumes=len(resume_texts) if resume_texts is not None else 0)
+
+    if resume_texts is None:
         flash('No resumes found. Please upload one in your Profile.')
         return redirect(url_for('profile'))
 
-    # Load cache
-    cache_path = os.path.join(get_github_data_dir(user_id), "resume_cache.json")
-    resume_cache = {}
-    if os.path.exists(cache_path):
-        try:
-            with open(cache_path, "r", encoding="utf-8") as f:
-                resume_cache = json.load(f)
-        except Exception:
-            pass
-
-    resume_texts = {}
-    cache_updated = False
-
-    for name in local_resumes:
-        path = os.path.join(user_resumes_dir, name)
-        mtime = os.path.getmtime(path)
-        
-        # Check cache
-        if name in resume_cache and resume_cache[name].get('mtime') == mtime:
-            resume_texts[name] = resume_cache[name].get('text')
-        else:
-            # Re-extract
-            try:
-                with open(path, "rb") as f:
-                    text = extract_text_from_pdf(f.read())
-                    if text:
-                        resume_texts[name] = text
-                        resume_cache[name] = {'text': text, 'mtime': mtime}
-                        cache_updated = True
-            except Exception as e:
-                print(f"Error reading {name}: {e}")
-
-    # Save cache if updated
-    if cache_updated:
-        try:
-            with open(cache_path, "w", encoding="utf-8") as f:
-                json.dump(resume_cache, f, ensure_ascii=False)
-        except Exception as e:
-            print(f"Error saving resume cache: {e}")
-
     if not resume_texts:
         flash("Could not extract text from any resume.")
         return redirect(url_for('profile'))
 
-    # Best resume matching
+    # Local JD analysis (cached by JD hash): recruiter emails, title, company, skills.
+    # Prompts get the condensed JD plus these details instead of the raw paste.
+    analysis = get_analysis(user_id, job_description)
+    job_details = jd_summary(analysis)
+    prompt_jd = condense(job_description)
+
+    # A posting seen before (pasted again, or reposted with small edits) reuses its draft:
+    # no LLM calls, same resume and projects. "Generate a new draft" posts regenerate=1.
+    github_profile = session.get('github_profile')
+    posting = jd_hash(job_description)
+    jd_signature = near_duplicates.signature(job_description)
+    duplicate = near_duplicates.find(user_id, jd_signature)
+    notice = _duplicate_notice(duplicate)
+    draft = duplicate and duplicate["draft"]
+    if (draft and not request.form.get('regenerate') and draft.get("resume_name") in resume_texts
+            and draft.get("github_profile") == github_profile):
+        # A repost may name the recipient, role, company or location differently: this posting's
+        # values win, and the old draft only fills what the local analysis did not find
+        draft = dict(
+            draft,
+            recruiter_email=analysis["emails"][0] if analysis["emails"] else draft.get("recruiter_email", ""),
+            job_title=analysis["title"] or draft.get("job_title") or "Job Application",
+            company=analysis["company"] or draft.get("company") or "",
+            location=analysis["location"] or draft.get("location") or "",
+        )
+        near_duplicates.remember(user_id, posting, jd_signature, draft)
+        email_data = _email_data(user_id, draft, analysis, job_description, posting, dict(notice, reused=True))
+        session['email_data'] = email_data
+        return render_template('generate.html', data=email_data, local_outlook=LOCAL_OUTLOOK_AVAILABLE)
+
+    # Best resume matching: a clear winner on skill coverage skips the LLM call
     final_resume_name = next(iter(resume_texts))
     final_resume_text = resume_texts[final_resume_name]
     if len(resume_texts) > 1:
-        match_result = find_best_resume(job_description, resume_texts)
-        best = match_result.get("best_resume_filename")
+        best = pick_resume_locally(analysis, resume_texts)
+        if best is None:
+            match_result = find_best_resume("\n\n".join(filter(None, [job_details, prompt_jd])), resume_texts)
+            best = match_result.get("best_resume_filename")
         if best and best in resume_texts:
             final_resume_name = best
             final_resume_text = resume_texts[best]
 
     # GitHub projects: strictly use cached/summarized data
-    github_profile = session.get('github_profile')
     github_projects = []
     github_error = None
-    all_github_projects = []  # full list for context
     if github_profile:
-        # Only use pre-synced cached data
-        cached, cached_at, cached_url = get_cached_projects(user_id)
-        if cached and cached_url == github_profile:
-            all_github_projects = cached
-            # Rank top 3 relevant for this JD based on summaries
-            from github_project_agent import get_github_projects
+        query = ranking_query(analysis, job_description)
+        # Only use pre-synced cached data; prefer the precomputed feature arrays
+        # so the projects cache is not re-parsed on every generate
+        features = get_cached_features(user_id)
+        if features and features.doc_count and features.profile_url == github_profile:
             try:
-                # We pass 'cached' directly so it doesn't scrape
-                github_projects = get_github_projects(github_profile, job_description, top_n=3, cached_data=cached)
+                with span("github.rank_features", projects=features.doc_count):
+                    github_projects = features.top_projects(query, top_n=3)
             except Exception as e:
                 github_error = str(e)
         else:
-            github_error = "GitHub projects not synced. Please go to your Profile and click 'Sync Projects'."
+            cached, cached_at, cached_url = get_cached_projects(user_id)
+            if cached and cached_url == github_profile:
+                # Rank top 3 relevant for this JD based on summaries
+                from github_project_agent import get_github_projects
+                try:
+                    # We pass 'cached' directly so it doesn't scrape
+                    github_projects = get_github_projects(github_profile, query, top_n=3,
+                                                          cached_data=cached, index=get_cached_index(user_id))
+                except Exception as e:
+                    github_error = str(e)
+            else:
+                github_error = "GitHub projects not synced. Please go to your Profile and click 'Sync Projects'."
 
     # Generate email
-    recruiter_email = extract_email(job_description)
-    email_content = generate_job_application_email(job_description, final_resume_text, github_projects=github_projects)
-
-    # Store in session (keep projects minimal to avoid cookie overflow)
-    session_projects = [
-        {"name": p.get("name", ""), "url": p.get("url", ""), "description": p.get("description", "")}
-        for p in (github_projects or [])
-    ]
-    session['email_data'] = {
-        "recruiter_email": recruiter_email or "",
+    email_content = generate_job_application_email(prompt_jd, final_resume_text, github_projects=github_projects,
+                                                   job_details=job_details)
+
+    draft = {
+        "recruiter_email": analysis["emails"][0] if analysis["emails"] else "",
         "subject": email_content.get("subject", ""),
         "body": email_content.get("body", ""),
         "resume_name": final_resume_name,
-        "job_title": email_content.get("job_title", "Job Application"),
-        "github_projects": session_projects,
-        "github_error": github_error
+        # The LLM reads the whole JD; the local guesses are the fallback when it failed
+        "job_title": email_content.get("job_title") or analysis["title"] or "Job Application",
+        "company": email_content.get("company_name") or analysis["company"] or "",
+        "location": analysis["location"] or "",
+        "github_projects": github_projects or [],
+        "github_profile": github_profile,
     }
+    # Indexed even when generation failed, so a repost is still recognized; only good drafts are reused
+    near_duplicates.remember(user_id, posting, jd_signature, None if email_content.get("error") else draft)
 
-    # Pass full projects (with summaries) to template directly, not via session
-    display_data = dict(session['email_data'])
-    display_data['github_projects'] = github_projects or []
-    return render_template('generate.html', data=display_data, local_outlook=LOCAL_OUTLOOK_AVAILABLE)
+    # Store the full draft server-side (the session cookie only holds an id)
+    email_data = _email_data(user_id, draft, analysis, job_description, posting, notice, github_error)
+    session['email_data'] = email_data
+    return render_template('generate.html', data=email_data, local_outlook=LOCAL_OUTLOOK_AVAILABLE)
 
 
 @app.route('/send', methods=['POST'])
@@ -215,7 +308,6 @@ def send():
         return redirect(url_for('index'))
 
     user_id = session.get('user_id')
-    user_resumes_dir = get_resumes_dir(user_id)
 
     recipient = request.form.get('recipient')
     subject = request.form.get('subject')
@@ -229,14 +321,34 @@ def send():
     data['recruiter_email'] = recipient
     data['subject'] = subject
     data['body'] = body
+
+    # Already applied to this recipient for this role: the first send is refused and the
+    # page re-rendered with a confirm_duplicate token; only the next send with it goes ahead
+    previous = _previous_application(user_id, recipient, data.get('job_title'), data.get('company'))
+    data['previous_application'] = previous
+    confirmed = request.form.get('confirm_duplicate', '').strip().lower()
+    if previous and confirmed != previous['recipient']:
+        data['confirm_duplicate'] = previous['recipient']
+        session['email_data'] = data
+        return render_template('generate.html', data=data, local_outlook=LOCAL_OUTLOOK_AVAILABLE)
+    data.pop('confirm_duplicate', None)
     session['email_data'] = data
 
-    resume_path = os.path.join(user_resumes_dir, data['resume_name'])
+    # Content-addressed blob: a queued email keeps the resume version it was written with
+    resume_path = user_store.get_resume_path(user_id, data['resume_name'])
 
     if method == 'desktop' and LOCAL_OUTLOOK_AVAILABLE:
-        success, msg = send_email_via_local_outlook(recipient, subject, body, resume_path)
+        # Outlook names the attachment after the file, so attach a copy with the resume's name
+        with tempfile.TemporaryDirectory() as tmp:
+            attachment = None
+            if resume_path:
+                attachment = os.path.join(tmp, data['resume_name'])
+                shutil.copyfile(resume_path, attachment)
+            success, msg = send_email_via_local_outlook(recipient, subject, body, attachment)
         if success:
-            save_to_excel(data.get('job_title', 'Job Application'), recipient, user_id=user_id)
+            row_id = save_application(data.get('job_title', 'Job Application'), recipient, user_id=user_id,
+                                      company=data.get('company'))
+            near_duplicates.mark_applied(user_id, data.get('posting'), application_id=row_id or None)
             flash(f"✅ Sent via Outlook Desktop! {msg}")
             return redirect(url_for('index'))
         else:
@@ -245,32 +357,45 @@ def send():
     elif method == 'smtp':
         if not email_user or not email_pass:
             flash("❌ Credentials missing for SMTP sending.")
+        elif not resume_path or not os.path.exists(resume_path):
+            flash(f"❌ Resume {data['resume_name']} no longer exists. Please generate again.")
         else:
-            with open(resume_path, "rb") as f:
-                resume_bytes = f.read()
-
+            # Queue for background delivery; the outbox worker sends, retries and updates the tracker
             safe_service = service if service else "outlook"
-            success, msg = send_smtp_email(
-                recipient, subject, body,
-                resume_bytes, data['resume_name'],
-                email_user, email_pass, safe_service
+            job_id = outbox.enqueue(
+                user_id, recipient, subject, body,
+                resume_path, data['resume_name'], data.get('job_title', 'Job Application'),
+                safe_service, email_user, email_pass, company=data.get('company')
             )
-            if success:
-                save_to_excel(data.get('job_title', 'Job Application'), recipient, user_id=user_id)
-                flash(f"✅ Sent successfully via {safe_service.title()}!")
-                return redirect(url_for('index'))
+            if job_id is None:
+                flash("❌ Could not record the application in your tracker, so it was not sent. Please try again.")
             else:
-                flash(f"❌ Failed to send via {safe_service.title()}: {msg}")
+                near_duplicates.mark_applied(user_id, data.get('posting'), outbox_id=job_id)
+                flash(f"📤 Queued for delivery via {safe_service.title()}. Status updates appear below.")
+                return redirect(url_for('index'))
 
     # On failure or unexpected method, re-render generate page
     return render_template('generate.html', data=data, local_outlook=LOCAL_OUTLOOK_AVAILABLE)
 
 
+@app.route('/api/outbox')
+def outbox_status():
+    """Delivery status of the user's recent emails (queued, sending, sent, failed)."""
+    return jsonify({'jobs': outbox.list_jobs(session.get('user_id'))})
+
+
+@app.route('/api/outbox/<int:job_id>')
+def outbox_job_status(job_id):
+    job = outbox.get_job(session.get('user_id'), job_id)
+    if not job:
+        return jsonify({'error': 'not found'}), 404
+    return jsonify(job)
+
+
 @app.route('/profile', methods=['GET', 'POST'])
 def profile():
     """Profile management: resumes, GitHub, credentials."""
     user_id = session.get('user_id')
-    user_resumes_dir = get_resumes_dir(user_id)
 
     if request.method == 'POST':
         action = request.form.get('action')
@@ -285,7 +410,7 @@ def profile():
                 if file and file.filename and file.filename.lower().endswith('.pdf'):
                     filename = secure_filename(file.filename)
                     if filename:
-                        file.save(os.path.join(user_resumes_dir, filename))
+                        user_store.save_resume(user_id, filename, file.stream)
                         count += 1
             flash(f'✅ {count} resume{"s" if count != 1 else ""} uploaded successfully.')
             return redirect(request.url)
@@ -298,7 +423,9 @@ def profile():
             flash('✅ GitHub settings saved.')
             return redirect(request.url)
 
-    local_resumes = [f for f in os.listdir(user_resumes_dir) if f.lower().endswith('.pdf')]
+    local_resumes = list(user_store.list_resumes(user_id))
+    if local_resumes:
+        _prewarm(user_id)
     # Load cached GitHub data
     cached_projects, cached_at, cached_url = get_cached_projects(user_id)
     return render_template('profile.html',
@@ -314,9 +441,7 @@ def profile():
 def delete_resume(filename):
     try:
         user_id = session.get('user_id')
-        path = os.path.join(get_resumes_dir(user_id), secure_filename(filename))
-        if os.path.exists(path):
-            os.remove(path)
+        if user_store.delete_resume(user_id, secure_filename(filename)):
             flash(f"🗑️ Deleted {filename}")
     except Exception as e:
         flash(f"❌ Error deleting: {e}")
@@ -335,29 +460,56 @@ def sync_github():
         return redirect(url_for('profile'))
 
     try:
-        from github_scraper import extract_username, fetch_repos, filter_repo_details, fetch_readme, summarize_readme
-        if github_token:
-            os.environ['GITHUB_TOKEN'] = github_token
+        from github_scraper import extract_username, sync_projects
+        from github_client import GitHubClient
+        # Per-request client: the user's token never goes into the process-wide environment
+        client = GitHubClient(token=github_token or os.environ.get('GITHUB_TOKEN'))
         username = extract_username(github_profile)
-        repos = fetch_repos(username)
-        filtered = filter_repo_details(repos)
-        for repo in filtered:
-            readme = fetch_readme(username, repo.get('name'))
-            # Generate a 100-150 word summary instead of storing the full raw text
-            summary = summarize_readme(repo.get('name'), readme, repo.get('description'), repo.get('language'))
-            repo['summary'] = summary
-        
-        save_projects_cache(user_id, filtered, github_profile)
-        # Generate PDF and Word reports using the summaries
-        generate_pdf_report(user_id, filtered, github_profile)
-        generate_word_report(user_id, filtered, github_profile)
-        flash(f'✅ Synced & Summarized {len(filtered)} projects! Reports updated.')
+
+        # Resume from the previous sync: unchanged repos keep their summaries,
+        # repos left incomplete by a rate limit are fetched again
+        previous = load_projects_cache(user_id) or {}
+        if previous.get("profile_url") != github_profile:
+            previous = {}
+        with span("github.sync", username=username) as s:
+            result = sync_projects(username, previous.get("projects"), previous.get("incomplete"), client=client)
+            s.set(projects=len(result["projects"]), requests=result["requests"],
+                  incomplete=len(result["incomplete"]))
+        filtered = result["projects"]
+        incomplete = result["incomplete"]
+
+        save_projects_cache(user_id, filtered, github_profile, incomplete=incomplete)
+        # Render PDF and Word reports in the background; downloads wait for them if needed
+        submit_reports(user_id, filtered, github_profile)
+        if incomplete and result["resume_at"]:
+            resume_at = datetime.fromtimestamp(result["resume_at"]).strftime('%H:%M')
+            flash(f'⚠️ GitHub rate limit reached: synced {len(filtered) - len(incomplete)} of {len(filtered)} projects. '
+                  f'Sync again after {resume_at} to finish the remaining {len(incomplete)}.')
+        elif incomplete:
+            flash(f'⚠️ Synced {len(filtered)} projects, but {len(incomplete)} READMEs could not be fetched. '
+                  f'They will be retried on the next sync.')
+        else:
+            flash(f'✅ Synced & Summarized {len(filtered)} projects! Reports are being updated.')
     except Exception as e:
         flash(f'❌ Sync failed: {e}')
 
     return redirect(url_for('profile'))
 
 
+def _send_report(source, fingerprint, download_name):
+    """
+    Send a report (cached path or freshly rendered buffer) with ETag/Last-Modified
+    so repeat downloads can be answered with 304.
+    """
+    last_modified = os.path.getmtime(source) if isinstance(source, str) else datetime.now()
+    response = send_file(source, as_attachment=True, download_name=download_name,
+                         etag=f"{fingerprint[:32]}-{os.path.splitext(download_name)[1].lstrip('.')}",
+                         last_modified=last_modified,
+                         conditional=True, max_age=0)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
 @app.route('/download_github_pdf')
 def download_github_pdf():
     user_id = session.get('user_id')
@@ -365,8 +517,8 @@ def download_github_pdf():
     if not cached:
         flash('❌ No cached GitHub data. Scrape first.')
         return redirect(url_for('profile'))
-    path = generate_pdf_report(user_id, cached, cached_url or '')
-    return send_file(path, as_attachment=True, download_name='GitHub_Projects_Portfolio.pdf')
+    source, fingerprint = request_report(user_id, 'pdf', cached, cached_url or '')
+    return _send_report(source, fingerprint, 'GitHub_Projects_Portfolio.pdf')
 
 
 @app.route('/download_github_word')
@@ -376,42 +528,29 @@ def download_github_word():
     if not cached:
         flash('❌ No cached GitHub data. Scrape first.')
         return redirect(url_for('profile'))
-    path = generate_word_report(user_id, cached, cached_url or '')
-    return send_file(path, as_attachment=True, download_name='GitHub_Projects_Portfolio.docx')
+    source, fingerprint = request_report(user_id, 'docx', cached, cached_url or '')
+    return _send_report(source, fingerprint, 'GitHub_Projects_Portfolio.docx')
 
 
 @app.route('/tracker')
 def tracker():
     """Application history with stats and data table."""
-    import pandas as pd
     user_id = session.get('user_id')
-    path = get_tracker_path(user_id)
-
-    data = []
-    has_data = False
     stats = _get_app_stats(user_id)
-
-    if os.path.exists(path):
-        try:
-            df = pd.read_excel(path)
-            if not df.empty:
-                has_data = True
-                data = df.to_dict('records')
-        except Exception as e:
-            print(f"Error reading tracker: {e}")
+    data = user_store.list_applications(user_id) if stats['total_applications'] else []
 
     return render_template('tracker.html',
                            data=data,
-                           has_data=has_data,
+                           has_data=bool(data),
                            **stats)
 
 
 @app.route('/download_tracker')
 def download_tracker():
     user_id = session.get('user_id')
-    path = get_tracker_path(user_id)
-    if os.path.exists(path):
-        return send_file(path, as_attachment=True, download_name="job_application_tracker.xlsx")
+    if _get_app_stats(user_id)['total_applications']:
+        return send_file(user_store.export_applications(user_id), as_attachment=True,
+                         download_name="job_application_tracker.xlsx")
     flash("No tracker file found.")
     return redirect(url_for('index'))
 
@@ -0,0 +1,82 @@
+"""
+Cache Codec Module
+Handles: encoding cached values (synced projects, ranking index, report
+pointers) for the user store in a compact binary format.
+
+An encoded value is a two-byte header followed by the payload:
+    byte 0   FORMAT_VERSION
+    byte 1   codec: b"J" compact JSON, b"O" orjson, b"Z" orjson + zstd
+orjson is used when installed, and large values are zstd-compressed when
+the `zstandard` package is installed. Values stored as text (caches written
+before this format, or the old .json cache files) are read as plain JSON,
+so existing data keeps working and is re-encoded on its next save.
+"""
+import json
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    orjson = None
+    HAS_ORJSON = False
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    zstandard = None
+    HAS_ZSTD = False
+
+FORMAT_VERSION = 1
+JSON, ORJSON, ORJSON_ZSTD = b"J", b"O", b"Z"
+# Payloads smaller than this are stored uncompressed
+ZSTD_MIN_SIZE = 4096
+ZSTD_LEVEL = 3
+
+
+def _default_codec():
+    return ORJSON if HAS_ORJSON else JSON
+
+
+def encode(value, codec=None):
+    """Encode a JSON-compatible value as bytes (header + payload)."""
+    codec = codec or _default_codec()
+    if codec == JSON or not HAS_ORJSON:
+        codec = JSON
+        payload = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    else:
+        try:
+            # Non-string keys are converted like json.dumps does
+            payload = orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        except TypeError:
+            # Outside orjson's range (e.g. integers over 64 bits)
+            return encode(value, JSON)
+        if codec == ORJSON_ZSTD or (HAS_ZSTD and len(payload) >= ZSTD_MIN_SIZE):
+            if HAS_ZSTD:
+                payload = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(payload)
+                codec = ORJSON_ZSTD
+            else:
+                codec = ORJSON
+    return bytes((FORMAT_VERSION,)) + codec + payload
+
+
+def decode(data):
+    """Decode bytes from `encode`, or a plain JSON string/bytes. Raises ValueError if unreadable."""
+    if isinstance(data, str):
+        return json.loads(data)
+    data = bytes(data)
+    if not data or data[0] != FORMAT_VERSION:
+        return json.loads(data)
+    codec, payload = data[1:2], data[2:]
+    if codec == JSON:
+        return json.loads(payload)
+    if codec == ORJSON_ZSTD:
+        if not HAS_ZSTD:
+            raise ValueError("zstd-compressed cache value but zstandard is not installed")
+        try:
+            payload = zstandard.ZstdDecompressor().decompress(payload)
+        except zstandard.ZstdError as e:
+            raise ValueError(f"Corrupt cache value: {e}")
+    elif codec != ORJSON:
+        raise ValueError(f"Unknown cache codec {codec!r}")
+    return orjson.loads(payload) if HAS_ORJSON else json.loads(payload)
@@ -1,16 +1,18 @@
 import os
 import json
-from groq import Groq
-from dotenv import load_dotenv
 
-load_dotenv()
+from utils import load_env, get_groq_client
+from tracing import span, token_usage
+from metrics import record_llm_call
 
-# client initialized lazily inside function to avoid startup crashes if env var is missing
+# groq and the client are loaded lazily inside the function to keep start-up fast
+# and avoid startup crashes if the env var is missing
 
-def generate_job_application_email(job_description: str, resume_text: str, github_projects=None):
+def generate_job_application_email(job_description: str, resume_text: str, github_projects=None, job_details=None):
     """
     Generates a professional job application email using Groq AI.
     Deeply analyzes JD + Resume + GitHub projects to create a tailored email.
+    `job_details` is the locally extracted title/company/skills summary (see jd_analyzer).
     """
 
     system_prompt = """
@@ -106,6 +108,9 @@ def generate_job_application_email(job_description: str, resume_text: str, githu
     ===== JOB DESCRIPTION =====
     {job_description}
 
+    ===== KEY DETAILS EXTRACTED FROM THE JD =====
+    {job_details or 'None extracted — read them from the job description.'}
+
     ===== CANDIDATE'S RESUME (SOURCE OF TRUTH — only use facts from here) =====
     {resume_text}
 
@@ -132,23 +137,32 @@ def generate_job_application_email(job_description: str, resume_text: str, githu
     """
 
     try:
+        load_env()
         api_key = os.getenv("GROQ_API_KEY")
         if not api_key:
             return {
                 "subject": "Configuration Error",
-                "body": "GROQ_API_KEY environment variable is missing. Please add it to your Azure Configuration."
+                "body": "GROQ_API_KEY environment variable is missing. Please add it to your Azure Configuration.",
+                "error": True
             }
 
-        client = Groq(api_key=api_key)
-
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            response_format={ "type": "json_object" }
-        )
+        client = get_groq_client()
+
+        with span("llm.generate_email", model="llama-3.3-70b-versatile", prompt_chars=len(user_prompt)) as s:
+            try:
+                response = client.chat.completions.create(
+                    model="llama-3.3-70b-versatile",
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    response_format={ "type": "json_object" }
+                )
+            except Exception:
+                record_llm_call("llama-3.3-70b-versatile", "generate_email", error=True)
+                raise
+            record_llm_call("llama-3.3-70b-versatile", "generate_email", response)
+            s.set(**token_usage(response))
 
         content = response.choices[0].message.content
         # Remove potential markdown code blocks
@@ -163,5 +177,6 @@ def generate_job_application_email(job_description: str, resume_text: str, githu
         print(f"Error generating email: {e}")
         return {
             "subject": "Error generating email",
-            "body": f"An error occurred while generating the email. Please check your logs or try again.\nError: {e}"
+            "body": f"An error occurred while generating the email. Please check your logs or try again.\nError: {e}",
+            "error": True
         }
@@ -0,0 +1,142 @@
+"""
+GitHub API Client Module
+Handles: rate-limit-aware requests to the GitHub REST and GraphQL APIs.
+
+Every response's X-RateLimit-Remaining / X-RateLimit-Reset headers are
+recorded per token (anonymous requests share one budget per IP). When the
+budget runs low the client spaces requests out until the reset; when it is
+exhausted it waits for the reset if that is within `max_wait` seconds and
+otherwise raises RateLimitExceeded so a long sync can stop cleanly and be
+resumed later instead of silently degrading.
+"""
+import os
+import time
+import hashlib
+import threading
+
+import requests
+
+from metrics import GITHUB_REQUESTS, GITHUB_RATE_REMAINING
+
+# Start pacing once fewer than this many requests are left in the window
+PACE_THRESHOLD = 10
+# Never sleep longer than this between two paced requests
+MAX_PACE_DELAY = 5.0
+
+_limits = {}
+_limits_lock = threading.Lock()
+
+
+class GitHubAPIError(Exception):
+    """A GitHub API call failed for a reason other than rate limiting."""
+
+    def __init__(self, status_code, message):
+        super().__init__(f"GitHub API error: {status_code} - {message}")
+        self.status_code = status_code
+
+
+class RateLimitExceeded(GitHubAPIError):
+    """The rate limit is exhausted and the reset is too far away to wait for."""
+
+    def __init__(self, reset_at):
+        self.reset_at = reset_at
+        when = time.strftime("%H:%M:%S", time.localtime(reset_at)) if reset_at else "later"
+        super().__init__(403, f"rate limit exceeded, resets at {when}")
+
+
+class GitHubClient:
+    """Thin requests wrapper that tracks and respects GitHub's rate limit."""
+
+    def __init__(self, token=None, max_wait=None, session=None, pace_threshold=PACE_THRESHOLD):
+        self.token = token
+        self.pace_threshold = pace_threshold
+        if max_wait is None:
+            max_wait = float(os.environ.get("GITHUB_RATE_LIMIT_MAX_WAIT", "60"))
+        self.max_wait = max_wait
+        self.session = session or requests.Session()
+        self.request_count = 0
+        self._label = "authenticated" if token else "anonymous"
+        key = hashlib.sha256(token.encode()).hexdigest()[:16] if token else "anonymous"
+        with _limits_lock:
+            self._limit = _limits.setdefault(key, {"remaining": None, "reset": 0.0})
+
+    @classmethod
+    def from_env(cls):
+        return cls(token=os.environ.get("GITHUB_TOKEN"))
+
+    @property
+    def remaining(self):
+        return self._limit["remaining"]
+
+    @property
+    def reset_at(self):
+        return self._limit["reset"]
+
+    def _wait_for_budget(self):
+        """Sleep before a request if the known budget is exhausted or running low."""
+        remaining, reset = self._limit["remaining"], self._limit["reset"]
+        if remaining is None:
+            return
+        now = time.time()
+        if reset <= now:
+            self._limit["remaining"] = None
+            return
+        if remaining <= 0:
+            wait = reset - now + 1
+            if wait > self.max_wait:
+                raise RateLimitExceeded(reset)
+            print(f"GitHub rate limit reached, pausing {wait:.0f}s until reset.")
+            time.sleep(wait)
+            self._limit["remaining"] = None
+        elif remaining < self.pace_threshold:
+            time.sleep(min((reset - now) / remaining, MAX_PACE_DELAY))
+
+    def _record_limits(self, response):
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is not None:
+            try:
+                self._limit["remaining"] = int(remaining)
+                self._limit["reset"] = float(reset) if reset else 0.0
+                GITHUB_RATE_REMAINING.set(self._limit["remaining"], client=self._label)
+            except ValueError:
+                pass
+
+    def _is_rate_limited(self, response):
+        if response.status_code == 429:
+            return True
+        return response.status_code == 403 and (
+            response.headers.get("X-RateLimit-Remaining") == "0"
+            or "rate limit" in response.text.lower()
+        )
+
+    def request(self, method, url, headers=None, **kwargs):
+        """Send a request, pausing for the rate limit. Returns the response for non-rate-limit statuses."""
+        headers = dict(headers or {})
+        if self.token and "Authorization" not in headers:
+            headers["Authorization"] = f"token {self.token}"
+
+        while True:
+            self._wait_for_budget()
+            response = self.session.request(method, url, headers=headers, **kwargs)
+            self.request_count += 1
+            GITHUB_REQUESTS.inc(status=response.status_code)
+            self._record_limits(response)
+            if not self._is_rate_limited(response):
+                return response
+
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                self._limit["remaining"] = 0
+                self._limit["reset"] = time.time() + int(retry_after)
+            elif self._limit["remaining"] != 0 or self._limit["reset"] <= time.time():
+                # Limited without usable headers: assume a one-minute secondary limit
+                self._limit["remaining"] = 0
+                self._limit["reset"] = time.time() + 60
+            # Loop: _wait_for_budget either sleeps until reset or raises
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
@@ -1,103 +1,208 @@
 """
 GitHub Data Export Module
-Handles: caching scraped data as JSON, generating PDF and Word reports.
+Handles: caching scraped data in the user's store, generating PDF and Word
+reports, and reusing report files while the projects they were built from
+are unchanged.
 """
+import io
 import os
 import json
+import time
+import shutil
+import hashlib
+import functools
+import tempfile
 from datetime import datetime
 
+import user_store
+import working_set
+from tracing import span
+
+# Rendered reports stay in memory up to this size, then spill to a temp file
+REPORT_SPOOL_THRESHOLD = int(os.getenv("REPORT_SPOOL_THRESHOLD", str(8 * 1024 * 1024)))
+
 
 def get_github_data_dir(user_id=None):
-    """Returns the directory for storing GitHub data per user."""
-    if os.name == 'posix' and os.getenv('WEBSITE_SITE_NAME'):
-        base = "/home/data/github_cache"
-    else:
-        base = "github_cache"
+    """Returns the user's data directory (see user_store); ranking features live here."""
+    return user_store.user_dir(user_id)
 
-    if user_id:
-        base = os.path.join(base, user_id)
 
-    os.makedirs(base, exist_ok=True)
-    return base
+def load_projects_cache(user_id):
+    """Load the raw projects cache dict (shared via working_set: don't modify it). Returns dict or None."""
+    try:
+        with span("cache.load_projects") as s:
+            data = working_set.get(user_id, "projects", lambda: user_store.get_cache(user_id, "projects"))
+            if data is not None:
+                s.set(projects=len(data.get("projects") or []))
+        return data
+    except Exception as e:
+        print(f"Error loading projects cache: {e}")
+        return None
 
 
 def get_cached_projects(user_id):
-    """Load cached GitHub projects from JSON. Returns list or None."""
-    data_dir = get_github_data_dir(user_id)
-    cache_path = os.path.join(data_dir, "projects.json")
-    if os.path.exists(cache_path):
-        try:
-            with open(cache_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            return data.get("projects", []), data.get("scraped_at", ""), data.get("profile_url", "")
-        except Exception:
-            pass
+    """Load cached GitHub projects. Returns list or None."""
+    data = load_projects_cache(user_id)
+    if data is not None:
+        return data.get("projects", []), data.get("scraped_at", ""), data.get("profile_url", "")
     return None, None, None
 
 
-def save_projects_cache(user_id, projects, profile_url):
-    """Save scraped GitHub projects to JSON cache."""
-    data_dir = get_github_data_dir(user_id)
-    cache_path = os.path.join(data_dir, "projects.json")
+def save_projects_cache(user_id, projects, profile_url, incomplete=None, scraped_at=None):
+    """Save scraped GitHub projects, their ranking index and feature arrays.
+
+    `incomplete` lists repos whose README could not be fetched (e.g. rate
+    limited); the next sync re-fetches them instead of trusting their summary.
+    """
+    scraped_at = scraped_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     data = {
         "profile_url": profile_url,
-        "scraped_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "scraped_at": scraped_at,
         "project_count": len(projects),
+        "incomplete": incomplete or [],
         "projects": projects
     }
-    with open(cache_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    return cache_path
-
-
-def generate_word_report(user_id, projects, profile_url):
-    """Generate a Word (.docx) report of GitHub projects."""
+    user_store.set_cache(user_id, "projects", data)
+    save_project_index(user_id, projects)
+    save_features(user_id, projects, profile_url, scraped_at)
+    return data
+
+
+def save_project_index(user_id, projects):
+    """Build the BM25 ranking index for the projects and store it next to the projects cache."""
+    from project_index import build_index
+    try:
+        user_store.set_cache(user_id, "projects_index", build_index(projects))
+    except Exception as e:
+        print(f"Error saving project index: {e}")
+
+
+def get_cached_index(user_id):
+    """Load the project ranking index built at sync time. Returns dict or None."""
+    try:
+        return working_set.get(user_id, "projects_index", lambda: user_store.get_cache(user_id, "projects_index"))
+    except Exception:
+        return None
+
+
+def save_features(user_id, projects, profile_url, scraped_at=""):
+    """
+    Write the feature arrays into a new `features-<version>` directory, point
+    the store at it, and remove older versions (open memory maps stay valid).
+    """
+    try:
+        from project_features import save_project_features, FEATURES_DIRNAME
+        data_dir = get_github_data_dir(user_id)
+        version = projects_fingerprint(projects, profile_url)[:16]
+        dirname = f"{FEATURES_DIRNAME}-{version}"
+        # meta.json is written last, so an existing one means this version is complete (and may be mapped)
+        if not os.path.exists(os.path.join(data_dir, dirname, "meta.json")):
+            if save_project_features(data_dir, projects, profile_url, scraped_at, dirname=dirname) is None:
+                return None
+        user_store.set_cache(user_id, "features", {"dirname": dirname})
+        for old in os.listdir(data_dir):
+            if old.startswith(f"{FEATURES_DIRNAME}-") and old != dirname:
+                shutil.rmtree(os.path.join(data_dir, old), ignore_errors=True)
+        return dirname
+    except Exception as e:
+        print(f"Error saving project features: {e}")
+        return None
+
+
+def get_cached_features(user_id):
+    """Memory-mapped feature arrays built at sync time (kept loaded per process). Returns ProjectFeatures or None."""
+    from project_features import load_project_features
+
+    def load():
+        pointer = user_store.get_cache(user_id, "features")
+        if not pointer:
+            return None
+        return load_project_features(get_github_data_dir(user_id), dirname=pointer["dirname"])
+    return working_set.get(user_id, "features", load)
+
+
+def new_report_buffer():
+    """In-memory buffer for a rendered report that spills to disk past REPORT_SPOOL_THRESHOLD bytes."""
+    return tempfile.SpooledTemporaryFile(max_size=REPORT_SPOOL_THRESHOLD, mode="w+b")
+
+
+@functools.lru_cache(maxsize=1)
+def _word_template():
+    """
+    Bytes of a pre-styled .docx built once per process. Colours, sizes and
+    alignment live in named styles, so reports only add text with a style name.
+    """
     from docx import Document
-    from docx.shared import Inches, Pt, RGBColor
+    from docx.shared import Pt, RGBColor
+    from docx.enum.style import WD_STYLE_TYPE
     from docx.enum.text import WD_ALIGN_PARAGRAPH
 
     doc = Document()
+    styles = doc.styles
+
+    styles['Title'].font.color.rgb = RGBColor(124, 58, 237)
+    styles['Title'].paragraph_format.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    styles['Heading 2'].font.color.rgb = RGBColor(6, 182, 212)
+
+    def add_style(name, size, color, center=False, space_after=None):
+        style = styles.add_style(name, WD_STYLE_TYPE.PARAGRAPH)
+        style.base_style = styles['Normal']
+        style.font.size = Pt(size)
+        if color:
+            style.font.color.rgb = RGBColor(*color)
+        if center:
+            style.paragraph_format.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        if space_after is not None:
+            style.paragraph_format.space_after = Pt(space_after)
+
+    add_style('Portfolio Profile', 11, (100, 116, 139), center=True)
+    add_style('Portfolio Date', 10, (148, 163, 184), center=True)
+    add_style('Project URL', 10, (100, 116, 139))
+    add_style('Project Summary', 10, None, space_after=4)
+    add_style('Portfolio Footer', 9, (148, 163, 184), center=True)
+
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def generate_word_report(user_id, projects, profile_url, output=None):
+    """Generate a Word (.docx) report of GitHub projects.
+
+    Writes into `output` (a binary file object) when given and returns it;
+    otherwise stores it as a blob in the user's store and returns the path.
+    """
+    from docx import Document
 
-    # Title
-    title = doc.add_heading('GitHub Projects Portfolio', level=0)
-    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    for run in title.runs:
-        run.font.color.rgb = RGBColor(124, 58, 237)
-
-    # Profile Info
-    p = doc.add_paragraph()
-    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    run = p.add_run(f"Profile: {profile_url}")
-    run.font.size = Pt(11)
-    run.font.color.rgb = RGBColor(100, 116, 139)
-
-    p2 = doc.add_paragraph()
-    p2.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    run2 = p2.add_run(f"Generated: {datetime.now().strftime('%B %d, %Y')}")
-    run2.font.size = Pt(10)
-    run2.font.color.rgb = RGBColor(148, 163, 184)
-
-    doc.add_paragraph()  # Spacer
+    doc = Document(io.BytesIO(_word_template()))
+    # Resolve style IDs once and write them straight onto each paragraph:
+    # python-docx's `style=` setter rescans every style in the document per call
+    styles = {name: doc.styles[name].style_id for name in (
+        'Title', 'Heading 2', 'Heading 3', 'Portfolio Profile', 'Portfolio Date',
+        'Project URL', 'Project Summary', 'Portfolio Footer')}
+
+    def add(text='', style=None):
+        paragraph = doc.add_paragraph(text)
+        if style:
+            paragraph._p.style = style
+        return paragraph
+
+    # Title and profile info
+    add('GitHub Projects Portfolio', style=styles['Title'])
+    add(f"Profile: {profile_url}", style=styles['Portfolio Profile'])
+    add(f"Generated: {datetime.now().strftime('%B %d, %Y')}", style=styles['Portfolio Date'])
+    add()  # Spacer
 
     # Projects
     for i, proj in enumerate(projects, 1):
         name = proj.get("name", "Untitled")
         url = proj.get("url", "")
-        summary = proj.get("summary", "No summary available.")
-
-        # Project heading
-        heading = doc.add_heading(f"{i}. {name}", level=2)
-        for run in heading.runs:
-            run.font.color.rgb = RGBColor(6, 182, 212)
+        summary = proj.get("summary") or ""
 
-        # URL
-        p_url = doc.add_paragraph()
-        run_url = p_url.add_run(f"🔗 {url}")
-        run_url.font.size = Pt(10)
-        run_url.font.color.rgb = RGBColor(100, 116, 139)
+        add(f"{i}. {name}", style=styles['Heading 2'])
+        add(f"🔗 {url}", style=styles['Project URL'])
+        add('Repository Summary', style=styles['Heading 3'])
 
-        # Summary content
-        doc.add_heading('Repository Summary', level=3)
         # Truncate long summaries just in case
         summary_text = summary[:3000] if summary else "No summary available."
         if len(summary) > 3000:
@@ -106,96 +211,97 @@ def generate_word_report(user_id, projects, profile_url):
         for line in summary_text.split('\n'):
             line = line.strip()
             if line:
-                p = doc.add_paragraph(line)
-                p.paragraph_format.space_after = Pt(4)
-                for run in p.runs:
-                    run.font.size = Pt(10)
+                add(line, style=styles['Project Summary'])
 
-        doc.add_paragraph()  # Spacer between projects
+        add()  # Spacer between projects
 
-    # Footer
-    footer_p = doc.add_paragraph()
-    footer_p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    footer_run = footer_p.add_run("Generated by JobFlow AI")
-    footer_run.font.size = Pt(9)
-    footer_run.font.color.rgb = RGBColor(148, 163, 184)
+    add("Generated by JobFlow AI", style=styles['Portfolio Footer'])
 
     # Save
-    data_dir = get_github_data_dir(user_id)
-    file_path = os.path.join(data_dir, "GitHub_Projects_Portfolio.docx")
-    doc.save(file_path)
-    return file_path
-
-
-def generate_pdf_report(user_id, projects, profile_url):
-    """Generate a PDF report of GitHub projects."""
-    from reportlab.lib.pagesizes import A4
-    from reportlab.lib.units import mm
+    if output is not None:
+        doc.save(output)
+        return output
+    buffer = new_report_buffer()
+    doc.save(buffer)
+    with buffer:
+        sha256, _ = user_store.put_blob(user_id, buffer)
+    return user_store.blob_path(user_id, sha256)
+
+
+@functools.lru_cache(maxsize=1)
+def _pdf_styles():
+    """ReportLab paragraph styles, built once per process."""
     from reportlab.lib.colors import HexColor
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
     from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
     from reportlab.lib.enums import TA_CENTER
 
-    data_dir = get_github_data_dir(user_id)
-    file_path = os.path.join(data_dir, "GitHub_Projects_Portfolio.pdf")
-
-    doc = SimpleDocTemplate(file_path, pagesize=A4,
-                            topMargin=25 * mm, bottomMargin=20 * mm,
-                            leftMargin=20 * mm, rightMargin=20 * mm)
-
     styles = getSampleStyleSheet()
+    return {
+        "title": ParagraphStyle('CustomTitle', parent=styles['Title'],
+                                textColor=HexColor('#7c3aed'),
+                                fontSize=22, spaceAfter=10,
+                                alignment=TA_CENTER),
+        "subtitle": ParagraphStyle('Subtitle', parent=styles['Normal'],
+                                   textColor=HexColor('#64748b'),
+                                   fontSize=10, alignment=TA_CENTER,
+                                   spaceAfter=6),
+        "project_title": ParagraphStyle('ProjectTitle', parent=styles['Heading2'],
+                                        textColor=HexColor('#06b6d4'),
+                                        fontSize=14, spaceBefore=16,
+                                        spaceAfter=4),
+        "url": ParagraphStyle('URL', parent=styles['Normal'],
+                              textColor=HexColor('#64748b'),
+                              fontSize=9, spaceAfter=8),
+        "body": ParagraphStyle('Body', parent=styles['Normal'],
+                               fontSize=10, leading=14,
+                               textColor=HexColor('#334155'),
+                               spaceAfter=4),
+        "readme_heading": ParagraphStyle('ReadmeH', parent=styles['Heading3'],
+                                         textColor=HexColor('#475569'),
+                                         fontSize=11, spaceBefore=6, spaceAfter=4),
+        "footer": ParagraphStyle('Footer', parent=styles['Normal'],
+                                 textColor=HexColor('#94a3b8'),
+                                 fontSize=8, alignment=TA_CENTER,
+                                 spaceBefore=30),
+    }
 
-    # Custom styles
-    title_style = ParagraphStyle('CustomTitle', parent=styles['Title'],
-                                 textColor=HexColor('#7c3aed'),
-                                 fontSize=22, spaceAfter=10,
-                                 alignment=TA_CENTER)
-
-    subtitle_style = ParagraphStyle('Subtitle', parent=styles['Normal'],
-                                    textColor=HexColor('#64748b'),
-                                    fontSize=10, alignment=TA_CENTER,
-                                    spaceAfter=6)
 
-    project_title_style = ParagraphStyle('ProjectTitle', parent=styles['Heading2'],
-                                         textColor=HexColor('#06b6d4'),
-                                         fontSize=14, spaceBefore=16,
-                                         spaceAfter=4)
+def generate_pdf_report(user_id, projects, profile_url, output=None):
+    """Generate a PDF report of GitHub projects.
 
-    url_style = ParagraphStyle('URL', parent=styles['Normal'],
-                               textColor=HexColor('#64748b'),
-                               fontSize=9, spaceAfter=8)
+    Writes into `output` (a binary file object) when given and returns it;
+    otherwise stores it as a blob in the user's store and returns the path.
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
 
-    body_style = ParagraphStyle('Body', parent=styles['Normal'],
-                                fontSize=10, leading=14,
-                                textColor=HexColor('#334155'),
-                                spaceAfter=4)
+    target = output if output is not None else new_report_buffer()
 
-    readme_heading_style = ParagraphStyle('ReadmeH', parent=styles['Heading3'],
-                                          textColor=HexColor('#475569'),
-                                          fontSize=11, spaceBefore=6, spaceAfter=4)
+    doc = SimpleDocTemplate(target, pagesize=A4,
+                            topMargin=25 * mm, bottomMargin=20 * mm,
+                            leftMargin=20 * mm, rightMargin=20 * mm)
 
-    footer_style = ParagraphStyle('Footer', parent=styles['Normal'],
-                                  textColor=HexColor('#94a3b8'),
-                                  fontSize=8, alignment=TA_CENTER,
-                                  spaceBefore=30)
+    styles = _pdf_styles()
+    body_style = styles["body"]
 
     elements = []
 
     # Title
-    elements.append(Paragraph("GitHub Projects Portfolio", title_style))
-    elements.append(Paragraph(f"Profile: {profile_url}", subtitle_style))
-    elements.append(Paragraph(f"Generated: {datetime.now().strftime('%B %d, %Y')}", subtitle_style))
+    elements.append(Paragraph("GitHub Projects Portfolio", styles["title"]))
+    elements.append(Paragraph(f"Profile: {profile_url}", styles["subtitle"]))
+    elements.append(Paragraph(f"Generated: {datetime.now().strftime('%B %d, %Y')}", styles["subtitle"]))
     elements.append(Spacer(1, 15))
 
     # Projects
     for i, proj in enumerate(projects, 1):
         name = proj.get("name", "Untitled")
         url = proj.get("url", "")
-        summary = proj.get("summary", "No summary available.")
+        summary = proj.get("summary") or ""
 
-        elements.append(Paragraph(f"{i}. {name}", project_title_style))
-        elements.append(Paragraph(f"🔗 {url}", url_style))
-        elements.append(Paragraph("Repository Summary", readme_heading_style))
+        elements.append(Paragraph(f"{i}. {name}", styles["project_title"]))
+        elements.append(Paragraph(f"🔗 {url}", styles["url"]))
+        elements.append(Paragraph("Repository Summary", styles["readme_heading"]))
 
         # Truncate and clean summary
         summary_text = summary[:2000] if summary else "No summary available."
@@ -215,7 +321,88 @@ def generate_pdf_report(user_id, projects, profile_url):
 
         elements.append(Spacer(1, 12))
 
-    elements.append(Paragraph("Generated by JobFlow AI", footer_style))
+    elements.append(Paragraph("Generated by JobFlow AI", styles["footer"]))
 
     doc.build(elements)
-    return file_path
+    if output is not None:
+        return output
+    with target:
+        sha256, _ = user_store.put_blob(user_id, target)
+    return user_store.blob_path(user_id, sha256)
+
+
+# Bump when the report layout changes so cached files are rebuilt
+REPORT_VERSION = 1
+# Render runs kept in reports.json for timing/size history
+REPORT_RUN_HISTORY = 20
+
+REPORT_FORMATS = {
+    "pdf": generate_pdf_report,
+    "docx": generate_word_report,
+}
+
+
+def projects_fingerprint(projects, profile_url):
+    """Stable hash of the projects and profile URL a report is built from."""
+    payload = json.dumps({"v": REPORT_VERSION, "profile_url": profile_url or "", "projects": projects or []},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def find_report(user_id, fmt, fingerprint):
+    """Path of the cached `fmt` report if it was built from `fingerprint`, else None."""
+    return user_store.find_report(user_id, fmt, fingerprint)
+
+
+def render_report_buffer(user_id, fmt, projects, profile_url):
+    """Build one report into a spooled buffer. Returns (buffer, render_seconds, size_bytes)."""
+    start = time.perf_counter()
+    buffer = REPORT_FORMATS[fmt](user_id, projects, profile_url, output=new_report_buffer())
+    render_seconds = time.perf_counter() - start
+    size_bytes = buffer.seek(0, os.SEEK_END)
+    buffer.seek(0)
+    return buffer, render_seconds, size_bytes
+
+
+def persist_report(user_id, buffer):
+    """
+    Store a rendered report as a content-addressed blob. The buffer is
+    rewound afterwards, so it can still be streamed to the client.
+    """
+    sha256, _ = user_store.put_blob(user_id, buffer)
+    return user_store.blob_path(user_id, sha256)
+
+
+def render_report(user_id, fmt, projects, profile_url):
+    """Build and persist one report. Returns (path, render_seconds, size_bytes)."""
+    buffer, render_seconds, size_bytes = render_report_buffer(user_id, fmt, projects, profile_url)
+    with buffer:
+        path = persist_report(user_id, buffer)
+    return path, render_seconds, size_bytes
+
+
+def record_report(user_id, fmt, fingerprint, path, render_seconds, size_bytes):
+    """Point the user's `fmt` report at a finished render, keeping a short per-run history."""
+    built_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(f"Rendered {fmt} report for {user_id}: {round(render_seconds, 3)}s, {size_bytes} bytes")
+    try:
+        user_store.record_report(user_id, fmt, fingerprint, os.path.basename(path), built_at,
+                                 round(render_seconds, 3), size_bytes, history=REPORT_RUN_HISTORY)
+    except Exception as e:
+        print(f"Error recording report: {e}")
+
+
+def get_report(user_id, fmt, projects, profile_url):
+    """
+    Returns (path, fingerprint) of the `fmt` ('pdf' or 'docx') report.
+    The existing file is reused when its recorded fingerprint matches;
+    otherwise the report is rebuilt inline and the manifest updated.
+    """
+    fingerprint = projects_fingerprint(projects, profile_url)
+    path = find_report(user_id, fmt, fingerprint)
+    if path:
+        return path, fingerprint
+
+    path, render_seconds, size_bytes = render_report(user_id, fmt, projects, profile_url)
+    record_report(user_id, fmt, fingerprint, path, render_seconds, size_bytes)
+    return path, fingerprint
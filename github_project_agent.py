@@ -1,42 +1,37 @@
-import os
-import json
-def get_github_projects(profile_url, job_description=None, top_n=3, cached_data=None):
+from project_index import build_index, index_matches, top_k
+from tracing import traced
+
+
+@traced("github.rank_projects")
+def get_github_projects(profile_url, job_description=None, top_n=3, cached_data=None, index=None):
     """
     Ranks pre-fetched GitHub projects based on the Job Description.
-    This function NO LONGER scrapes GitHub at runtime. It relies on the 
+    This function NO LONGER scrapes GitHub at runtime. It relies on the
     offline-synced `cached_data` passed from app.py.
+
+    `index` is the BM25 index persisted at sync time (see project_index).
+    If it is missing or stale it is rebuilt in memory.
     """
     try:
         if not cached_data:
             return []
-            
+
         # If no JD, just return top N
         if not job_description:
             return cached_data[:top_n]
-            
-        def rank_relevance(repo):
-            score = 0
-            jd = job_description.lower()
-            name = (repo.get('name') or "").lower()
-            desc = (repo.get('description') or "").lower()
-            lang = (repo.get('language') or "").lower()
-            summary = (repo.get('summary') or "").lower()
-            
-            # Simple keyword matching heuristic
-            if name and name in jd: score += 5
-            if desc and any(word in desc for word in jd.split()): score += 3
-            if lang and lang in jd: score += 2
-            
-            # Match against the LLM-generated summary
-            if summary:
-                matches = sum(1 for word in jd.split() if len(word) > 4 and word in summary)
-                score += min(matches, 10) # cap bonus
-                
-            return score
-            
-        ranked = sorted(cached_data, key=rank_relevance, reverse=True)
-        return ranked[:top_n]
-        
+
+        if not index_matches(index, cached_data):
+            index = build_index(cached_data)
+
+        ranked_ids = [doc_id for doc_id, _ in top_k(index, job_description, top_n)]
+
+        # Pad with unmatched projects in their original order
+        if len(ranked_ids) < top_n:
+            seen = set(ranked_ids)
+            ranked_ids += [i for i in range(len(cached_data)) if i not in seen][:top_n - len(ranked_ids)]
+
+        return [cached_data[i] for i in ranked_ids]
+
     except Exception as e:
         print(f"Error in get_github_projects: {e}")
         return []
@@ -1,8 +1,18 @@
-import requests
 import json
 import re
 import os
 
+from github_client import GitHubClient, GitHubAPIError, RateLimitExceeded
+from tracing import span, token_usage
+from metrics import CACHE_REQUESTS, record_llm_call
+
+# Appended to the fallback summary written when the LLM call fails
+SUMMARY_FAILED = " (Summarization failed)"
+
+def get_api_url():
+    """REST API base URL; GITHUB_API_URL overrides it (e.g. for a local stub)."""
+    return os.environ.get("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+
 def extract_username(profile_url):
     match = re.search(r"github.com/([A-Za-z0-9-]+)", profile_url)
     if match:
@@ -10,16 +20,14 @@ def extract_username(profile_url):
     else:
         raise ValueError("Invalid GitHub profile URL.")
 
-def fetch_repos(username):
+def fetch_repos(username, client=None):
+    client = client or GitHubClient.from_env()
     repos = []
     page = 1
-    headers = {}
-    token = os.environ.get("GITHUB_TOKEN")
-    if token:
-        headers["Authorization"] = f"token {token}"
+    api_url = get_api_url()
     while True:
-        url = f"https://api.github.com/users/{username}/repos?per_page=100&page={page}"
-        response = requests.get(url, headers=headers)
+        url = f"{api_url}/users/{username}/repos?per_page=100&page={page}"
+        response = client.get(url)
         if response.status_code == 200:
             data = response.json()
             if not data:
@@ -29,7 +37,7 @@ def fetch_repos(username):
                 break
             page += 1
         else:
-            raise Exception(f"Failed to fetch repos: {response.status_code} - {response.text}")
+            raise GitHubAPIError(response.status_code, f"Failed to fetch repos: {response.text}")
     return repos
 
 def filter_repo_details(repos):
@@ -40,39 +48,205 @@ def filter_repo_details(repos):
             'url': repo.get('html_url'),
             'description': repo.get('description'),
             'language': repo.get('language'),
+            'topics': repo.get('topics') or [],
+            'pushed_at': repo.get('pushed_at'),
         })
     return filtered
 
+# README file names tried by the GraphQL backend, in order
+README_CANDIDATES = ["README.md", "readme.md", "Readme.md", "README.rst", "README.txt", "README"]
+
+GRAPHQL_REPOS_QUERY = """
+query($login: String!, $cursor: String) {
+  user(login: $login) {
+    repositories(first: 100, after: $cursor, ownerAffiliations: OWNER,
+                 orderBy: {field: PUSHED_AT, direction: DESC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        name
+        url
+        description
+        pushedAt
+        primaryLanguage { name }
+        repositoryTopics(first: 20) { nodes { topic { name } } }
+%s
+      }
+    }
+  }
+}
+""" % "\n".join(
+    f'        readme{i}: object(expression: "HEAD:{name}") {{ ... on Blob {{ text }} }}'
+    for i, name in enumerate(README_CANDIDATES)
+)
+
+def get_fetch_backend(token=None):
+    """Returns 'graphql' or 'rest' from GITHUB_FETCH_BACKEND. GraphQL needs a token (the client's or GITHUB_TOKEN)."""
+    backend = os.environ.get("GITHUB_FETCH_BACKEND", "rest").strip().lower()
+    if backend == "graphql" and not (token or os.environ.get("GITHUB_TOKEN")):
+        print("GraphQL backend requires GITHUB_TOKEN, falling back to REST.")
+        return "rest"
+    return "graphql" if backend == "graphql" else "rest"
+
+def fetch_repos_graphql(username, client=None):
+    """
+    Fetches repo metadata, topics, pushed-at and README text in one paginated
+    GraphQL query (one round trip per 100 repos). Returns REST-shaped repo
+    dicts with an extra 'readme' key.
+    """
+    client = client or GitHubClient.from_env()
+    url = os.environ.get("GITHUB_GRAPHQL_URL", "https://api.github.com/graphql")
+    headers = {"Authorization": f"bearer {client.token or ''}"}
+    repos = []
+    cursor = None
+    while True:
+        payload = {"query": GRAPHQL_REPOS_QUERY, "variables": {"login": username, "cursor": cursor}}
+        response = client.post(url, json=payload, headers=headers)
+        if response.status_code != 200:
+            raise GitHubAPIError(response.status_code, f"Failed to fetch repos: {response.text}")
+        body = response.json()
+        if body.get("errors"):
+            raise GitHubAPIError(response.status_code, f"Failed to fetch repos: {body['errors'][0].get('message')}")
+        user = (body.get("data") or {}).get("user")
+        if not user:
+            raise ValueError(f"GitHub user '{username}' not found.")
+        page = user["repositories"]
+        for node in page.get("nodes") or []:
+            readme = None
+            for i in range(len(README_CANDIDATES)):
+                blob = node.get(f"readme{i}")
+                if blob and blob.get("text"):
+                    readme = blob["text"]
+                    break
+            repos.append({
+                'name': node.get('name'),
+                'html_url': node.get('url'),
+                'description': node.get('description'),
+                'language': (node.get('primaryLanguage') or {}).get('name'),
+                'topics': [t['topic']['name'] for t in (node.get('repositoryTopics') or {}).get('nodes') or []],
+                'pushed_at': node.get('pushedAt'),
+                'readme': readme,
+            })
+        if not page["pageInfo"]["hasNextPage"]:
+            break
+        cursor = page["pageInfo"]["endCursor"]
+    return repos
+
+def fetch_projects(username, backend=None, client=None):
+    """
+    Fetches a user's repos using the configured backend and returns filtered
+    project dicts. The GraphQL backend also fills a transient 'readme' key;
+    REST projects have none and their READMEs are fetched by sync_projects.
+    """
+    backend = backend or get_fetch_backend(client.token if client else None)
+    if backend == "graphql":
+        repos = fetch_repos_graphql(username, client)
+        projects = filter_repo_details(repos)
+        for project, repo in zip(projects, repos):
+            project['readme'] = repo.get('readme')
+        return projects
+    return filter_repo_details(fetch_repos(username, client))
+
+def sync_projects(username, previous_projects=None, previous_incomplete=(), backend=None, client=None):
+    """
+    Fetches and summarizes a user's repos, resuming from a previous sync.
+
+    Repos whose summary is complete and whose pushed_at is unchanged keep
+    their previous summary without touching the API. A summary the LLM
+    failed to write is stored with 'summary_ok': False and retried on the
+    next sync. If the rate limit runs
+    out mid-sync, the remaining repos keep their previous (or a fallback)
+    summary and are listed in 'incomplete' so the next sync fills them in.
+
+    Returns a dict with 'projects', 'incomplete', 'resume_at' (epoch seconds
+    or None) and 'requests' (API calls made).
+    """
+    client = client or GitHubClient.from_env()
+    projects = fetch_projects(username, backend, client)
+
+    skip = set(previous_incomplete or ())
+    previous = {p.get('name'): p for p in (previous_projects or []) if p.get('name') not in skip}
+
+    incomplete = []
+    resume_at = None
+    for project in projects:
+        name = project.get('name')
+        prev = previous.get(name)
+        if _summary_complete(prev) and project.get('pushed_at') and prev.get('pushed_at') == project.get('pushed_at'):
+            project.pop('readme', None)
+            project['summary'] = prev['summary']
+            CACHE_REQUESTS.inc(cache="readme_summary", result="hit")
+            continue
+        CACHE_REQUESTS.inc(cache="readme_summary", result="miss")
+
+        readme, failed = None, False
+        if 'readme' in project:
+            readme = project.pop('readme')
+        elif resume_at is not None:
+            failed = True
+        else:
+            try:
+                readme = fetch_readme(username, name, client)
+            except RateLimitExceeded as e:
+                print(f"Pausing sync at {name}: {e}")
+                resume_at = e.reset_at
+                failed = True
+            except GitHubAPIError as e:
+                print(f"Could not fetch README for {name}: {e}")
+                failed = True
+
+        if failed:
+            incomplete.append(name)
+            project['summary'] = (prev or {}).get('summary') or summarize_readme(
+                name, None, project.get('description'), project.get('language'))[0]
+            continue
+
+        # Generate a 100-150 word summary instead of storing the full raw text
+        project['summary'], ok = summarize_readme(name, readme, project.get('description'), project.get('language'))
+        if not ok:
+            project['summary_ok'] = False
+
+    return {"projects": projects, "incomplete": incomplete, "resume_at": resume_at,
+            "requests": client.request_count}
+
+def _summary_complete(project):
+    """Whether a previous sync stored a real summary (not the fallback written when the LLM failed)."""
+    if not project or not project.get('summary') or project.get('summary_ok') is False:
+        return False
+    # Caches written before 'summary_ok' only have the fallback's marker
+    return not project['summary'].endswith(SUMMARY_FAILED)
+
 def save_to_file(data, filename="github_projects.json"):
     with open(filename, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2, ensure_ascii=False)
 
-def fetch_readme(owner, repo_name):
-    url = f"https://api.github.com/repos/{owner}/{repo_name}/readme"
+def fetch_readme(owner, repo_name, client=None):
+    """Returns the raw README text, or None if the repo has none. Raises GitHubAPIError on other failures."""
+    client = client or GitHubClient.from_env()
+    url = f"{get_api_url()}/repos/{owner}/{repo_name}/readme"
     headers = {"Accept": "application/vnd.github.v3.raw"}
-    token = os.environ.get("GITHUB_TOKEN")
-    if token:
-        headers["Authorization"] = f"token {token}"
-    response = requests.get(url, headers=headers)
+    response = client.get(url, headers=headers)
     if response.status_code == 200:
         return response.text
-    else:
+    elif response.status_code == 404:
         return None
+    else:
+        raise GitHubAPIError(response.status_code, f"Failed to fetch README: {response.text}")
 
 def summarize_readme(repo_name, readme_text, description, language):
-    """Summarizes a repo's README using Groq. Returns a short description if no README."""
+    """
+    Summarizes a repo's README using Groq. Returns (summary, ok): a short
+    description if there is no README, and ok=False with a fallback when
+    the LLM call fails.
+    """
     if not readme_text or readme_text == "README not found.":
         # Fallback if no README
         desc = description if description else "No description provided."
         lang_str = f" Built with {language}." if language else ""
-        return f"{repo_name}: {desc}{lang_str}"
+        return f"{repo_name}: {desc}{lang_str}", True
         
     try:
-        from groq import Groq
-        from dotenv import load_dotenv
-        load_dotenv()
-        
-        client = Groq()
+        from utils import get_groq_client
+        client = get_groq_client()
         prompt = f"""
         Summarize the following GitHub repository README into a highly concise, professional 100-150 word summary.
         Focus strictly on: 
@@ -86,22 +260,29 @@ def summarize_readme(repo_name, readme_text, description, language):
         {readme_text[:5000]} # truncate to avoid token limits
         """
         
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": "You are a senior technical writer summarizing code repositories."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=250,
-        )
-        return completion.choices[0].message.content.strip()
+        with span("llm.summarize_readme", model="llama-3.3-70b-versatile", repo=repo_name) as s:
+            try:
+                completion = client.chat.completions.create(
+                    model="llama-3.3-70b-versatile",
+                    messages=[
+                        {"role": "system", "content": "You are a senior technical writer summarizing code repositories."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.3,
+                    max_tokens=250,
+                )
+            except Exception:
+                record_llm_call("llama-3.3-70b-versatile", "summarize_readme", error=True)
+                raise
+            record_llm_call("llama-3.3-70b-versatile", "summarize_readme", completion)
+            s.set(**token_usage(completion))
+        return completion.choices[0].message.content.strip(), True
     except Exception as e:
         print(f"Error summarizing {repo_name}: {e}")
         # Fallback on error
         desc = description if description else "No description provided."
         lang_str = f" Built with {language}." if language else ""
-        return f"{repo_name}: {desc}{lang_str} (Summarization failed)"
+        return f"{repo_name}: {desc}{lang_str}{SUMMARY_FAILED}", False
 
 def main():
     profile_url = input("Enter GitHub profile URL: ")
@@ -112,19 +293,14 @@ def main():
             os.environ["GITHUB_TOKEN"] = token
     try:
         username = extract_username(profile_url)
-        repos = fetch_repos(username)
-        filtered = filter_repo_details(repos)
-        # Fetch README for each repo and summarize it
+        # Fetch repos with their READMEs and summarize them
         print("Fetching and summarizing projects. This may take a moment...")
-        for repo in filtered:
-            repo_name = repo.get('name')
-            readme = fetch_readme(username, repo_name)
-            summary = summarize_readme(repo_name, readme, repo.get('description'), repo.get('language'))
-            repo['summary'] = summary
-            print(f"Summarized: {repo_name}")
-            
+        result = sync_projects(username)
+        filtered = result["projects"]
         save_to_file(filtered)
         print(f"Saved {len(filtered)} projects (name, url, summary) to github_projects.json")
+        if result["incomplete"]:
+            print(f"Rate limited: {len(result['incomplete'])} projects are incomplete. Run again after the reset.")
     except Exception as e:
         print(f"Error: {e}")
 
@@ -0,0 +1,29 @@
+"""
+Gunicorn Configuration
+Loaded automatically by `gunicorn app:app` from the working directory.
+
+Generating an email is mostly waiting on Groq, GitHub and SMTP, so the
+default is a few processes with several threads each ("gthread"): one
+worker serves many in-flight generations without another copy of the
+app in memory. Every knob can be overridden from the environment.
+"""
+import os
+
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "600"))
+keepalive = 5
+
+
+def on_starting(server):
+    # Metric snapshots from a previous run would otherwise be summed into this one
+    from metrics import clear_snapshots
+    clear_snapshots()
+
+
+def post_fork(server, worker):
+    # Claim the worker's PID in the outbox at once: jobs left by an earlier process
+    # with the same PID (after a container restart) are then seen as orphaned
+    from outbox import register_process
+    register_process()
@@ -0,0 +1,394 @@
+"""
+JD Analyzer Module
+Handles: local analysis of a pasted job description, before any LLM call:
+recruiter emails (best first), job title, company, location and normalized
+required / preferred skills. Also condenses the JD for prompts and ranks
+resumes by skill coverage.
+
+Analyses are cached per user by the hash of the whitespace-normalized JD
+(see user_store.get_job_description), so re-pasting a posting is free.
+"""
+import re
+import hashlib
+
+import metrics
+import user_store
+from tracing import span
+
+# Bump when extraction changes so cached analyses are recomputed
+ANALYZER_VERSION = 2
+# Condensed JDs sent to the LLM are cut at this length
+MAX_PROMPT_CHARS = 6000
+# A resume is picked locally (no LLM call) when it covers this many more required skills than the runner-up
+RESUME_SKILL_MARGIN = 2
+
+# ─── Vocabulary ─────────────────────────────────────────────────────
+
+# Canonical skill -> aliases (matched case-insensitively, on word boundaries)
+SKILLS = {
+    "Python": ["python"], "Java": ["java"], "JavaScript": ["javascript", "js", "es6"],
+    "TypeScript": ["typescript", "ts"], "C++": ["c++", "cpp"], "C#": ["c#", "csharp"],
+    "PHP": ["php"], "Ruby": ["ruby"], "Kotlin": ["kotlin"], "Scala": ["scala"],
+    "SQL": ["sql"], "PostgreSQL": ["postgresql", "postgres"], "MySQL": ["mysql"],
+    "MongoDB": ["mongodb", "mongo"], "Redis": ["redis"], "SQLite": ["sqlite"],
+    "Elasticsearch": ["elasticsearch", "elastic search"],
+    "Django": ["django"], "Flask": ["flask"], "FastAPI": ["fastapi"], "Spring": ["spring boot", "springboot"],
+    "Node.js": ["node.js", "nodejs", "node js"], "Express": ["express.js", "expressjs"],
+    "Angular": ["angular", "angularjs"], "Vue": ["vue", "vue.js", "vuejs"], "Next.js": ["next.js", "nextjs"],
+    "HTML": ["html", "html5"], "CSS": ["css", "css3"], "Tailwind": ["tailwind", "tailwindcss"],
+    "REST APIs": ["rest api", "rest apis", "restful", "restful api", "restful apis"], "GraphQL": ["graphql"],
+    "AWS": ["aws", "amazon web services"], "Azure": ["azure", "microsoft azure"],
+    "GCP": ["gcp", "google cloud", "google cloud platform"],
+    "Docker": ["docker"], "Kubernetes": ["kubernetes", "k8s"], "Terraform": ["terraform"],
+    "CI/CD": ["ci/cd", "cicd", "continuous integration"], "Git": ["git", "github", "gitlab"],
+    "Linux": ["linux", "unix"], "Kafka": ["kafka"], "Airflow": ["airflow"], "MLOps": ["mlops"],
+    "Machine Learning": ["machine learning"], "Deep Learning": ["deep learning"],
+    "NLP": ["nlp", "natural language processing"], "Computer Vision": ["computer vision"],
+    "LLMs": ["llm", "llms", "large language model", "large language models"],
+    "Generative AI": ["generative ai", "genai", "gen ai"], "RAG": ["rag", "retrieval augmented generation",
+                                                                   "retrieval-augmented generation"],
+    "LangChain": ["langchain"], "Hugging Face": ["hugging face", "huggingface", "transformers"],
+    "TensorFlow": ["tensorflow"], "PyTorch": ["pytorch"], "Keras": ["keras"],
+    "scikit-learn": ["scikit-learn", "sklearn", "scikit learn"], "OpenCV": ["opencv"],
+    "pandas": ["pandas"], "NumPy": ["numpy"], "Spark": ["pyspark", "apache spark"],
+    "Data Analysis": ["data analysis", "data analytics"], "Data Visualization": ["data visualization"],
+    "Statistics": ["statistics", "statistical"], "Tableau": ["tableau"], "Power BI": ["power bi", "powerbi"],
+    "Selenium": ["selenium"], "Web Scraping": ["web scraping", "scraping"], "Agile": ["agile", "scrum"],
+    "Microservices": ["microservices", "microservice"], "Prompt Engineering": ["prompt engineering"],
+    "Vector Databases": ["vector database", "vector databases", "pinecone", "faiss", "chromadb"],
+}
+
+# Aliases that are also ordinary words; these only match with this exact casing
+CASE_SENSITIVE_SKILLS = {
+    "Go": ["Go", "Golang", "golang"], "R": ["R"], "React": ["React", "React.js", "ReactJS", "react.js", "reactjs"],
+    "Rust": ["Rust"], "Swift": ["Swift"], "Spark": ["Spark"], "Excel": ["Excel", "MS Excel"],
+    "REST APIs": ["REST"], "Machine Learning": ["ML"], "AI": ["AI"], ".NET": [".NET", "ASP.NET"],
+}
+
+ROLE_NOUNS = ("Engineer", "Developer", "Scientist", "Analyst", "Manager", "Designer", "Intern", "Architect",
+              "Specialist", "Consultant", "Administrator", "Officer", "Programmer", "Researcher", "Technician",
+              "Coordinator", "Director", "Lead", "Associate", "Assistant", "Trainee", "Tester", "Writer",
+              "Strategist", "Representative", "Executive", "Head")
+
+RECRUITING_LOCAL_PARTS = ("hr", "jobs", "job", "career", "careers", "recruit", "recruiting", "recruitment",
+                          "recruiter", "talent", "hiring", "hire", "apply", "applications", "cv", "resume",
+                          "people", "team")
+UNLIKELY_LOCAL_PARTS = ("noreply", "no-reply", "donotreply", "do-not-reply", "privacy", "abuse", "support",
+                        "help", "billing", "sales", "marketing", "press", "media", "webmaster", "security")
+FREE_MAIL_DOMAINS = frozenset(("gmail", "yahoo", "hotmail", "outlook", "live", "icloud", "proton", "protonmail",
+                               "aol", "mail", "gmx", "yandex", "zoho"))
+DOMAIN_SUFFIXES = frozenset(("com", "org", "net", "io", "co", "ai", "dev", "app", "tech", "biz", "info", "edu",
+                             "gov", "uk", "pk", "in", "de", "fr", "nl", "ae", "sa", "ca", "au", "us", "eu",
+                             "example", "jobs"))
+
+WORK_MODES = (("Remote", re.compile(r"\b(?:fully\s+)?remote\b", re.I)),
+              ("Hybrid", re.compile(r"\bhybrid\b", re.I)),
+              ("On-site", re.compile(r"\bon[- ]?site\b|\bin[- ]office\b", re.I)))
+
+# Section headers whose content is not about the role (dropped from prompts)
+BOILERPLATE_HEADERS = re.compile(
+    r"^\W*(?:benefits|perks|what we offer|why join us|compensation|equal (?:employment )?opportunity|eeo|"
+    r"diversity|how to apply|application process|disclaimer|privacy)\b", re.I)
+BOILERPLATE_LINES = re.compile(
+    r"equal opportunity employer|without regard to|reasonable accommodation|privacy (?:policy|notice)|"
+    r"e-?verify|protected veteran|sexual orientation|gender identity", re.I)
+PREFERRED_MARKERS = re.compile(r"nice[- ]to[- ]have|\bpreferred\b|\bbonus\b|\bis a plus\b|\ba plus\b|"
+                               r"\bdesirable\b|\badvantage\b|\bideally\b|\boptional\b", re.I)
+REQUIRED_HEADERS = re.compile(r"^\W*(?:requirements|required|must[- ]have|qualifications|responsibilities|"
+                              r"what you(?:'ll| will) (?:need|do|bring)|skills|about (?:you|the role))\b", re.I)
+
+# ─── Compiled patterns ──────────────────────────────────────────────
+
+EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}")
+WHITESPACE_RE = re.compile(r"[ \t\r\f\v]+")
+_SKILL_BOUNDARY = r"(?<![\w+#.]){}(?![\w+#]|\.\w)"
+
+
+def _alias_pattern(aliases, flags=0):
+    aliases = sorted(aliases, key=len, reverse=True)
+    return re.compile(_SKILL_BOUNDARY.format("(" + "|".join(re.escape(a) for a in aliases) + ")"), flags)
+
+
+_SKILL_BY_ALIAS = {a.lower(): name for name, aliases in SKILLS.items() for a in aliases}
+_SKILL_BY_EXACT = {a: name for name, aliases in CASE_SENSITIVE_SKILLS.items() for a in aliases}
+_SKILL_RE = _alias_pattern(_SKILL_BY_ALIAS, re.I)
+_SKILL_EXACT_RE = _alias_pattern(_SKILL_BY_EXACT)
+
+_ROLE = r"(?:%s)s?" % "|".join(ROLE_NOUNS)
+_TITLE_WORD = r"(?:[A-Z][A-Za-z0-9+#./&-]*|of|and|&|/|-)"
+TITLE_RE = re.compile(r"\b((?:%s[ \t]+){0,5}%s)\b(?![ \t]+(?:%s)\b)" % (_TITLE_WORD, _ROLE, _TITLE_WORD))
+# A label starts a line or a sentence ("... our team. Position: Product Manager")
+LABELED_TITLE_RE = re.compile(r"(?:^|[.!?|•][ \t]+)\W*(?:job\s*title|position(?:\s+title)?|role|title|job|vacancy|opening)"
+                              r"[ \t]*[:\-–—][ \t]*(.+)$", re.I | re.M)
+LABELED_COMPANY_RE = re.compile(r"^\W*(?:company(?:\s+name)?|employer|organi[sz]ation|client)\s*[:\-–—]\s*(.+)$",
+                                re.I | re.M)
+LABELED_LOCATION_RE = re.compile(r"^\W*(?:(?:job\s+|work\s+|office\s+)?location|based\s+in|city)\s*[:\-–—]\s*(.+)$",
+                                 re.I | re.M)
+_NAME = r"([A-Z][\w&.'-]*(?:[ \t]+(?:[A-Z][\w&.'-]*|&|of))*)"
+COMPANY_RES = (re.compile(r"\bat\s+" + _NAME),
+               re.compile(r"\b(?:[Jj]oin|[Aa]bout)\s+(?:us\s+at\s+)?" + _NAME),
+               re.compile(_NAME + r"\s+is\s+(?:hiring|looking|seeking|searching)"))
+LOCATION_RE = re.compile(r"\b(?:based|located|office|offices|relocate|onsite|on-site|team|role|position)\s+(?:in|at|to)\s+"
+                         r"([A-Z][A-Za-z'-]+(?:,?[ \t]+[A-Z][A-Za-z'-]+){0,2})")
+
+# A sentence ends at ". " (but not after "Sr." and the like)
+SENTENCE_END_RE = re.compile(r"(?<!\bSr)(?<!\bJr)(?<!\bSt)(?<!\bMr)(?<!\bMs)\.(?:\s|$)")
+
+_TITLE_LEADING = {"The", "Our", "A", "An", "As", "Join", "Hiring", "We", "Role", "Position", "Job", "Title",
+                  "About", "Seeking", "New", "Urgent", "Urgently", "Opening", "Vacancy", "Now"}
+_NOT_COMPANY = {"We", "Our", "Us", "The", "You", "Your", "This", "Remote", "Hybrid", "Least", "The Company",
+                "The Role", "About", "Apply", "Team"}
+
+
+# ─── Extraction ─────────────────────────────────────────────────────
+
+def normalize(text):
+    """Whitespace-normalized JD text (runs of spaces collapsed, blank lines dropped)."""
+    lines = (WHITESPACE_RE.sub(" ", line).strip() for line in (text or "").splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def jd_hash(text):
+    return hashlib.sha256(normalize(text).encode("utf-8")).hexdigest()
+
+
+def extract_emails(text):
+    """All email addresses in the text, most likely recruiter address first."""
+    candidates = {}
+    for match in EMAIL_RE.finditer(text or ""):
+        email = match.group(0).rstrip(".-")
+        key = email.lower()
+        if key in candidates:
+            continue
+        local = key.split("@")[0]
+        parts = set(re.split(r"[._+-]", local))
+        score = 0
+        if parts & set(RECRUITING_LOCAL_PARTS) or any(local.startswith(p) for p in ("recruit", "career", "talent")):
+            score += 3
+        if any(p in local for p in UNLIKELY_LOCAL_PARTS):
+            score -= 3
+        elif local == "info":
+            score -= 1
+        context = text[max(0, match.start() - 80):match.start()].lower()
+        if re.search(r"\b(?:send|email|e-mail|apply|cv|resume|contact|reach|share|forward|submit)", context):
+            score += 2
+        candidates[key] = (score, match.start(), email)
+    return [email for _, _, email in sorted(candidates.values(), key=lambda c: (-c[0], c[1]))]
+
+
+def _clean(value, max_words=8):
+    value = SENTENCE_END_RE.split(value)[0]
+    value = re.split(r"\s+[|•·]\s+|\s+[-–—]\s+|[\n;]|\s*\(", value)[0]
+    value = value.strip(" \t:,.-–—*#\"'")
+    words = value.split()
+    return " ".join(words) if 0 < len(words) <= max_words else None
+
+
+def extract_title(text):
+    """The advertised job title, or None."""
+    match = LABELED_TITLE_RE.search(text)
+    if match:
+        title = _clean(re.split(r"\s+at\s+|,", match.group(1))[0])
+        if title:
+            return title
+
+    # Prefer a title on the first lines (the posting's heading), then anywhere
+    lines = text.splitlines()
+    for chunk in ("\n".join(lines[:3]), text):
+        for match in TITLE_RE.finditer(chunk):
+            words = match.group(1).split()
+            while words and (words[0] in _TITLE_LEADING or words[0] in ("of", "and", "&", "/", "-")):
+                words = words[1:]
+            if words and re.fullmatch(_ROLE, words[-1]) and len(words) <= 7:
+                # A lone "Lead"/"Head"/"Associate" is rarely the title itself
+                if len(words) > 1 or words[0] not in ("Lead", "Head", "Associate", "Executive"):
+                    return " ".join(words)
+    return None
+
+
+def _company_from_domain(emails):
+    for email in emails:
+        labels = email.lower().split("@")[1].split(".")
+        names = [label for label in labels if label not in DOMAIN_SUFFIXES]
+        if names and names[-1] not in FREE_MAIL_DOMAINS:
+            return names[-1].replace("-", " ").title()
+    return None
+
+
+def extract_company(text, emails=()):
+    """The hiring company, or None. Falls back to the recruiter's email domain."""
+    match = LABELED_COMPANY_RE.search(text)
+    if match:
+        company = _clean(match.group(1).split(",")[0], max_words=6)
+        if company:
+            return company
+    for pattern in COMPANY_RES:
+        for match in pattern.finditer(text):
+            company = _clean(match.group(1).split(",")[0], max_words=6)
+            if company and company not in _NOT_COMPANY and not _SKILL_EXACT_RE.fullmatch(company) \
+                    and company.lower() not in _SKILL_BY_ALIAS and not re.search(r"\b" + _ROLE + r"$", company):
+                return company
+    return _company_from_domain(emails)
+
+
+def extract_location(text, company=None):
+    """City/country and work mode (Remote, Hybrid, On-site), e.g. "Berlin (Hybrid)", or None."""
+    place = None
+    match = LABELED_LOCATION_RE.search(text)
+    if match:
+        place = _clean(match.group(1), max_words=6)
+    if not place:
+        for match in LOCATION_RE.finditer(text):
+            place = _clean(match.group(1), max_words=4)
+            # "join our team at Acme Corp" names the company, not a place
+            if place and place != company:
+                break
+            place = None
+    if not place and company:
+        # "Engineer at Acme Corp, Berlin."
+        match = re.search(re.escape(company) + r"\.?[ \t]*[,(|–—-][ \t]*([A-Z][A-Za-z'-]+(?:,?[ \t]+[A-Z][A-Za-z'-]+){0,2})",
+                          text)
+        if match:
+            candidate = _clean(match.group(1), max_words=4)
+            if candidate and not extract_skills(candidate)[0] and not TITLE_RE.search(candidate):
+                place = candidate
+
+    mode = next((name for name, pattern in WORK_MODES if pattern.search(text)), None)
+    if place and mode and mode.lower() in place.lower():
+        return place
+    if place and mode:
+        return f"{place} ({mode})"
+    return place or mode
+
+
+def _skills_in(text):
+    found = []
+    for match in _SKILL_RE.finditer(text):
+        found.append((match.start(), _SKILL_BY_ALIAS[match.group(1).lower()]))
+    for match in _SKILL_EXACT_RE.finditer(text):
+        found.append((match.start(), _SKILL_BY_EXACT[match.group(1)]))
+    return [name for _, name in sorted(found)]
+
+
+def extract_skills(text):
+    """
+    Normalized skills named in the text, in order of first mention, as
+    (required, preferred). Skills only mentioned in a "nice to have" section
+    or sentence are preferred.
+    """
+    required, preferred = {}, {}
+    in_preferred = False
+    for line in (text or "").splitlines():
+        stripped = line.strip()
+        is_header = len(stripped.split()) <= 6 and (stripped.endswith(":") or stripped.isupper()
+                                                    or REQUIRED_HEADERS.match(stripped))
+        if is_header:
+            in_preferred = bool(PREFERRED_MARKERS.search(stripped))
+        for sentence in re.split(r"(?<=[.!?;])\s+", stripped):
+            target = preferred if in_preferred or PREFERRED_MARKERS.search(sentence) else required
+            for skill in _skills_in(sentence):
+                target.setdefault(skill, None)
+    return list(required), [s for s in preferred if s not in required]
+
+
+def analyze(text):
+    """Full local analysis of a job description (see module docstring)."""
+    text = normalize(text)
+    emails = extract_emails(text)
+    company = extract_company(text, emails)
+    required, preferred = extract_skills(text)
+    return {
+        "version": ANALYZER_VERSION,
+        "emails": emails,
+        "title": extract_title(text),
+        "company": company,
+        "location": extract_location(text, company),
+        "skills": required,
+        "preferred_skills": preferred,
+    }
+
+
+def get_analysis(user_id, job_description):
+    """analyze() with the result cached in the user's store by JD hash."""
+    sha = jd_hash(job_description)
+    with span("jd.analyze") as s:
+        cached = user_store.get_job_description(user_id, sha)
+        if cached and cached.get("version") == ANALYZER_VERSION:
+            metrics.CACHE_REQUESTS.inc(cache="jd_analysis", result="hit")
+            s.set(cached=True)
+            return cached
+        metrics.CACHE_REQUESTS.inc(cache="jd_analysis", result="miss")
+        analysis = analyze(job_description)
+        s.set(cached=False, skills=len(analysis["skills"]))
+    try:
+        user_store.save_job_description(user_id, sha, analysis)
+    except Exception as e:
+        print(f"Error caching JD analysis: {e}")
+    return analysis
+
+
+# ─── Uses ───────────────────────────────────────────────────────────
+
+def summary(analysis):
+    """The extracted fields as a few prompt lines (empty fields omitted)."""
+    lines = []
+    for label, key in (("Job title", "title"), ("Company", "company"), ("Location", "location")):
+        if analysis.get(key):
+            lines.append(f"{label}: {analysis[key]}")
+    if analysis.get("skills"):
+        lines.append("Required skills: " + ", ".join(analysis["skills"]))
+    if analysis.get("preferred_skills"):
+        lines.append("Nice to have: " + ", ".join(analysis["preferred_skills"]))
+    return "\n".join(lines)
+
+
+def condense(job_description, max_chars=MAX_PROMPT_CHARS):
+    """
+    The JD without boilerplate for prompts: benefits/EEO/how-to-apply
+    sections, legal lines, email addresses and repeated lines are dropped.
+    """
+    kept, seen = [], set()
+    skipping = False
+    for line in normalize(job_description).splitlines():
+        words = len(line.split())
+        if words <= 6 and (line.endswith(":") or line.isupper() or BOILERPLATE_HEADERS.match(line)
+                           or REQUIRED_HEADERS.match(line)):
+            skipping = bool(BOILERPLATE_HEADERS.match(line))
+        if skipping or BOILERPLATE_LINES.search(line):
+            continue
+        line = EMAIL_RE.sub("", line).strip()
+        if line and line.lower() not in seen:
+            seen.add(line.lower())
+            kept.append(line)
+    condensed = "\n".join(kept)
+    return condensed if len(condensed) <= max_chars else condensed[:max_chars].rsplit(" ", 1)[0] + " ..."
+
+
+def ranking_query(analysis, job_description):
+    """Query for project ranking: the JD plus the canonical skill names (so "k8s" also finds "kubernetes")."""
+    skills = (analysis.get("skills") or []) + (analysis.get("preferred_skills") or [])
+    return " ".join([job_description] + skills)
+
+
+def rank_resumes(analysis, resume_texts):
+    """
+    Resumes by coverage of the JD's skills, best first: [(name, required
+    matched, preferred matched)]. Ties keep the original order.
+    """
+    required, preferred = set(analysis.get("skills") or []), set(analysis.get("preferred_skills") or [])
+    ranked = []
+    for order, (name, text) in enumerate(resume_texts.items()):
+        found = set(_skills_in(text or ""))
+        ranked.append((len(required & found), len(preferred & found), order, name))
+    ranked.sort(key=lambda r: (-r[0], -r[1], r[2]))
+    return [(name, req, pref) for req, pref, _, name in ranked]
+
+
+def pick_resume_locally(analysis, resume_texts):
+    """The clear best resume by skill coverage, or None when the LLM should decide."""
+    ranked = rank_resumes(analysis, resume_texts)
+    if len(ranked) == 1:
+        return ranked[0][0]
+    if ranked and ranked[0][1] and ranked[0][1] - ranked[1][1] >= RESUME_SKILL_MARGIN:
+        return ranked[0][0]
+    return None
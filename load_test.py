@@ -0,0 +1,640 @@
+"""
+Load Test Module
+Handles: running the real `app:app` under gunicorn against local stand-ins
+for Groq, GitHub, SMTP and Google Sheets, driving it with many concurrent
+simulated users, and writing a JSON report that can be compared between
+releases.
+
+Every simulated user gets their own user_id, resumes, synced GitHub
+projects and tracker history, then loops over index → generate → send →
+outbox status, with occasional tracker/profile views and GitHub syncs.
+For each gunicorn configuration the report records throughput, latency
+percentiles (overall and per endpoint), errors and the peak RSS of every
+worker process.
+
+Usage:
+    python load_test.py --users 50 --duration 60 --workers 1,2,4 --worker-class sync,gthread --threads 8
+    python load_test.py --users 20 --duration 30 --compare load_test_reports/<previous>.json
+"""
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import random
+import shutil
+import signal
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import socketserver
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+REPORT_VERSION = 1
+REPORTS_DIR = os.path.join(REPO_DIR, "load_test_reports")
+
+JOB_DESCRIPTIONS = [
+    "Senior Python Engineer at Acme Corp, Remote. Build Flask APIs, PostgreSQL, Docker and AWS. "
+    "Experience with machine learning pipelines is a plus. Contact: jobs@acme.example.com",
+    "Machine Learning Engineer at DataWorks, Berlin. PyTorch, NLP, transformers, MLOps with Kubernetes. "
+    "Send your CV to talent@dataworks.example.com",
+    "Full Stack Developer at Webify, London. React, TypeScript, Node.js, REST and GraphQL APIs. "
+    "Apply at careers@webify.example.com",
+    "Data Analyst at FinSight, Karachi. SQL, pandas, dashboards, Excel automation and reporting. "
+    "Email hr@finsight.example.com",
+]
+
+LANGUAGES = ["Python", "JavaScript", "TypeScript", "Go", "Jupyter Notebook", None]
+TOPICS = ["flask", "nlp", "react", "docker", "machine-learning", "api", "dashboard", "automation"]
+
+
+# ─── Stand-ins ──────────────────────────────────────────────────────
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _json(self, payload, status=200, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _serve(handler_cls):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler_cls)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_groq_stub(latency, stats):
+    """OpenAI-compatible chat completions endpoint answering like the three prompts in this app."""
+
+    class GroqStub(_QuietHandler):
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            messages = request.get("messages", [])
+            system = " ".join(m.get("content", "") for m in messages if m.get("role") == "system")
+            user = " ".join(m.get("content", "") for m in messages if m.get("role") == "user")
+            time.sleep(latency * random.uniform(0.8, 1.2))
+
+            if "best_resume_filename" in system:
+                names = re.findall(r"--- RESUME: (.+?) ---", user)
+                content = json.dumps({"best_resume_filename": names[0] if names else None,
+                                      "reason": "Closest match to the required skills."})
+            elif "Summarize" in user:
+                content = "A project that solves a practical problem with a clean, tested codebase. " * 8
+            else:
+                content = json.dumps({
+                    "subject": "Application - Load Test Candidate",
+                    "body": "Dear Hiring Manager,\n\n" + "I am applying for this role. " * 40 + "\n\nRegards",
+                    "job_title": "Software Engineer",
+                    "company_name": "Acme Corp",
+                })
+            with stats["lock"]:
+                stats["groq_calls"] += 1
+            prompt_tokens = (len(system) + len(user)) // 4
+            self._json({
+                "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()),
+                "model": request.get("model", "stub"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(content) // 4,
+                          "total_tokens": prompt_tokens + len(content) // 4},
+            })
+
+    return _serve(GroqStub)
+
+
+def make_repos(login, count, version=0):
+    """Deterministic repository list for a user; `version` bumps pushed_at of one repo per sync."""
+    rng = random.Random(login)
+    repos = []
+    for i in range(count):
+        pushed = datetime(2024, 1, 1) + timedelta(days=i)
+        if version and i == version % count:
+            pushed += timedelta(seconds=version)
+        repos.append({
+            "name": f"{login}-project-{i}",
+            "html_url": f"https://github.com/{login}/{login}-project-{i}",
+            "description": f"Project {i}: " + " ".join(rng.sample(TOPICS, 3)),
+            "language": rng.choice(LANGUAGES),
+            "topics": rng.sample(TOPICS, 2),
+            "pushed_at": pushed.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        })
+    return repos
+
+
+def start_github_stub(latency, repo_count, stats):
+    """REST endpoints used by a sync: the repo listing and raw READMEs."""
+    versions = {}
+
+    class GitHubStub(_QuietHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            with stats["lock"]:
+                stats["github_calls"] += 1
+            headers = {"X-RateLimit-Remaining": "4999", "X-RateLimit-Reset": str(int(time.time()) + 3600)}
+            match = re.match(r"/users/([^/]+)/repos\?.*page=(\d+)", self.path)
+            if match:
+                login, page = match.group(1), int(match.group(2))
+                if page > 1:
+                    return self._json([], headers=headers)
+                with stats["lock"]:
+                    versions[login] = versions.get(login, 0) + 1
+                    version = versions[login]
+                return self._json(make_repos(login, repo_count, version), headers=headers)
+            if re.match(r"/repos/[^/]+/[^/]+/readme", self.path):
+                body = ("# Project\n\n" + "Implements features with tests and CI. " * 60).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            self._json({"message": "Not Found"}, status=404, headers=headers)
+
+    return _serve(GitHubStub)
+
+
+def start_sheets_stub(latency, stats):
+    """Accepts appended tracker rows in place of the Google Sheets API."""
+
+    class SheetsStub(_QuietHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(latency)
+            with stats["lock"]:
+                stats["sheet_rows"] += 1
+            self._json({"updates": {"updatedRows": 1}})
+
+    return _serve(SheetsStub)
+
+
+def start_smtp_stub(latency, stats):
+    """SMTP sink that accepts AUTH PLAIN and any message."""
+
+    class SMTPStub(socketserver.StreamRequestHandler):
+        def handle(self):
+            self.wfile.write(b"220 stub ESMTP\r\n")
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    return
+                cmd = line[:4].upper()
+                if cmd == b"EHLO":
+                    self.wfile.write(b"250-stub\r\n250-AUTH PLAIN\r\n250 SIZE 20000000\r\n")
+                elif cmd == b"AUTH":
+                    self.wfile.write(b"235 2.7.0 Authentication successful\r\n")
+                elif cmd == b"DATA":
+                    self.wfile.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                    while self.rfile.readline() not in (b".\r\n", b""):
+                        pass
+                    time.sleep(latency)
+                    with stats["lock"]:
+                        stats["smtp_messages"] += 1
+                    self.wfile.write(b"250 OK\r\n")
+                elif cmd == b"QUIT":
+                    self.wfile.write(b"221 Bye\r\n")
+                    return
+                else:
+                    self.wfile.write(b"250 OK\r\n")
+
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), SMTPStub)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ─── gunicorn hooks (loaded through the generated config file) ─────
+
+def on_starting(server):
+    from metrics import clear_snapshots
+    clear_snapshots()
+
+
+def _stub_save_to_google_sheet(job_title, email_address):
+    import requests
+    from metrics import SHEETS_APPENDS
+    try:
+        requests.post(os.environ["LOADTEST_SHEETS_URL"], json={
+            "values": [[job_title, email_address, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "Sent"]]
+        }, timeout=10).raise_for_status()
+        SHEETS_APPENDS.inc(outcome="ok")
+        return True, "Saved to Google Sheet successfully."
+    except Exception as e:
+        SHEETS_APPENDS.inc(outcome="error")
+        return False, f"Google Sheet Error: {e}"
+
+
+def post_fork(server, worker):
+    # Route Google Sheets appends to the local stand-in (gspread talks to Google directly)
+    import utils
+    utils.save_to_google_sheet = _stub_save_to_google_sheet
+
+
+# ─── Test data ──────────────────────────────────────────────────────
+
+def _make_resume_pdf(path, title):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+    c = canvas.Canvas(path, pagesize=A4)
+    y = 800
+    for line in [title, "Skills: Python, Flask, SQL, Docker, machine learning, React",
+                 "Experience: built APIs, data pipelines and dashboards."] + \
+                [f"Project {i}: delivered features end to end with tests." for i in range(25)]:
+        c.drawString(50, y, line)
+        y -= 18
+    c.save()
+
+
+def seed_users(workdir, users, repo_count, tracker_rows):
+    """Create each simulated user's resumes, synced GitHub cache and tracker history under `workdir`."""
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        import user_store
+        from github_export import save_projects_cache
+        from github_scraper import filter_repo_details
+
+        templates = []
+        for i, title in enumerate(["Backend Engineer Resume", "Data Scientist Resume"]):
+            path = os.path.join(workdir, f"template_{i}.pdf")
+            _make_resume_pdf(path, title)
+            with open(path, "rb") as f:
+                templates.append(f.read())
+
+        seeded = []
+        for n in range(users):
+            user_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"load-test-user-{n}"))
+            login = f"loaduser{n}"
+            for i, template in enumerate(templates):
+                user_store.save_resume(user_id, f"resume_{i}.pdf", template)
+
+            projects = filter_repo_details(make_repos(login, repo_count))
+            for p in projects:
+                p["summary"] = f"{p['name']}: {p['description']}. Built with {p['language']}."
+            profile_url = f"https://github.com/{login}"
+            save_projects_cache(user_id, projects, profile_url)
+
+            if tracker_rows:
+                now = datetime.now()
+                user_store.add_applications(user_id, [
+                    ((now - timedelta(hours=h)).strftime("%Y-%m-%d %H:%M:%S"), f"Engineer {h}",
+                     f"hr{h}@example.com", "Sent", None)
+                    for h in range(tracker_rows)])
+            seeded.append({"user_id": user_id, "profile_url": profile_url, "index": n})
+        return seeded
+    finally:
+        os.chdir(cwd)
+
+
+# ─── Server under test ──────────────────────────────────────────────
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_gunicorn(workdir, env, workers, worker_class, threads):
+    """Start gunicorn serving app:app from `workdir`; returns (process, base_url)."""
+    port = _free_port()
+    conf_path = os.path.join(workdir, "gunicorn_loadtest.conf.py")
+    with open(conf_path, "w", encoding="utf-8") as f:
+        f.write(f"import sys\nsys.path.insert(0, {REPO_DIR!r})\nfrom load_test import on_starting, post_fork\n")
+    cmd = [sys.executable, "-m", "gunicorn", "app:app", "-c", conf_path,
+           "--bind", f"127.0.0.1:{port}", "--workers", str(workers), "--worker-class", worker_class,
+           "--threads", str(threads), "--timeout", "300", "--pythonpath", REPO_DIR, "--chdir", workdir]
+    log = open(os.path.join(workdir, f"gunicorn_{workers}_{worker_class}_{threads}.log"), "w")
+    proc = subprocess.Popen(cmd, env=env, stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+    base_url = f"http://127.0.0.1:{port}"
+
+    import requests
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with {proc.returncode}; see {log.name}")
+        try:
+            if requests.get(f"{base_url}/api/get_user_id", timeout=2).status_code == 200:
+                return proc, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    stop_gunicorn(proc)
+    raise RuntimeError(f"gunicorn did not become ready; see {log.name}")
+
+
+def stop_gunicorn(proc):
+    if proc.poll() is None:
+        os.killpg(proc.pid, signal.SIGTERM)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            os.killpg(proc.pid, signal.SIGKILL)
+            proc.wait()
+
+
+def _children(pid):
+    """PIDs whose parent is `pid` (Linux /proc)."""
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            if int(fields[1]) == pid:
+                children.append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    return children
+
+
+def _rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class MemorySampler(threading.Thread):
+    """Polls the RSS of every gunicorn worker and keeps each one's peak."""
+
+    def __init__(self, master_pid, interval=0.5):
+        super().__init__(daemon=True)
+        self.master_pid = master_pid
+        self.interval = interval
+        self.peaks = {}
+        self.peak_total = 0.0
+        self._halt = threading.Event()
+
+    def run(self):
+        if not os.path.isdir("/proc"):
+            return
+        while not self._halt.is_set():
+            total = 0.0
+            for pid in _children(self.master_pid):
+                rss = _rss_mb(pid)
+                if rss is not None:
+                    self.peaks[pid] = max(self.peaks.get(pid, 0.0), rss)
+                    total += rss
+            self.peak_total = max(self.peak_total, total)
+            self._halt.wait(self.interval)
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+
+
+# ─── Simulated users ────────────────────────────────────────────────
+
+def simulate_user(base_url, user, deadline, args, results, lock):
+    """One user's session: set up the profile, then loop through the application flow until `deadline`."""
+    import requests
+    rng = random.Random(user["index"])
+    http = requests.Session()
+
+    def call(name, method, path, **kwargs):
+        start = time.perf_counter()
+        try:
+            resp = http.request(method, base_url + path, allow_redirects=False, timeout=300, **kwargs)
+            ok = resp.status_code < 400
+        except requests.RequestException:
+            ok = False
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            results.append((name, elapsed, ok))
+        return ok
+
+    call("index", "GET", f"/?sync_user_id={user['user_id']}")
+    call("profile_save", "POST", "/profile",
+         data={"action": "github_save", "github_profile": user["profile_url"], "github_token": ""})
+
+    iteration = 0
+    while time.time() < deadline:
+        iteration += 1
+        call("index", "GET", "/")
+        jd = rng.choice(JOB_DESCRIPTIONS)
+        if call("generate", "POST", "/generate", data={"job_description": jd}):
+            call("send", "POST", "/send", data={
+                "recipient": "hr@example.com", "subject": "Application", "body": "Hello " * 100,
+                "service": "gmail", "email_user": f"loaduser{user['index']}@example.com",
+                "email_pass": "app-password", "send_method": "smtp",
+            })
+            call("outbox_status", "GET", "/api/outbox")
+        if iteration % 5 == 0:
+            call("tracker", "GET", "/tracker")
+            call("profile", "GET", "/profile")
+        if rng.random() < args.sync_ratio:
+            call("sync_github", "GET", "/sync_github")
+        if args.think_time:
+            time.sleep(rng.uniform(0, 2 * args.think_time))
+
+
+def _percentiles(values):
+    if not values:
+        return {}
+    values = sorted(values)
+
+    def pct(p):
+        return round(values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))], 1)
+
+    return {"count": len(values), "mean": round(sum(values) / len(values), 1),
+            "p50": pct(50), "p90": pct(90), "p95": pct(95), "p99": pct(99), "max": round(values[-1], 1)}
+
+
+def run_config(workdir, env, users, workers, worker_class, threads, args):
+    """Serve with one gunicorn configuration, drive it with all users and summarize the run."""
+    proc, base_url = start_gunicorn(workdir, env, workers, worker_class, threads)
+    sampler = MemorySampler(proc.pid)
+    sampler.start()
+    results, lock = [], threading.Lock()
+    try:
+        # Warm-up: one request per worker so imports aren't counted as latency
+        import requests
+        for _ in range(workers * 2):
+            requests.get(f"{base_url}/api/get_user_id", timeout=30)
+
+        started = time.time()
+        deadline = started + args.duration
+        threads_ = [threading.Thread(target=simulate_user, args=(base_url, u, deadline, args, results, lock),
+                                     daemon=True) for u in users]
+        for t in threads_:
+            t.start()
+            if args.ramp_up:
+                time.sleep(args.ramp_up / len(threads_))
+        for t in threads_:
+            t.join()
+        elapsed = time.time() - started
+    finally:
+        sampler.stop()
+        stop_gunicorn(proc)
+
+    by_endpoint = {}
+    for name, ms, ok in results:
+        by_endpoint.setdefault(name, []).append((ms, ok))
+    peaks = sorted(sampler.peaks.values(), reverse=True)
+    return {
+        "workers": workers,
+        "worker_class": worker_class,
+        "threads": threads,
+        "users": len(users),
+        "duration_s": round(elapsed, 2),
+        "requests": len(results),
+        "errors": sum(1 for _, _, ok in results if not ok),
+        "throughput_rps": round(len(results) / elapsed, 2) if elapsed else 0.0,
+        "generations_per_min": round(sum(1 for n, _, ok in results if n == "generate" and ok) / elapsed * 60, 1)
+        if elapsed else 0.0,
+        "latency_ms": {"all": _percentiles([ms for _, ms, _ in results]),
+                       **{name: _percentiles([ms for ms, _ in samples])
+                          for name, samples in sorted(by_endpoint.items())}},
+        "memory_mb": {"per_worker_peak": [round(p, 1) for p in peaks],
+                      "max_worker_peak": round(peaks[0], 1) if peaks else None,
+                      "total_peak": round(sampler.peak_total, 1) if peaks else None},
+    }
+
+
+# ─── Report ─────────────────────────────────────────────────────────
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def _run_key(run):
+    return f"{run['workers']}x{run['worker_class']}/{run['threads']}t"
+
+
+def print_summary(report):
+    print(f"\nLoad test {report['generated_at']} (commit {report['git_commit']}, {report['params']['users']} users)")
+    print(f"{'config':<16}{'req/s':>9}{'gen/min':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'errors':>8}"
+          f"{'max RSS':>10}{'total RSS':>11}")
+    for run in report["runs"]:
+        lat, mem = run["latency_ms"]["all"], run["memory_mb"]
+        print(f"{_run_key(run):<16}{run['throughput_rps']:>9.1f}{run['generations_per_min']:>9.1f}"
+              f"{lat.get('p50', 0):>9.0f}{lat.get('p95', 0):>9.0f}{lat.get('p99', 0):>9.0f}{run['errors']:>8}"
+              f"{(mem['max_worker_peak'] or 0):>9.0f}M{(mem['total_peak'] or 0):>10.0f}M")
+        gen = run["latency_ms"].get("generate")
+        if gen:
+            print(f"{'':<16}generate p50 {gen['p50']:.0f}ms, p95 {gen['p95']:.0f}ms, p99 {gen['p99']:.0f}ms")
+
+
+def compare_reports(current, previous):
+    """Print throughput, p95 and memory changes for configurations present in both reports."""
+    before = {_run_key(r): r for r in previous.get("runs", [])}
+    print(f"\nCompared with {previous.get('generated_at')} (commit {previous.get('git_commit')}):")
+    for run in current["runs"]:
+        old = before.get(_run_key(run))
+        if not old:
+            print(f"  {_run_key(run):<16} no baseline")
+            continue
+
+        def delta(new, prev):
+            return f"{(new - prev) / prev * 100:+.1f}%" if prev else "n/a"
+
+        print(f"  {_run_key(run):<16} req/s {delta(run['throughput_rps'], old['throughput_rps']):>8}  "
+              f"p95 {delta(run['latency_ms']['all'].get('p95', 0), old['latency_ms']['all'].get('p95', 0)):>8}  "
+              f"max RSS {delta(run['memory_mb']['max_worker_peak'] or 0, old['memory_mb']['max_worker_peak'] or 0):>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test app:app under gunicorn with local stand-ins.")
+    parser.add_argument("--users", type=int, default=20, help="concurrent simulated users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds per configuration")
+    parser.add_argument("--ramp-up", type=float, default=2, help="seconds to start all users")
+    parser.add_argument("--think-time", type=float, default=0.5, help="mean pause between iterations (s)")
+    parser.add_argument("--workers", default="2", help="comma-separated worker counts, e.g. 1,2,4")
+    parser.add_argument("--worker-class", default="sync", help="comma-separated gunicorn worker classes")
+    parser.add_argument("--threads", default="1", help="comma-separated thread counts (gthread)")
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="stand-in Groq latency (s)")
+    parser.add_argument("--github-latency", type=float, default=0.05)
+    parser.add_argument("--smtp-latency", type=float, default=0.1)
+    parser.add_argument("--sheets-latency", type=float, default=0.2)
+    parser.add_argument("--repos", type=int, default=30, help="GitHub repositories per user")
+    parser.add_argument("--tracker-rows", type=int, default=200, help="tracker history rows per user")
+    parser.add_argument("--sync-ratio", type=float, default=0.02, help="chance of a GitHub sync per iteration")
+    parser.add_argument("--output", help="report path (default load_test_reports/<timestamp>.json)")
+    parser.add_argument("--compare", help="previous report to compare against")
+    parser.add_argument("--keep-workdir", action="store_true")
+    args = parser.parse_args(argv)
+
+    stats = {"lock": threading.Lock(), "groq_calls": 0, "github_calls": 0, "smtp_messages": 0, "sheet_rows": 0}
+    groq = start_groq_stub(args.llm_latency, stats)
+    github = start_github_stub(args.github_latency, args.repos, stats)
+    sheets = start_sheets_stub(args.sheets_latency, stats)
+    smtp = start_smtp_stub(args.smtp_latency, stats)
+
+    report = {
+        "version": REPORT_VERSION,
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "host": {"cpus": os.cpu_count(), "python": sys.version.split()[0], "platform": sys.platform},
+        "params": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "keep_workdir")},
+        "runs": [],
+    }
+
+    worker_counts = [int(w) for w in args.workers.split(",")]
+    thread_counts = [int(t) for t in args.threads.split(",")]
+    configs = []
+    for worker_class in (k.strip() for k in args.worker_class.split(",")):
+        # Only gthread workers use --threads (gunicorn turns a threaded "sync" worker into gthread)
+        for threads in (thread_counts if worker_class == "gthread" else [1]):
+            configs += [(workers, worker_class, threads) for workers in worker_counts]
+    for workers, worker_class, threads in configs:
+        workdir = tempfile.mkdtemp(prefix="job-sender-load-")
+        try:
+            users = seed_users(workdir, args.users, args.repos, args.tracker_rows)
+            env = dict(os.environ,
+                       GROQ_API_KEY="load-test", GROQ_BASE_URL=f"http://127.0.0.1:{groq.server_address[1]}",
+                       GITHUB_API_URL=f"http://127.0.0.1:{github.server_address[1]}",
+                       GITHUB_FETCH_BACKEND="rest",
+                       SMTP_HOST="127.0.0.1", SMTP_PORT=str(smtp.server_address[1]), SMTP_STARTTLS="0",
+                       LOADTEST_SHEETS_URL=f"http://127.0.0.1:{sheets.server_address[1]}/append",
+                       METRICS_DIR=os.path.join(workdir, "metrics"),
+                       SECRET_KEY="load-test")
+            env.pop("GITHUB_TOKEN", None)
+            env.pop("WEBSITE_SITE_NAME", None)
+            print(f"Running {workers} x {worker_class} worker(s), {threads} thread(s), "
+                  f"{args.users} users for {args.duration:.0f}s...")
+            report["runs"].append(run_config(workdir, env, users, workers, worker_class, threads, args))
+        finally:
+            if args.keep_workdir:
+                print(f"  workdir kept at {workdir}")
+            else:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    report["stand_ins"] = {k: v for k, v in stats.items() if k != "lock"}
+    output = args.output or os.path.join(REPORTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print_summary(report)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare_reports(report, json.load(f))
+    print(f"\nReport written to {output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
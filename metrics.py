@@ -0,0 +1,344 @@
+"""
+Metrics Module
+Handles: counters, gauges and histograms for hot paths, caches and
+external calls, exposed in Prometheus text format on /metrics.
+
+Each process keeps its metrics in memory and a background thread writes
+a snapshot to `<METRICS_DIR>/metrics_<pid>.json` about once a second
+(atomically, only when something changed). /metrics merges the snapshots
+of every gunicorn worker: counters and histograms are summed (including
+those of workers that have exited, so totals never go backwards), while
+gauges only count live workers. gunicorn.conf.py clears the directory
+when the server starts.
+"""
+import os
+import json
+import time
+import atexit
+import tempfile
+import threading
+
+FLUSH_INTERVAL = 1.0
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_metrics = {}
+_lock = threading.Lock()
+_dirty = threading.Event()
+_flusher = None
+_flusher_pid = None
+
+
+def get_metrics_dir():
+    """Directory shared by all workers of this server for metric snapshots."""
+    path = os.getenv("METRICS_DIR") or os.path.join(tempfile.gettempdir(), "job-sender-metrics")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _changed(self):
+        _dirty.set()
+        _ensure_flusher()
+
+    def snapshot(self):
+        with _lock:
+            return {"type": self.kind, "help": self.help, "labelnames": list(self.labelnames),
+                    "samples": [[list(k), v] for k, v in self._values.items()]}
+
+
+class Counter(_Metric):
+    """Monotonic count, summed across workers."""
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        self._changed()
+
+
+class Gauge(_Metric):
+    """Point-in-time value. mode="last" reports the most recently set value across
+    live workers, mode="sum" adds live workers' values."""
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labelnames=(), mode="last"):
+        super().__init__(name, help_text, labelnames)
+        self.mode = mode
+
+    def set(self, value, **labels):
+        with _lock:
+            self._values[self._key(labels)] = [value, time.time()]
+        self._changed()
+
+    def snapshot(self):
+        data = super().snapshot()
+        data["mode"] = self.mode
+        return data
+
+
+class Histogram(_Metric):
+    """Bucketed observations (e.g. latency in seconds), summed across workers."""
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry["buckets"][i] += 1
+            entry["sum"] += value
+            entry["count"] += 1
+        self._changed()
+
+    def snapshot(self):
+        data = super().snapshot()
+        data["buckets"] = list(self.buckets)
+        with _lock:
+            data["samples"] = [[list(k), dict(v, buckets=list(v["buckets"]))] for k, v in self._values.items()]
+        return data
+
+
+def _register(cls, name, *args, **kwargs):
+    with _lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = cls(name, *args, **kwargs)
+    return metric
+
+
+def counter(name, help_text, labelnames=()):
+    return _register(Counter, name, help_text, labelnames)
+
+
+def gauge(name, help_text, labelnames=(), mode="last"):
+    return _register(Gauge, name, help_text, labelnames, mode=mode)
+
+
+def histogram(name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram, name, help_text, labelnames, buckets=buckets)
+
+
+# ─── Snapshots ──────────────────────────────────────────────────────
+
+def flush():
+    """Write this process's metrics snapshot for the other workers to read."""
+    _dirty.clear()
+    snapshot = {"pid": os.getpid(), "metrics": {name: m.snapshot() for name, m in list(_metrics.items())}}
+    directory = get_metrics_dir()
+    path = os.path.join(directory, f"metrics_{os.getpid()}.json")
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Error writing metrics snapshot: {e}")
+
+
+def _run():
+    while True:
+        _dirty.wait()
+        time.sleep(FLUSH_INTERVAL)
+        flush()
+
+
+def _ensure_flusher():
+    """Start the snapshot thread once per process (gunicorn workers fork after import)."""
+    global _flusher, _flusher_pid
+    if _flusher is not None and _flusher_pid == os.getpid():
+        return
+    with _lock:
+        if _flusher is None or _flusher_pid != os.getpid():
+            _flusher = threading.Thread(target=_run, name="metrics-flush", daemon=True)
+            _flusher_pid = os.getpid()
+            _flusher.start()
+
+
+atexit.register(lambda: _dirty.is_set() and flush())
+
+
+def _reset_after_fork():
+    """A forked worker starts from zero; the parent's counts stay in the parent's snapshot."""
+    global _lock
+    _lock = threading.Lock()
+    _dirty.clear()
+    for metric in _metrics.values():
+        metric._values = {}
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+        return True
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+
+
+def _load_snapshots():
+    flush()
+    snapshots = []
+    directory = get_metrics_dir()
+    for name in os.listdir(directory):
+        if not (name.startswith("metrics_") and name.endswith(".json")):
+            continue
+        try:
+            with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return snapshots
+
+
+def collect():
+    """Merge every worker's snapshot. Returns {name: {type, help, labelnames, samples: {labels: value}}}."""
+    merged = {}
+    for snap in _load_snapshots():
+        alive = _pid_alive(snap.get("pid"))
+        for name, data in snap.get("metrics", {}).items():
+            kind = data["type"]
+            if kind == "gauge" and not alive:
+                continue
+            out = merged.setdefault(name, {**{k: v for k, v in data.items() if k != "samples"}, "samples": {}})
+            for labels, value in data["samples"]:
+                key = tuple(labels)
+                current = out["samples"].get(key)
+                if kind == "counter":
+                    out["samples"][key] = (current or 0) + value
+                elif kind == "histogram":
+                    if current is None:
+                        out["samples"][key] = dict(value, buckets=list(value["buckets"]))
+                    else:
+                        current["buckets"] = [a + b for a, b in zip(current["buckets"], value["buckets"])]
+                        current["sum"] += value["sum"]
+                        current["count"] += value["count"]
+                elif data.get("mode") == "sum":
+                    out["samples"][key] = [(current or [0, 0])[0] + value[0], max((current or [0, 0])[1], value[1])]
+                elif current is None or value[1] > current[1]:
+                    out["samples"][key] = value
+    return merged
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in pairs) + "}"
+
+
+def _num(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus():
+    """All workers' metrics in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for name, data in sorted(collect().items()):
+        kind, names = data["type"], data["labelnames"]
+        metric_name = f"{name}_total" if kind == "counter" and not name.endswith("_total") else name
+        lines.append(f"# HELP {metric_name} {data['help']}")
+        lines.append(f"# TYPE {metric_name} {kind}")
+        for key, value in sorted(data["samples"].items()):
+            if kind == "counter":
+                lines.append(f"{metric_name}{_labels(names, key)} {_num(value)}")
+            elif kind == "gauge":
+                lines.append(f"{metric_name}{_labels(names, key)} {_num(value[0])}")
+            else:
+                for bound, count in zip(data["buckets"] + [float("inf")], value["buckets"] + [value["count"]]):
+                    lines.append(f"{name}_bucket{_labels(names, key, ('le', _num(bound)))} {count}")
+                lines.append(f"{name}_sum{_labels(names, key)} {_num(value['sum'])}")
+                lines.append(f"{name}_count{_labels(names, key)} {value['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def clear_snapshots():
+    """Remove all snapshot files (called by gunicorn when the server starts)."""
+    directory = get_metrics_dir()
+    for name in os.listdir(directory):
+        if name.startswith("metrics_"):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+# ─── Application metrics ────────────────────────────────────────────
+
+REQUEST_SECONDS = histogram("http_request_duration_seconds", "Request latency by endpoint", ("endpoint", "method"))
+LLM_CALLS = counter("llm_calls", "LLM API calls", ("model", "purpose", "outcome"))
+LLM_TOKENS = counter("llm_tokens", "LLM tokens used", ("model", "purpose", "kind"))
+GITHUB_REQUESTS = counter("github_api_requests", "GitHub API requests", ("status",))
+GITHUB_RATE_REMAINING = gauge("github_rate_limit_remaining", "Requests left in the GitHub rate-limit window",
+                              ("client",))
+CACHE_REQUESTS = counter("cache_requests", "Cache lookups", ("cache", "result"))
+SMTP_SENDS = counter("smtp_sends", "SMTP send attempts", ("service", "outcome"))
+TRACKER_ROWS = counter("tracker_rows_written", "Rows appended to tracker files", ("status",))
+TRACKER_UPDATES = counter("tracker_status_updates", "Tracker rows whose status was updated", ("status",))
+SHEETS_APPENDS = counter("sheets_appends", "Google Sheets row appends", ("outcome",))
+WORKING_SET_EVICTIONS = counter("working_set_evictions", "Users dropped from the in-process working set",
+                                ("reason",))
+WORKING_SET_USERS = gauge("working_set_users", "Users held in the in-process working set", mode="sum")
+WORKING_SET_BYTES = gauge("working_set_bytes", "Estimated size of the in-process working set", mode="sum")
+
+
+def record_llm_call(model, purpose, response=None, error=False):
+    """Count one chat completion and its token usage."""
+    LLM_CALLS.inc(model=model, purpose=purpose, outcome="error" if error else "ok")
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        LLM_TOKENS.inc(getattr(usage, "prompt_tokens", 0) or 0, model=model, purpose=purpose, kind="prompt")
+        LLM_TOKENS.inc(getattr(usage, "completion_tokens", 0) or 0, model=model, purpose=purpose,
+                       kind="completion")
+
+
+def init_app(app):
+    """Time every request and serve /metrics."""
+    from flask import g, request, Response
+
+    @app.before_request
+    def _start_request_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        start = g.pop("_metrics_start", None)
+        if start is not None and request.endpoint != "metrics":
+            REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=request.endpoint or "unknown",
+                                    method=request.method)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(render_prometheus(), mimetype="text/plain; version=0.0.4; charset=utf-8")
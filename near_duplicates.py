@@ -0,0 +1,145 @@
+"""
+Near Duplicates Module
+Handles: MinHash signatures of job descriptions and a per-user LSH index
+over them, to recognize a posting the user has already seen: the same text
+pasted again, or a repost from another board with slight edits.
+
+Each JD is reduced to word 3-shingles, and NUM_PERM min-hashes estimate
+the Jaccard similarity of two JDs. The signature is split into BANDS bands
+of ROWS rows; two JDs become candidates when any band is identical (likely
+from a similarity of about 0.5 up, near certain from 0.7), and a candidate
+is a duplicate when its estimated similarity reaches DUPLICATE_THRESHOLD. The
+bands are indexed in the user's store, so a lookup is a few indexed rows
+regardless of how many postings the user has seen.
+
+Each indexed posting keeps the draft generated for it and, once sent, the
+tracker row of the application. Applications that were not linked when sent
+(imported from old trackers, or sent before the posting was indexed) are
+found in the tracker by the draft's recipient and role on lookup. Postings
+are indexed from /generate, because the raw JD text is not kept anywhere
+else.
+"""
+import re
+import zlib
+import importlib.util
+
+import metrics
+import user_store
+from tracing import span
+
+# numpy is imported on first use to keep start-up fast
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+DUPLICATE_THRESHOLD = 0.7
+# Fixed seed: signatures are stored, so every process must use the same permutations
+SEED = 1
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9+#]*")
+_permutations = None
+
+
+def _get_permutations():
+    global _permutations
+    if _permutations is None:
+        import numpy as np
+        rng = np.random.RandomState(SEED)
+        a = rng.randint(1, 1 << 31, size=NUM_PERM, dtype=np.uint64)
+        b = rng.randint(0, 1 << 31, size=NUM_PERM, dtype=np.uint64)
+        _permutations = (a, b)
+    return _permutations
+
+
+def shingles(text):
+    """Hashes of the word 3-grams of `text` (lowercased, punctuation ignored)."""
+    words = _WORD_RE.findall((text or "").lower())
+    if len(words) < SHINGLE_SIZE:
+        words = words and [" ".join(words)]
+        return {zlib.crc32(w.encode("utf-8")) for w in words}
+    return {zlib.crc32(" ".join(words[i:i + SHINGLE_SIZE]).encode("utf-8"))
+            for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def signature(text):
+    """MinHash signature (NUM_PERM uint32 values), or None for an empty text or without NumPy."""
+    if not HAS_NUMPY:
+        return None
+    hashes = shingles(text)
+    if not hashes:
+        return None
+    import numpy as np
+    a, b = _get_permutations()
+    x = np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+    # (a * x + b) mod p stays below 2**63: a, b < 2**31 and x < 2**32
+    permuted = (np.outer(x, a) + b) % _MERSENNE_PRIME & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def band_buckets(sig):
+    """The (band, bucket) keys of a signature for the LSH index."""
+    rows = sig.reshape(BANDS, ROWS)
+    return [(band, zlib.crc32(rows[band].tobytes())) for band in range(BANDS)]
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of the two JDs."""
+    import numpy as np
+    return float(np.count_nonzero(sig_a == sig_b)) / NUM_PERM
+
+
+def find(user_id, sig):
+    """
+    The most similar posting the user has seen, if at least
+    DUPLICATE_THRESHOLD similar: {sha256, similarity, seen_at, draft,
+    applied_at, status}. None otherwise.
+    """
+    if sig is None:
+        return None
+    import numpy as np
+    try:
+        with span("jd.near_duplicates") as s:
+            best, best_score = None, 0.0
+            candidates = user_store.find_postings(user_id, band_buckets(sig))
+            for sha256, stored in candidates:
+                score = similarity(sig, np.frombuffer(stored, dtype=np.uint32))
+                if score > best_score:
+                    best, best_score = sha256, score
+            s.set(candidates=len(candidates), similarity=round(best_score, 3))
+        if best is None or best_score < DUPLICATE_THRESHOLD:
+            metrics.CACHE_REQUESTS.inc(cache="jd_duplicate", result="miss")
+            return None
+        metrics.CACHE_REQUESTS.inc(cache="jd_duplicate", result="hit")
+        posting = user_store.get_posting(user_id, best)
+        draft = posting and posting["draft"]
+        if draft and posting["applied_at"] is None and user_store.link_posting_to_tracker(
+                user_id, best, draft.get("recruiter_email"), draft.get("job_title"), draft.get("company")):
+            posting = user_store.get_posting(user_id, best)
+        return dict(posting, similarity=best_score) if posting else None
+    except Exception as e:
+        print(f"Error looking up similar postings: {e}")
+        return None
+
+
+def remember(user_id, sha256, sig, draft=None):
+    """Index a posting (by its jd_analyzer.jd_hash) with the draft generated for it."""
+    if sig is None:
+        return
+    try:
+        user_store.save_posting(user_id, sha256, sig.tobytes(), band_buckets(sig), draft=draft)
+    except Exception as e:
+        print(f"Error indexing posting: {e}")
+
+
+def mark_applied(user_id, sha256, application_id=None, outbox_id=None):
+    """Link a posting to the tracker row of the application sent for it."""
+    if not sha256:
+        return
+    try:
+        user_store.link_posting(user_id, sha256, application_id=application_id, outbox_id=outbox_id)
+    except Exception as e:
+        print(f"Error linking posting to application: {e}")
@@ -0,0 +1,357 @@
+"""
+Outbox Module
+Handles: durable queuing of outgoing application emails and their delivery
+in a background thread, with retries and per-provider throttling.
+
+Jobs (recipient, subject, body, resume, tracker details) live in a SQLite
+outbox database, so an application survives a crash or a slow mail
+server. SMTP credentials are never written to disk: they are held
+in memory by the process that queued the job, and a job whose process died
+before delivery is marked failed so the user can send it again.
+
+A job's owner is a per-process token ("<pid>-<random>"), registered in the
+`workers` table under its PID. A process that starts with a reused PID
+(containers restart workers with the same small PIDs) replaces that
+registration, so jobs of the earlier process are recognized as orphaned.
+"""
+import os
+import time
+import uuid
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import user_store
+from outlook_sender import send_smtp_email, get_resume_attachment
+from utils import save_application, update_tracker_status
+
+# Provider sending limits (per account): spacing between messages and a rolling daily cap
+PROVIDER_LIMITS = {
+    "gmail": {"per_minute": 20, "per_day": 500},
+    "outlook": {"per_minute": 30, "per_day": 10000},
+}
+MAX_ATTEMPTS = 3
+RETRY_DELAYS = [30, 120]  # seconds before attempt 2 and 3
+# A new job is held this long while its tracker row is written, then released
+ENQUEUE_HOLD = 3600
+
+_credentials = {}
+_lock = threading.Lock()
+_wakeup = threading.Event()
+_worker = None
+_worker_pid = None
+_schema_ready = set()
+_owner = None
+_owner_pid = None
+_owner_lock = threading.Lock()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    subject TEXT,
+    body TEXT,
+    resume_path TEXT,
+    resume_name TEXT,
+    job_title TEXT,
+    service TEXT NOT NULL,
+    email_user TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    owner TEXT,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    sent_at REAL
+);
+CREATE INDEX IF NOT EXISTS outbox_user ON outbox (user_id, id);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+CREATE TABLE IF NOT EXISTS workers (
+    pid INTEGER PRIMARY KEY,
+    owner TEXT NOT NULL,
+    started_at REAL NOT NULL
+);
+"""
+
+
+def get_outbox_path():
+    """Returns the path of the outbox database, in the data root shared with the user stores."""
+    data_dir = user_store.get_data_root()
+    os.makedirs(data_dir, exist_ok=True)
+    return os.path.join(data_dir, "outbox.sqlite3")
+
+
+def _connect():
+    path = get_outbox_path()
+    conn = sqlite3.connect(path, timeout=10)
+    conn.row_factory = sqlite3.Row
+    if os.path.abspath(path) not in _schema_ready:
+        # /home/data on Azure is an SMB share, where WAL's shared-memory index doesn't work
+        conn.execute("PRAGMA journal_mode=DELETE" if os.getenv('WEBSITE_SITE_NAME') else "PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        # Outboxes created before owner tokens only have owner_pid
+        if "owner" not in {row["name"] for row in conn.execute("PRAGMA table_info(outbox)")}:
+            conn.execute("ALTER TABLE outbox ADD COLUMN owner TEXT")
+        _schema_ready.add(os.path.abspath(path))
+    if _owner_pid != os.getpid():
+        _register(conn)
+    return conn
+
+
+def _register(conn):
+    """Give this process its owner token and claim its PID in `workers`."""
+    global _owner, _owner_pid
+    with _owner_lock:
+        if _owner_pid == os.getpid():
+            return
+        owner = f"{os.getpid()}-{uuid.uuid4().hex}"
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO workers (pid, owner, started_at) VALUES (?, ?, ?)",
+                         (os.getpid(), owner, time.time()))
+        _owner, _owner_pid = owner, os.getpid()
+
+
+def register_process():
+    """Claim this process's PID now (gunicorn post_fork), rather than on its first outbox access."""
+    with _db():
+        pass
+
+
+@contextmanager
+def _db():
+    """Connection that commits on success and is always closed."""
+    conn = _connect()
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _provider(service):
+    return "gmail" if (service or "").lower() == "gmail" else "outlook"
+
+
+def enqueue(user_id, recipient, subject, body, resume_path, resume_name, job_title,
+            service, email_user, email_pass, company=None):
+    """
+    Store an email in the outbox, record it in the tracker as Queued, and wake
+    the worker. Returns the job id, or None (nothing queued) if the tracker
+    row could not be written.
+    """
+    now = time.time()
+    # Held until the tracker row exists, so the worker can't finish the job before there is a row to update
+    with _db() as conn:
+        cur = conn.execute(
+            "INSERT INTO outbox (user_id, recipient, subject, body, resume_path, resume_name, job_title,"
+            " service, email_user, status, owner, next_attempt_at, created_at, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'queued', ?, ?, ?, ?)",
+            (user_id, recipient, subject, body, resume_path, resume_name, job_title,
+             _provider(service), email_user, _owner, now + ENQUEUE_HOLD, now, now))
+        job_id = cur.lastrowid
+    with _lock:
+        _credentials[job_id] = email_pass
+
+    row_id = None
+    try:
+        row_id = save_application(job_title, recipient, user_id=user_id, status="Queued", outbox_id=job_id,
+                                  company=company)
+    finally:
+        with _db() as conn:
+            if row_id:
+                conn.execute("UPDATE outbox SET next_attempt_at = ? WHERE id = ?", (time.time(), job_id))
+            else:
+                # Without a tracker row the send would go untracked: drop the job, nothing is sent
+                conn.execute("DELETE FROM outbox WHERE id = ?", (job_id,))
+        if not row_id:
+            with _lock:
+                _credentials.pop(job_id, None)
+    if not row_id:
+        return None
+
+    _ensure_worker()
+    _wakeup.set()
+    return job_id
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+
+
+def _owner_alive(conn, owner):
+    """Whether the process that queued a job is still running (a reused PID doesn't count)."""
+    if not owner:
+        return False
+    if owner == _owner:
+        return True
+    try:
+        pid = int(owner.split("-", 1)[0])
+    except ValueError:
+        return False
+    row = conn.execute("SELECT owner FROM workers WHERE pid = ?", (pid,)).fetchone()
+    return row is not None and row["owner"] == owner and _pid_alive(pid)
+
+
+def _job_dict(row):
+    return {
+        "id": row["id"],
+        "recipient": row["recipient"],
+        "job_title": row["job_title"],
+        "service": row["service"],
+        "status": row["status"],
+        "attempts": row["attempts"],
+        "error": row["error"],
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+        "sent_at": row["sent_at"],
+    }
+
+
+def _fail_orphans(conn, rows):
+    """Jobs still pending whose owning process is gone can no longer be delivered."""
+    result = []
+    for row in rows:
+        if row["status"] in ("queued", "sending") and not _owner_alive(conn, row["owner"]):
+            _finish(conn, row, "failed", "Interrupted by a server restart. Please send it again.")
+            row = conn.execute("SELECT * FROM outbox WHERE id = ?", (row["id"],)).fetchone()
+        result.append(row)
+    return result
+
+
+def get_job(user_id, job_id):
+    """Returns one of the user's outbox jobs as a dict, or None."""
+    with _db() as conn:
+        rows = conn.execute("SELECT * FROM outbox WHERE id = ? AND user_id = ?", (job_id, user_id)).fetchall()
+        rows = _fail_orphans(conn, rows)
+    return _job_dict(rows[0]) if rows else None
+
+
+def list_jobs(user_id, limit=10):
+    """Returns the user's most recent outbox jobs, newest first."""
+    with _db() as conn:
+        rows = conn.execute("SELECT * FROM outbox WHERE user_id = ? ORDER BY id DESC LIMIT ?",
+                            (user_id, limit)).fetchall()
+        rows = _fail_orphans(conn, rows)
+    return [_job_dict(r) for r in rows]
+
+
+def _finish(conn, row, status, error=None):
+    now = time.time()
+    conn.execute("UPDATE outbox SET status = ?, error = ?, updated_at = ?, sent_at = ? WHERE id = ?",
+                 (status, error, now, now if status == "sent" else None, row["id"]))
+    conn.commit()
+    with _lock:
+        _credentials.pop(row["id"], None)
+    update_tracker_status(row["user_id"], row["id"], "Sent" if status == "sent" else "Failed",
+                          job_title=row["job_title"], email_address=row["recipient"])
+
+
+def _throttle_delay(conn, row):
+    """
+    Seconds to wait before this account may send again under its provider's
+    limits. Both limits come from the outbox table, so they hold across
+    worker processes.
+    """
+    limits = PROVIDER_LIMITS[row["service"]]
+    now = time.time()
+
+    day_ago = now - 86400
+    sent_today = conn.execute(
+        "SELECT COUNT(*), MIN(sent_at) FROM outbox WHERE service = ? AND email_user = ? AND status = 'sent'"
+        " AND sent_at > ?", (row["service"], row["email_user"], day_ago)).fetchone()
+    if sent_today[0] >= limits["per_day"]:
+        return sent_today[1] + 86400 - now
+
+    # A message being sent right now counts from when its attempt started
+    interval = 60.0 / limits["per_minute"]
+    last_send = conn.execute(
+        "SELECT MAX(CASE WHEN status = 'sending' THEN updated_at ELSE sent_at END) FROM outbox"
+        " WHERE service = ? AND email_user = ? AND (status = 'sending' OR (status = 'sent' AND sent_at > ?))",
+        (row["service"], row["email_user"], now - interval)).fetchone()[0]
+    return max(0.0, (last_send or 0.0) + interval - now)
+
+
+def _deliver(conn, row):
+    with _lock:
+        password = _credentials.get(row["id"])
+    if password is None:
+        _finish(conn, row, "failed", "Credentials are no longer available. Please send it again.")
+        return
+
+    # Check the limits and claim the send in one write transaction, so workers can't both pass the check
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    delay = _throttle_delay(conn, row)
+    if delay > 0:
+        conn.execute("UPDATE outbox SET next_attempt_at = ?, updated_at = ? WHERE id = ?",
+                     (time.time() + delay, time.time(), row["id"]))
+        return
+
+    attempts = row["attempts"] + 1
+    conn.execute("UPDATE outbox SET status = 'sending', attempts = ?, updated_at = ? WHERE id = ?",
+                 (attempts, time.time(), row["id"]))
+    conn.commit()
+
+    try:
+        attachment = get_resume_attachment(row["resume_path"], row["resume_name"])
+    except OSError as e:
+        _finish(conn, row, "failed", f"Resume not found: {e}")
+        return
+
+    success, msg = send_smtp_email(row["recipient"], row["subject"], row["body"], None,
+                                   row["resume_name"], row["email_user"], password, row["service"],
+                                   attachment_part=attachment)
+    if success:
+        _finish(conn, row, "sent")
+    elif msg.startswith("SMTP Auth Error") or attempts >= MAX_ATTEMPTS:
+        _finish(conn, row, "failed", msg)
+    else:
+        retry_at = time.time() + RETRY_DELAYS[min(attempts, len(RETRY_DELAYS)) - 1]
+        conn.execute("UPDATE outbox SET status = 'queued', error = ?, next_attempt_at = ?, updated_at = ?"
+                     " WHERE id = ?", (msg, retry_at, time.time(), row["id"]))
+
+
+def process_due_jobs():
+    """Deliver every due job owned by this process. Returns seconds until the next one is due, or None."""
+    with _db() as conn:
+        rows = conn.execute("SELECT * FROM outbox WHERE owner = ? AND status = 'queued'"
+                            " AND next_attempt_at <= ? ORDER BY id", (_owner, time.time())).fetchall()
+        for row in rows:
+            try:
+                _deliver(conn, row)
+            except Exception as e:
+                print(f"Outbox delivery error for job {row['id']}: {e}")
+                _finish(conn, row, "failed", str(e))
+            conn.commit()
+        nxt = conn.execute("SELECT MIN(next_attempt_at) FROM outbox WHERE owner = ? AND status = 'queued'",
+                           (_owner,)).fetchone()[0]
+    return None if nxt is None else max(0.0, nxt - time.time())
+
+
+def _run():
+    while True:
+        try:
+            wait = process_due_jobs()
+        except Exception as e:
+            print(f"Outbox worker error: {e}")
+            wait = 5.0
+        _wakeup.wait(timeout=wait if wait is not None else 60.0)
+        _wakeup.clear()
+
+
+def _ensure_worker():
+    """Start the delivery thread once per process (gunicorn workers fork after import)."""
+    global _worker, _worker_pid
+    with _lock:
+        if _worker is None or not _worker.is_alive() or _worker_pid != os.getpid():
+            _worker = threading.Thread(target=_run, name="outbox-delivery", daemon=True)
+            _worker_pid = os.getpid()
+            _worker.start()
@@ -1,8 +1,19 @@
+import io
 import smtplib
+import email.policy
+from collections import OrderedDict
+from email.generator import BytesGenerator
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.application import MIMEApplication
 import os
+import time
+import atexit
+import hashlib
+import threading
+
+from tracing import span
+from metrics import CACHE_REQUESTS, SMTP_SENDS
 
 # Try importing pywin32 modules, handle failure gracefully
 try:
@@ -66,9 +77,208 @@ def send_email_via_local_outlook(to_email, subject, body, attachment_path=None):
              return False, "Outlook is running with different permissions than this script.\n1. Close Outlook.\n2. Re-open Outlook normally (NOT as Admin).\n3. If VS Code is running as Admin, restart it normally."
         return False, f"Local Outlook Error: {e}. Make sure Outlook is open."
 
-def send_smtp_email(to_email, subject, body, attachment_bytes, attachment_name, sender_email, sender_password, service="outlook"):
+class SMTPConnectionPool:
+    """
+    Keeps authenticated SMTP sessions alive per (server, port, account) so
+    consecutive sends skip the connect/STARTTLS/login handshake.
+
+    Idle sessions are checked with NOOP before reuse once they have been idle
+    for `health_check_after` seconds, dropped after `idle_timeout` seconds or
+    `max_messages` sends, and a send that fails on a reused session because the
+    server hung up is retried once on a fresh connection.
+    """
+
+    def __init__(self, max_idle_per_key=2, idle_timeout=120, health_check_after=15, max_messages=50, timeout=30):
+        self.max_idle_per_key = max_idle_per_key
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self.max_messages = max_messages
+        self.timeout = timeout
+        self._idle = {}
+        self._lock = threading.Lock()
+        self.stats = {"connects": 0, "reuses": 0, "reconnects": 0, "sends": 0}
+
+    @staticmethod
+    def _secret(password):
+        return hashlib.sha256((password or "").encode("utf-8")).hexdigest()
+
+    def _connect(self, server, port, user, password, starttls):
+        conn = smtplib.SMTP(server, port, timeout=self.timeout)
+        try:
+            if starttls:
+                conn.starttls()
+            if password:
+                conn.login(user, password)
+        except Exception:
+            self._close(conn)
+            raise
+        self.stats["connects"] += 1
+        return {"conn": conn, "secret": self._secret(password), "last_used": time.monotonic(), "sent": 0}
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.quit()
+        except Exception:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _healthy(self, entry):
+        idle = time.monotonic() - entry["last_used"]
+        if idle > self.idle_timeout or entry["sent"] >= self.max_messages:
+            return False
+        if idle < self.health_check_after:
+            return True
+        try:
+            return entry["conn"].noop()[0] == 250
+        except Exception:
+            return False
+
+    def _checkout(self, key, password):
+        """Pop a healthy idle session for `key`, closing stale ones. Returns entry or None."""
+        secret = self._secret(password)
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                entry = idle.pop() if idle else None
+            if entry is None:
+                return None
+            if entry["secret"] == secret and self._healthy(entry):
+                self.stats["reuses"] += 1
+                return entry
+            self._close(entry["conn"])
+
+    def _checkin(self, key, entry):
+        entry["last_used"] = time.monotonic()
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_key:
+                idle.append(entry)
+                return
+        self._close(entry["conn"])
+
+    def send(self, server, port, user, password, from_addr, to_addrs, message, starttls=True):
+        """Send one message over a pooled session."""
+        key = (server, port, user)
+        entry = self._checkout(key, password)
+        reused = entry is not None
+        if entry is None:
+            entry = self._connect(server, port, user, password, starttls)
+        try:
+            entry["conn"].sendmail(from_addr, to_addrs, message)
+        except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+            self._close(entry["conn"])
+            if not reused:
+                raise
+            # The pooled session went stale between the health check and the send
+            print(f"SMTP session to {server} dropped ({e}), reconnecting.")
+            self.stats["reconnects"] += 1
+            entry = self._connect(server, port, user, password, starttls)
+            try:
+                entry["conn"].sendmail(from_addr, to_addrs, message)
+            except Exception:
+                self._close(entry["conn"])
+                raise
+        except Exception:
+            self._close(entry["conn"])
+            raise
+        entry["sent"] += 1
+        self.stats["sends"] += 1
+        self._checkin(key, entry)
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for entries in idle.values():
+            for entry in entries:
+                self._close(entry["conn"])
+
+
+smtp_pool = SMTPConnectionPool()
+atexit.register(smtp_pool.close_all)
+
+
+# Resume attachments are base64-encoded once and reused for every send of the same file
+ATTACHMENT_CACHE_SIZE = 32
+# Resume blobs are content-addressed, so a path's content never changes; this only bounds memory
+ATTACHMENT_FILES_SIZE = 256
+_attachment_cache = OrderedDict()   # (sha256, name) -> MIMEApplication part
+_attachment_files = OrderedDict()   # path -> (mtime, size, sha256)
+_attachment_lock = threading.Lock()
+
+# Serialize with CRLF line endings so smtplib sends the bytes as-is
+_SMTP_POLICY = email.policy.compat32.clone(linesep="\r\n")
+
+
+def _build_attachment(attachment_bytes, attachment_name):
+    part = MIMEApplication(attachment_bytes, Name=attachment_name)
+    part['Content-Disposition'] = f'attachment; filename="{attachment_name}"'
+    return part
+
+
+def get_resume_attachment(path, attachment_name=None):
+    """
+    Returns the encoded MIME part for the resume at `path`, reusing the cached
+    part while the file's mtime and size are unchanged. Parts are keyed by
+    content hash, so identical files share one encoding. Raises OSError if the
+    file is missing.
+    """
+    attachment_name = attachment_name or os.path.basename(path)
+    st = os.stat(path)
+    with _attachment_lock:
+        known = _attachment_files.get(path)
+        if known and known[:2] == (st.st_mtime, st.st_size):
+            _attachment_files.move_to_end(path)
+            part = _attachment_cache.get((known[2], attachment_name))
+            if part is not None:
+                _attachment_cache.move_to_end((known[2], attachment_name))
+                CACHE_REQUESTS.inc(cache="resume_attachment", result="hit")
+                return part
+    CACHE_REQUESTS.inc(cache="resume_attachment", result="miss")
+
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    key = (digest, attachment_name)
+    with _attachment_lock:
+        _attachment_files[path] = (st.st_mtime, st.st_size, digest)
+        _attachment_files.move_to_end(path)
+        while len(_attachment_files) > ATTACHMENT_FILES_SIZE:
+            _attachment_files.popitem(last=False)
+        part = _attachment_cache.get(key)
+        if part is None:
+            part = _build_attachment(data, attachment_name)
+            _attachment_cache[key] = part
+            while len(_attachment_cache) > ATTACHMENT_CACHE_SIZE:
+                _attachment_cache.popitem(last=False)
+        _attachment_cache.move_to_end(key)
+    return part
+
+
+def build_message_bytes(sender_email, to_email, subject, body, attachment_part=None):
+    """Assemble the message around an (optionally cached) attachment part and serialize it once to bytes."""
+    msg = MIMEMultipart()
+    msg['From'] = sender_email
+    msg['To'] = to_email
+    msg['Subject'] = subject
+
+    msg.attach(MIMEText(body, 'plain'))
+    if attachment_part is not None:
+        msg.attach(attachment_part)
+
+    out = io.BytesIO()
+    BytesGenerator(out, mangle_from_=False, policy=_SMTP_POLICY).flatten(msg)
+    return out.getvalue()
+
+
+def send_smtp_email(to_email, subject, body, attachment_bytes, attachment_name, sender_email, sender_password,
+                    service="outlook", attachment_part=None):
     """
     Sends an email using SMTP server (Outlook or Gmail).
+    Authenticated sessions are reused across calls through `smtp_pool`.
+    Pass `attachment_part` (see get_resume_attachment) to reuse a pre-encoded attachment.
     """
     if service.lower() == "gmail":
         smtp_server = "smtp.gmail.com"
@@ -76,33 +286,29 @@ def send_smtp_email(to_email, subject, body, attachment_bytes, attachment_name,
     else:
         smtp_server = "smtp.office365.com"
         smtp_port = 587
+    # SMTP_HOST / SMTP_PORT override the provider's server (e.g. for a local stub)
+    smtp_server = os.environ.get("SMTP_HOST", smtp_server)
+    smtp_port = int(os.environ.get("SMTP_PORT", smtp_port))
+    starttls = os.environ.get("SMTP_STARTTLS", "1") != "0"
     
     if not sender_email or not sender_password:
         return False, f"Error: {service} credentials not provided."
 
     try:
-        msg = MIMEMultipart()
-        msg['From'] = sender_email
-        msg['To'] = to_email
-        msg['Subject'] = subject
-
-        msg.attach(MIMEText(body, 'plain'))
-
-        if attachment_bytes and attachment_name:
-            part = MIMEApplication(attachment_bytes, Name=attachment_name)
-            part['Content-Disposition'] = f'attachment; filename="{attachment_name}"'
-            msg.attach(part)
-
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        server.login(sender_email, sender_password)
-        text = msg.as_string()
-        server.sendmail(sender_email, to_email, text)
-        server.quit()
+        if attachment_part is None and attachment_bytes and attachment_name:
+            attachment_part = _build_attachment(attachment_bytes, attachment_name)
+
+        message = build_message_bytes(sender_email, to_email, subject, body, attachment_part)
+        with span("smtp.send", service=service.lower(), bytes=len(message)):
+            smtp_pool.send(smtp_server, smtp_port, sender_email, sender_password, sender_email, to_email, message,
+                           starttls=starttls)
+        SMTP_SENDS.inc(service=service.lower(), outcome="sent")
         return True, "Email sent successfully!"
     except smtplib.SMTPAuthenticationError as e:
+        SMTP_SENDS.inc(service=service.lower(), outcome="auth_error")
         return False, f"SMTP Auth Error: {e.smtp_error}\nHint: Use an App Password if 2FA is on."
     except Exception as e:
+        SMTP_SENDS.inc(service=service.lower(), outcome="error")
         return False, f"SMTP Error: {e}"
 
 def send_email_via_outlook(to_email, subject, body, attachment_bytes, attachment_name, sender_email=None, sender_password=None):
@@ -0,0 +1,213 @@
+"""
+Project Features Module
+Handles: precomputing compact per-repository feature arrays at sync time
+and ranking them with vectorized NumPy BM25 at generate time.
+
+Layout of a features directory (`<user dir>/features-<version>/`, see
+github_export.save_features):
+    meta.json           small header (profile URL, counts, language tags)
+    vocab.npy           sorted term vocabulary (term ID = position)
+    df.npy              document frequency per term ID
+    indptr.npy          CSR row pointers, one row per repository
+    doc_ids.npy         repository ID of every (term, tf) entry
+    term_ids.npy        term IDs, grouped by repository
+    tfs.npy             field-weighted term frequencies
+    doc_lens.npy        field-weighted document lengths
+    lang_ids.npy        language tag ID per repository (-1 if none)
+    topic_ptr.npy       CSR row pointers into topic_ids.npy
+    topic_ids.npy       topic tag IDs, grouped by repository
+    records.jsonl       one project per line (name, url, summary, ...)
+    offsets.npy         byte offset of each line in records.jsonl
+
+All .npy files are memory-mapped on load, so ranking never re-parses
+the projects cache and only the top-k records are read from disk.
+"""
+import os
+import json
+
+from project_index import BM25_K1, BM25_B, LANGUAGE_TAG_BONUS, tokenize, weighted_terms
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    np = None
+    HAS_NUMPY = False
+
+FEATURES_VERSION = 1
+FEATURES_DIRNAME = "features"
+
+
+def save_project_features(data_dir, projects, profile_url, scraped_at="", dirname=FEATURES_DIRNAME):
+    """Precompute feature arrays for `projects` under `data_dir/dirname`. Returns the path or None."""
+    if not HAS_NUMPY:
+        return None
+
+    features_dir = os.path.join(data_dir, dirname)
+    os.makedirs(features_dir, exist_ok=True)
+    projects = projects or []
+
+    doc_terms = [weighted_terms(p) for p in projects]
+    vocab = sorted({term for terms in doc_terms for term in terms})
+    term_to_id = {term: i for i, term in enumerate(vocab)}
+
+    languages = sorted({p.get("language") for p in projects if p.get("language")})
+    lang_to_id = {lang: i for i, lang in enumerate(languages)}
+    topics = sorted({t for p in projects for t in (p.get("topics") or [])})
+    topic_to_id = {topic: i for i, topic in enumerate(topics)}
+
+    indptr = [0]
+    doc_ids, term_ids, tfs, doc_lens = [], [], [], []
+    lang_ids, topic_ptr, topic_ids = [], [0], []
+    for doc_id, (project, terms) in enumerate(zip(projects, doc_terms)):
+        for term, tf in terms.items():
+            doc_ids.append(doc_id)
+            term_ids.append(term_to_id[term])
+            tfs.append(tf)
+        indptr.append(len(term_ids))
+        doc_lens.append(sum(terms.values()))
+        lang_ids.append(lang_to_id.get(project.get("language"), -1))
+        topic_ids.extend(topic_to_id[t] for t in (project.get("topics") or []))
+        topic_ptr.append(len(topic_ids))
+
+    term_ids = np.asarray(term_ids, dtype=np.int32)
+    arrays = {
+        "vocab": np.asarray(vocab, dtype=str) if vocab else np.zeros(0, dtype="<U1"),
+        "df": np.bincount(term_ids, minlength=len(vocab)).astype(np.int32),
+        "indptr": np.asarray(indptr, dtype=np.int32),
+        "doc_ids": np.asarray(doc_ids, dtype=np.int32),
+        "term_ids": term_ids,
+        "tfs": np.asarray(tfs, dtype=np.float32),
+        "doc_lens": np.asarray(doc_lens, dtype=np.float32),
+        "lang_ids": np.asarray(lang_ids, dtype=np.int16),
+        "topic_ptr": np.asarray(topic_ptr, dtype=np.int32),
+        "topic_ids": np.asarray(topic_ids, dtype=np.int32),
+    }
+
+    offsets = [0]
+    with open(os.path.join(features_dir, "records.jsonl"), "wb") as f:
+        for project in projects:
+            f.write(json.dumps(project, ensure_ascii=False).encode("utf-8") + b"\n")
+            offsets.append(f.tell())
+    arrays["offsets"] = np.asarray(offsets, dtype=np.int64)
+
+    for name, arr in arrays.items():
+        np.save(os.path.join(features_dir, f"{name}.npy"), arr)
+
+    doc_count = len(projects)
+    meta = {
+        "version": FEATURES_VERSION,
+        "profile_url": profile_url,
+        "scraped_at": scraped_at,
+        "doc_count": doc_count,
+        "avg_doc_len": float(sum(doc_lens) / doc_count) if doc_count else 0.0,
+        "languages": languages,
+        "topics": topics,
+    }
+    # meta.json is written last so a half-written feature set is never loaded
+    with open(os.path.join(features_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    return features_dir
+
+
+def load_project_features(data_dir, dirname=FEATURES_DIRNAME):
+    """Memory-map the feature arrays under `data_dir/dirname`. Returns ProjectFeatures or None."""
+    if not HAS_NUMPY:
+        return None
+    features_dir = os.path.join(data_dir, dirname)
+    meta_path = os.path.join(features_dir, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != FEATURES_VERSION:
+            return None
+        return ProjectFeatures(features_dir, meta)
+    except Exception as e:
+        print(f"Error loading project features: {e}")
+        return None
+
+
+class ProjectFeatures:
+    """Read-only view over a user's precomputed repository features."""
+
+    _ARRAYS = ("vocab", "df", "indptr", "doc_ids", "term_ids", "tfs", "doc_lens",
+               "lang_ids", "topic_ptr", "topic_ids", "offsets")
+
+    def __init__(self, features_dir, meta):
+        self.features_dir = features_dir
+        self.meta = meta
+        self.profile_url = meta.get("profile_url", "")
+        self.scraped_at = meta.get("scraped_at", "")
+        self.doc_count = meta.get("doc_count", 0)
+        for name in self._ARRAYS:
+            setattr(self, name, np.load(os.path.join(features_dir, f"{name}.npy"), mmap_mode="r"))
+
+    def _term_ids(self, tokens):
+        """Maps query tokens to vocabulary IDs with a vectorized binary search."""
+        if not tokens or not len(self.vocab):
+            return np.zeros(0, dtype=np.int32)
+        query = np.asarray(sorted(set(tokens)), dtype=str)
+        pos = np.searchsorted(self.vocab, query)
+        pos = np.minimum(pos, len(self.vocab) - 1)
+        return pos[self.vocab[pos] == query].astype(np.int32)
+
+    def scores(self, job_description):
+        """BM25 score of every repository for `job_description`, as a float array."""
+        scores = np.zeros(self.doc_count, dtype=np.float64)
+        if not self.doc_count:
+            return scores
+        tokens = tokenize(job_description)
+
+        query_ids = self._term_ids(tokens)
+        if len(query_ids):
+            mask = np.isin(self.term_ids, query_ids)
+            terms = self.term_ids[mask]
+            tf = self.tfs[mask].astype(np.float64)
+            docs = self.doc_ids[mask]
+            df = self.df[terms]
+            idf = np.log1p((self.doc_count - df + 0.5) / (df + 0.5))
+            avg_len = self.meta.get("avg_doc_len") or 1.0
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lens[docs] / avg_len)
+            contrib = idf * tf * (BM25_K1 + 1) / (tf + norm)
+            scores += np.bincount(docs, weights=contrib, minlength=self.doc_count)
+
+        token_set = set(tokens)
+        query_langs = [i for i, lang in enumerate(self.meta.get("languages", []))
+                       if lang.lower() in token_set]
+        if query_langs:
+            scores += LANGUAGE_TAG_BONUS * np.isin(self.lang_ids, query_langs)
+        return scores
+
+    def rank(self, job_description, top_n=3):
+        """Returns the IDs of the top_n repositories, best first, padded in original order."""
+        scores = self.scores(job_description)
+        top_n = min(top_n, self.doc_count)
+        matched = np.flatnonzero(scores > 0)
+        if len(matched) > top_n:
+            # Keep everything tied with the k-th best so ties still break by original order
+            kth = np.partition(scores[matched], len(matched) - top_n)[len(matched) - top_n]
+            matched = matched[scores[matched] >= kth]
+        matched = matched[np.lexsort((matched, -scores[matched]))]
+        ranked = [int(i) for i in matched[:top_n]]
+
+        if len(ranked) < top_n:
+            seen = set(ranked)
+            ranked += [i for i in range(self.doc_count) if i not in seen][:top_n - len(ranked)]
+        return ranked
+
+    def get_projects(self, doc_ids):
+        """Reads only the requested project records from records.jsonl."""
+        projects = []
+        with open(os.path.join(self.features_dir, "records.jsonl"), "rb") as f:
+            for doc_id in doc_ids:
+                f.seek(int(self.offsets[doc_id]))
+                projects.append(json.loads(f.readline().decode("utf-8")))
+        return projects
+
+    def top_projects(self, job_description, top_n=3):
+        """Ranks and loads the top_n projects for `job_description`."""
+        if not job_description:
+            return self.get_projects(range(min(top_n, self.doc_count)))
+        return self.get_projects(self.rank(job_description, top_n))
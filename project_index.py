@@ -0,0 +1,133 @@
+"""
+Project Index Module
+Handles: tokenizing GitHub project fields, building a BM25 inverted index
+at sync time, and ranking projects against a job description.
+"""
+import re
+import json
+import math
+import heapq
+import hashlib
+from collections import Counter
+
+INDEX_VERSION = 3
+
+# Per-field weights: a term in the repo name says more than one in a long summary
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "language": 2.0,
+    "topics": 2.0,
+    "description": 1.5,
+    "summary": 1.0,
+}
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Extra score for a repository whose primary language is named in the JD
+LANGUAGE_TAG_BONUS = 1.0
+
+_CAMEL_RE = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*")
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by can for from has have in into is it its of on or
+our that the their this to was we were will with you your using used use also
+""".split())
+
+
+def tokenize(text):
+    """Splits text (or a list of tags) into lowercase word tokens, camelCase and kebab-case aware."""
+    if not text:
+        return []
+    if isinstance(text, (list, tuple)):
+        text = " ".join(str(t) for t in text)
+    text = _CAMEL_RE.sub(" ", str(text)).lower()
+    return [t for t in _TOKEN_RE.findall(text) if t not in STOPWORDS]
+
+
+def weighted_terms(project):
+    """Returns {term: weighted term frequency} across all indexed fields."""
+    weighted = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+        for term, tf in Counter(tokenize(project.get(field))).items():
+            weighted[term] += tf * weight
+    return weighted
+
+
+def build_index(projects):
+    """
+    Builds an inverted index over name, description, language, topics and summary.
+
+    Returns a JSON-serializable dict; documents are referenced by their
+    position in `projects`.
+    """
+    postings = {}
+    doc_lens = []
+    for doc_id, project in enumerate(projects or []):
+        terms = weighted_terms(project)
+        doc_lens.append(round(sum(terms.values()), 3))
+        for term, wtf in terms.items():
+            postings.setdefault(term, []).append([doc_id, round(wtf, 3)])
+
+    doc_count = len(doc_lens)
+    return {
+        "version": INDEX_VERSION,
+        "doc_count": doc_count,
+        "avg_doc_len": (sum(doc_lens) / doc_count) if doc_count else 0.0,
+        "doc_lens": doc_lens,
+        "fingerprint": fingerprint(projects),
+        "languages": [p.get("language") for p in (projects or [])],
+        "postings": postings,
+    }
+
+
+def fingerprint(projects):
+    """Hash of the indexed fields of `projects`, in order (a re-summarized README changes it)."""
+    fields = [[p.get(field) for field in FIELD_WEIGHTS] for p in (projects or [])]
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def index_matches(index, projects):
+    """True if `index` was built from this exact list of projects."""
+    return (
+        bool(index)
+        and index.get("version") == INDEX_VERSION
+        and index.get("doc_count") == len(projects or [])
+        and index.get("fingerprint") == fingerprint(projects)
+    )
+
+
+def score(index, query):
+    """Scores every matching document for `query`. Returns {doc_id: score}."""
+    doc_count = index.get("doc_count", 0)
+    if not doc_count:
+        return {}
+    avg_len = index.get("avg_doc_len") or 1.0
+    doc_lens = index["doc_lens"]
+    postings = index["postings"]
+
+    scores = {}
+    tokens = set(tokenize(query))
+    for term in tokens:
+        plist = postings.get(term)
+        if not plist:
+            continue
+        df = len(plist)
+        idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+        for doc_id, tf in plist:
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lens[doc_id] / avg_len)
+            scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+    # Same bonus as the feature arrays (project_features), so both paths rank alike
+    for doc_id, language in enumerate(index.get("languages") or ()):
+        if language and language.lower() in tokens:
+            scores[doc_id] = scores.get(doc_id, 0.0) + LANGUAGE_TAG_BONUS
+    return scores
+
+
+def top_k(index, query, k):
+    """Returns up to k (doc_id, score) pairs, best first."""
+    scores = score(index, query)
+    return heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))
@@ -0,0 +1,127 @@
+"""
+Report Render Queue Module
+Handles: rendering PDF and Word portfolio reports off the request path.
+
+Renders run in a small process pool (ReportLab and python-docx are CPU
+bound, so threads would contend on the GIL). Jobs are de-duplicated by
+(user, format, fingerprint): a download that arrives while the same
+report is already rendering waits for that job instead of starting
+another. Workers only write the report blob; the result is recorded in
+the user's store from this process, together with render time and size.
+
+Workers are started by a fork server (spawned where that isn't available),
+never forked from the web worker: it runs outbox, metrics and pre-warm
+threads, and a fork can inherit their locks held. If a queued render
+fails, times out or the pool breaks, the download renders inline instead.
+"""
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from metrics import CACHE_REQUESTS
+from github_export import (projects_fingerprint, find_report, render_report, render_report_buffer,
+                           persist_report, record_report)
+
+RENDER_WORKERS = int(os.getenv("REPORT_RENDER_WORKERS", "2"))
+# How long a download waits for a render before giving up
+RENDER_TIMEOUT = float(os.getenv("REPORT_RENDER_TIMEOUT", "120"))
+
+_executor = None
+_executor_pid = None
+_pending = {}
+_lock = threading.Lock()
+
+
+def _get_executor():
+    """Lazily create the pool, once per process (gunicorn workers fork after import)."""
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        # Fresh interpreters don't inherit the cwd change of a test or CLI, so pin it
+        _executor = ProcessPoolExecutor(max_workers=RENDER_WORKERS, mp_context=multiprocessing.get_context(method),
+                                        initializer=os.chdir, initargs=(os.getcwd(),))
+        _executor_pid = os.getpid()
+    return _executor
+
+
+def _reset_executor():
+    """Drop a broken pool; the next render starts a new one."""
+    global _executor
+    with _lock:
+        broken, _executor = _executor, None
+    if broken is not None:
+        broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _submit(user_id, fmt, projects, profile_url, fingerprint):
+    """Queue one render unless an identical one is already pending. Caller holds _lock."""
+    key = (user_id, fmt, fingerprint)
+    future = _pending.get(key)
+    if future is not None:
+        return future
+
+    future = _get_executor().submit(render_report, user_id, fmt, projects, profile_url)
+
+    def _done(f):
+        with _lock:
+            _pending.pop(key, None)
+        try:
+            path, render_seconds, size_bytes = f.result()
+            record_report(user_id, fmt, fingerprint, path, render_seconds, size_bytes)
+        except Exception as e:
+            print(f"Error rendering {fmt} report for {user_id}: {e}")
+
+    _pending[key] = future
+    future.add_done_callback(_done)
+    return future
+
+
+def submit_reports(user_id, projects, profile_url, formats=("pdf", "docx")):
+    """Render any stale report formats in the background, in parallel. Returns the futures started."""
+    fingerprint = projects_fingerprint(projects, profile_url)
+    futures = {}
+    try:
+        with _lock:
+            for fmt in formats:
+                if not find_report(user_id, fmt, fingerprint):
+                    futures[fmt] = _submit(user_id, fmt, projects, profile_url, fingerprint)
+    except BrokenProcessPool as e:
+        # Downloads render the rest inline; the next sync gets a new pool
+        print(f"Report pool failed: {e}")
+        _reset_executor()
+    return futures
+
+
+def request_report(user_id, fmt, projects, profile_url, timeout=None):
+    """
+    Returns (source, fingerprint) for a download. `source` is the cached
+    file's path when fresh or when a background render for it finishes;
+    otherwise the report is rendered here into a spooled buffer, persisted
+    once, and the rewound buffer is returned to stream without re-reading.
+    """
+    fingerprint = projects_fingerprint(projects, profile_url)
+    path = find_report(user_id, fmt, fingerprint)
+    CACHE_REQUESTS.inc(cache="report", result="hit" if path else "miss")
+    if path:
+        return path, fingerprint
+
+    with _lock:
+        future = _pending.get((user_id, fmt, fingerprint))
+    if future is not None:
+        try:
+            path, _, _ = future.result(timeout=timeout or RENDER_TIMEOUT)
+            return path, fingerprint
+        except TimeoutError:
+            print(f"Queued {fmt} report for {user_id} timed out, rendering it here")
+        except BrokenProcessPool as e:
+            print(f"Report pool failed ({e}), rendering {fmt} report for {user_id} here")
+            _reset_executor()
+        except Exception as e:
+            print(f"Queued {fmt} report for {user_id} failed ({e}), rendering it here")
+
+    buffer, render_seconds, size_bytes = render_report_buffer(user_id, fmt, projects, profile_url)
+    path = persist_report(user_id, buffer)
+    record_report(user_id, fmt, fingerprint, path, render_seconds, size_bytes)
+    return buffer, fingerprint
@@ -1,9 +1,9 @@
 import os
 import json
-from groq import Groq
-from dotenv import load_dotenv
 
-load_dotenv()
+from utils import get_groq_client
+from tracing import span, token_usage
+from metrics import record_llm_call
 
 
 def find_best_resume(job_description: str, resumes: dict) -> dict:
@@ -48,15 +48,22 @@ def find_best_resume(job_description: str, resumes: dict) -> dict:
     """
     
     try:
-        client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            response_format={ "type": "json_object" }
-        )
+        client = get_groq_client()
+        with span("llm.find_best_resume", model="llama-3.3-70b-versatile", resumes=len(resumes)) as s:
+            try:
+                response = client.chat.completions.create(
+                    model="llama-3.3-70b-versatile",
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    response_format={ "type": "json_object" }
+                )
+            except Exception:
+                record_llm_call("llama-3.3-70b-versatile", "find_best_resume", error=True)
+                raise
+            record_llm_call("llama-3.3-70b-versatile", "find_best_resume", response)
+            s.set(**token_usage(response))
         
         content = response.choices[0].message.content
         
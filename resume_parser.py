@@ -1,6 +1,7 @@
-import PyPDF2
 from io import BytesIO
 
+from tracing import span
+
 def extract_text_from_pdf(uploaded_file) -> str:
     """
     Extracts text from a PDF file.
@@ -18,10 +19,13 @@ def extract_text_from_pdf(uploaded_file) -> str:
         else:
             file_stream = uploaded_file
 
-        pdf_reader = PyPDF2.PdfReader(file_stream)
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() or ""
+        import PyPDF2
+        with span("pdf.extract", bytes=len(uploaded_file) if isinstance(uploaded_file, bytes) else None) as s:
+            pdf_reader = PyPDF2.PdfReader(file_stream)
+            text = ""
+            for page in pdf_reader.pages:
+                text += page.extract_text() or ""
+            s.set(pages=len(pdf_reader.pages), chars=len(text))
         return text
     except Exception as e:
         print(f"Error parsing PDF: {e}")
@@ -0,0 +1,218 @@
+"""
+Session Store Module
+Handles: keeping Flask session data on the server in SQLite, so the
+session cookie only carries a signed, opaque session id.
+
+Drafts (subject, body, projects) and GitHub settings used to travel in the
+signed cookie on every request. They now live in a `sessions` table next
+to the outbox; a row is only rewritten when its contents change or its
+expiry needs extending, and expired rows are purged periodically.
+
+A new session the app marks `provisional` (it only holds an id the app
+generated) is neither stored nor sent as a cookie until something is
+written to it, so crawlers, health probes and metric scrapes cost no rows.
+"""
+import os
+import time
+import hashlib
+import secrets
+import sqlite3
+from contextlib import contextmanager
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin, SecureCookieSessionInterface
+from itsdangerous import Signer, BadSignature
+from werkzeug.datastructures import CallbackDict
+
+from user_store import get_data_root
+
+# Extend a permanent session's expiry at most this often (avoids a write per request)
+REFRESH_INTERVAL = 24 * 3600
+# Purge expired sessions at most this often per process
+CLEANUP_INTERVAL = 3600
+# Static files and metric scrapes never touch the session, so they skip the database lookup
+SESSIONLESS_PREFIXES = ("/assets/", "/static/", "/metrics")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    sid TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_expiry ON sessions (expires_at);
+"""
+
+_schema_ready = set()
+_serializer = TaggedJSONSerializer()
+
+
+def get_session_store_path():
+    """Returns the path of the session database, in the data root shared with the user stores."""
+    data_dir = get_data_root()
+    os.makedirs(data_dir, exist_ok=True)
+    return os.path.join(data_dir, "sessions.sqlite3")
+
+
+def _connect():
+    path = get_session_store_path()
+    conn = sqlite3.connect(path, timeout=10)
+    if os.path.abspath(path) not in _schema_ready:
+        # WAL needs shared memory, which the SMB share behind /home/data (Azure) can't provide
+        conn.execute("PRAGMA journal_mode=DELETE" if os.getenv('WEBSITE_SITE_NAME') else "PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        _schema_ready.add(os.path.abspath(path))
+    return conn
+
+
+@contextmanager
+def _db():
+    """Connection that commits on success and is always closed."""
+    conn = _connect()
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session dict that remembers its id and the digest of what was loaded."""
+
+    def __init__(self, initial=None, sid=None, digest=None, expires_at=0.0, new=False):
+        def on_update(self):
+            self.modified = True
+            self.provisional = False
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.digest = digest
+        self.expires_at = expires_at
+        self.new = new
+        self.modified = False
+        self.provisional = False
+
+
+def _digest(payload):
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SQLiteSessionInterface(SessionInterface):
+    """Flask session interface storing session data in SQLite, keyed by a signed random id."""
+
+    session_class = ServerSideSession
+
+    def __init__(self):
+        self._last_cleanup = 0.0
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt="server-side-session")
+
+    def _lifetime(self, app, session):
+        if session.permanent:
+            return app.permanent_session_lifetime.total_seconds()
+        return 24 * 3600
+
+    def _import_cookie_session(self, app, value):
+        """Reads a legacy signed-cookie session so existing users keep their user id."""
+        serializer = SecureCookieSessionInterface().get_signing_serializer(app)
+        if serializer is None:
+            return None
+        try:
+            return serializer.loads(value, max_age=int(app.permanent_session_lifetime.total_seconds()))
+        except BadSignature:
+            return None
+
+    def open_session(self, app, request):
+        if request.path.startswith(SESSIONLESS_PREFIXES):
+            return None
+        value = request.cookies.get(self.get_cookie_name(app))
+        if not value or not app.secret_key:
+            return self.session_class(sid=secrets.token_urlsafe(32), new=True)
+
+        try:
+            sid = self._signer(app).unsign(value).decode("ascii")
+        except BadSignature:
+            legacy = self._import_cookie_session(app, value)
+            session = self.session_class(legacy, sid=secrets.token_urlsafe(32), new=True)
+            session.modified = bool(legacy)
+            return session
+
+        try:
+            with _db() as conn:
+                row = conn.execute("SELECT data, expires_at FROM sessions WHERE sid = ?", (sid,)).fetchone()
+        except sqlite3.Error as e:
+            print(f"Error loading session: {e}")
+            row = None
+        if row is None or row[1] < time.time():
+            return self.session_class(sid=secrets.token_urlsafe(32), new=True)
+        try:
+            data = _serializer.loads(row[0])
+        except Exception:
+            data = {}
+        return self.session_class(data, sid=sid, digest=_digest(row[0]), expires_at=row[1])
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if not session.new:
+                with _db() as conn:
+                    conn.execute("DELETE FROM sessions WHERE sid = ?", (session.sid,))
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        if session.new and session.provisional:
+            return
+
+        now = time.time()
+        lifetime = self._lifetime(app, session)
+        payload = _serializer.dumps(dict(session))
+        digest = _digest(payload)
+        changed = digest != session.digest
+        refresh = session.new or session.expires_at - now < lifetime - min(REFRESH_INTERVAL, lifetime / 2)
+
+        if changed or refresh:
+            expires_at = now + lifetime
+            try:
+                with _db() as conn:
+                    conn.execute(
+                        "INSERT INTO sessions (sid, data, expires_at, updated_at) VALUES (?, ?, ?, ?)"
+                        " ON CONFLICT(sid) DO UPDATE SET data = excluded.data,"
+                        " expires_at = excluded.expires_at, updated_at = excluded.updated_at",
+                        (session.sid, payload, expires_at, now))
+            except sqlite3.Error as e:
+                print(f"Error saving session: {e}")
+                return
+            self._cleanup(now)
+
+        # The cookie only changes for new sessions and when the expiry is extended
+        if session.new or refresh:
+            response.set_cookie(
+                name,
+                self._signer(app).sign(session.sid.encode("ascii")).decode("ascii"),
+                max_age=int(lifetime) if session.permanent else None,
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app),
+            )
+        response.vary.add("Cookie")
+
+    def _cleanup(self, now):
+        if now - self._last_cleanup < CLEANUP_INTERVAL:
+            return
+        self._last_cleanup = now
+        purge_expired_sessions(now)
+
+
+def purge_expired_sessions(now=None):
+    """Delete expired sessions. Returns the number removed."""
+    try:
+        with _db() as conn:
+            cur = conn.execute("DELETE FROM sessions WHERE expires_at < ?", (now or time.time(),))
+            return cur.rowcount
+    except sqlite3.Error as e:
+        print(f"Error purging sessions: {e}")
+        return 0
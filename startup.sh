@@ -1,2 +1,3 @@
 #!/bin/bash
-gunicorn --bind=0.0.0.0 --timeout 600 app:app
+# Worker class, counts and timeout come from gunicorn.conf.py (see README)
+gunicorn --config gunicorn.conf.py --bind=0.0.0.0 app:app
@@ -124,6 +124,49 @@ document.addEventListener('DOMContentLoaded', function () {
     });
 });
 
+// ---------- Outbox Delivery Status ----------
+const OUTBOX_BADGES = {
+    queued: ['badge-amber', 'Queued'],
+    sending: ['badge-cyan', 'Sending…'],
+    sent: ['badge-green', 'Sent'],
+    failed: ['badge-purple', 'Failed']
+};
+
+async function refreshOutbox() {
+    const container = document.getElementById('outboxStatus');
+    if (!container) return;
+    try {
+        const resp = await fetch('/api/outbox');
+        const data = await resp.json();
+        const jobs = (data.jobs || []).slice(0, 5);
+        if (jobs.length === 0) return;
+
+        document.getElementById('outboxCard').style.display = '';
+        container.innerHTML = '';
+        jobs.forEach(job => {
+            const [cls, label] = OUTBOX_BADGES[job.status] || ['badge-purple', job.status];
+            const row = document.createElement('div');
+            row.className = 'flex-between mb-sm';
+            const title = document.createElement('span');
+            title.textContent = `${job.job_title || 'Job Application'} → ${job.recipient}`;
+            const badge = document.createElement('span');
+            badge.className = `badge ${cls}`;
+            badge.textContent = label;
+            if (job.error) badge.title = job.error;
+            row.append(title, badge);
+            container.appendChild(row);
+        });
+
+        if (jobs.some(j => j.status === 'queued' || j.status === 'sending')) {
+            setTimeout(refreshOutbox, 3000);
+        }
+    } catch (e) {
+        console.warn('Outbox status failed:', e);
+    }
+}
+
+document.addEventListener('DOMContentLoaded', refreshOutbox);
+
 // ---------- Loading Overlay ----------
 function showLoading(message) {
     const overlay = document.getElementById('loadingOverlay');
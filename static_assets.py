@@ -0,0 +1,153 @@
+"""
+Static Assets Module
+Handles: fingerprinted URLs for files under static/, served with immutable
+cache headers and precompressed gzip (and brotli, if installed) variants.
+
+Templates call `asset_url('css/style.css')`, which returns
+`/assets/css/style.<hash>.css`. The hash changes whenever the file does, so
+browsers can cache the URL for a year without revalidating. Each file is
+read and compressed once per process (again only if its mtime or size
+changes); `<file>.gz` / `<file>.br` siblings on disk are used as-is when
+they are newer than the file.
+
+Third-party libraries (jQuery, DataTables) stay on their CDNs, pinned to a
+version in the templates.
+"""
+import os
+import re
+import gzip
+import hashlib
+import mimetypes
+import threading
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    brotli = None
+    HAS_BROTLI = False
+
+URL_PREFIX = "/assets"
+HASH_LENGTH = 12
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Files smaller than this aren't worth compressing
+MIN_COMPRESS_SIZE = 1024
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+_FINGERPRINTED = re.compile(r"^(?P<stem>.+)\.(?P<hash>[0-9a-f]{%d})(?P<ext>\.[^./]+)$" % HASH_LENGTH)
+
+_assets = {}
+_lock = threading.Lock()
+
+
+def _fingerprinted_name(filename, digest):
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}.{digest[:HASH_LENGTH]}{ext}"
+
+
+def _read_variant(path, suffix, mtime):
+    """Precompressed sibling (`style.css.gz`) if it is at least as new as the file."""
+    try:
+        st = os.stat(path + suffix)
+        if st.st_mtime >= mtime:
+            with open(path + suffix, "rb") as f:
+                return f.read()
+    except OSError:
+        pass
+    return None
+
+
+def _build(path, filename, st):
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    variants = {"identity": data}
+
+    if len(data) >= MIN_COMPRESS_SIZE and mimetype.startswith(COMPRESSIBLE_TYPES):
+        gz = _read_variant(path, ".gz", st.st_mtime) or gzip.compress(data, compresslevel=9, mtime=0)
+        br = _read_variant(path, ".br", st.st_mtime)
+        if br is None and HAS_BROTLI:
+            br = brotli.compress(data, quality=11)
+        for encoding, body in (("gzip", gz), ("br", br)):
+            if body is not None and len(body) < len(data):
+                variants[encoding] = body
+
+    return {
+        "mtime": st.st_mtime,
+        "size": st.st_size,
+        "hash": digest[:HASH_LENGTH],
+        "url_name": _fingerprinted_name(filename, digest),
+        "mimetype": mimetype,
+        "variants": variants,
+    }
+
+
+def get_asset(static_folder, filename):
+    """Returns the cached asset record for a file under static/, or None if it doesn't exist."""
+    from werkzeug.security import safe_join
+    path = safe_join(static_folder, filename)
+    if path is None:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+
+    key = (static_folder, filename)
+    asset = _assets.get(key)
+    if asset and asset["mtime"] == st.st_mtime and asset["size"] == st.st_size:
+        return asset
+    try:
+        asset = _build(path, filename, st)
+    except OSError as e:
+        print(f"Error reading static asset {filename}: {e}")
+        return None
+    with _lock:
+        _assets[key] = asset
+    return asset
+
+
+def _choose_encoding(asset, accept_encodings):
+    for encoding in ("br", "gzip"):
+        if encoding in asset["variants"] and accept_encodings.quality(encoding) > 0:
+            return encoding
+    return "identity"
+
+
+def init_app(app):
+    """Serve /assets/ and add asset_url() to templates."""
+    from flask import request, url_for, abort, Response
+
+    def asset_url(filename):
+        asset = get_asset(app.static_folder, filename)
+        if asset is None:
+            return url_for("static", filename=filename)
+        return f"{URL_PREFIX}/{asset['url_name']}"
+
+    app.jinja_env.globals.update(asset_url=asset_url)
+
+    @app.route(f"{URL_PREFIX}/<path:filename>")
+    def assets(filename):
+        match = _FINGERPRINTED.match(filename)
+        requested_hash = None
+        if match:
+            requested_hash = match.group("hash")
+            filename = match.group("stem") + match.group("ext")
+        asset = get_asset(app.static_folder, filename)
+        if asset is None:
+            abort(404)
+
+        encoding = _choose_encoding(asset, request.accept_encodings)
+        response = Response(asset["variants"][encoding], mimetype=asset["mimetype"])
+        if encoding != "identity":
+            response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        response.set_etag(f"{asset['hash']}-{encoding}")
+        # A stale or missing hash (old page after a deploy, relative url() in CSS) still
+        # gets the current file, but must not be cached as if it were immutable
+        if requested_hash == asset["hash"]:
+            response.headers["Cache-Control"] = IMMUTABLE
+        else:
+            response.headers["Cache-Control"] = "no-cache"
+        return response.make_conditional(request)
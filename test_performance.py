@@ -1,46 +1,1125 @@
 import os
 import time
 import json
-from github_export import get_github_data_dir
+import tempfile
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+
+_UNSET = object()
+
+@contextmanager
+def temp_cwd():
+    """Runs the block in a new temporary directory (the default data root), then restores the working directory."""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            yield tmp
+        finally:
+            os.chdir(cwd)
+
+@contextmanager
+def patched(target, **values):
+    """
+    Sets attributes of `target` (or keys, for a mapping such as os.environ)
+    for the block and restores them after. A key set to None is removed.
+    """
+    is_mapping = isinstance(target, MutableMapping)
+
+    def assign(name, value):
+        if not is_mapping:
+            setattr(target, name, value)
+        elif value is None or value is _UNSET:
+            target.pop(name, None)
+        else:
+            target[name] = value
+
+    originals = {name: target.get(name, _UNSET) if is_mapping else getattr(target, name) for name in values}
+    for name, value in values.items():
+        assign(name, value)
+    try:
+        yield target
+    finally:
+        for name, value in originals.items():
+            assign(name, value)
 
 def test_resume_performance():
     print("--- Testing Resume Cache Performance ---")
-    user_id = "test_user_p1"
-    resumes_dir = "resumes/" + user_id
-    os.makedirs(resumes_dir, exist_ok=True)
-    
-    # Create a dummy PDF if none exists (using a simple text file renamed for testing if needed, 
-    # but the real app uses extract_text_from_pdf which might fail on fake PDFs. 
-    # Assuming there's already a resume in the real resumes dir we can use for a manual test if this script is run there)
-    
-    # For now, let's just mock the logic to see the cache hit
-    cache_path = os.path.join(get_github_data_dir(user_id), "resume_cache.json")
-    if os.path.exists(cache_path): os.remove(cache_path)
-    
-    # First pass (Simulated)
-    start = time.time()
-    # Mocking extraction
-    text = "Detailed resume content..."
-    mtime = 123456789.0
-    resume_cache = {"resume1.pdf": {"text": text, "mtime": mtime}}
-    with open(cache_path, "w") as f: json.dump(resume_cache, f)
-    print(f"First pass (mocked save): {time.time() - start:.4f}s")
-    
-    # Second pass (Simulated hit)
-    start = time.time()
-    with open(cache_path, "r") as f: cached = json.load(f)
-    if "resume1.pdf" in cached and cached["resume1.pdf"]["mtime"] == mtime:
-        _ = cached["resume1.pdf"]["text"]
-    print(f"Second pass (mocked hit): {time.time() - start:.4f}s")
+    import io
+    from reportlab.pdfgen import canvas
+    import user_store
+    from resume_parser import extract_text_from_pdf
+
+    def make_pdf(lines):
+        buffer = io.BytesIO()
+        pdf = canvas.Canvas(buffer)
+        for i, line in enumerate(lines):
+            pdf.drawString(72, 760 - 14 * i, line)
+        pdf.save()
+        return buffer.getvalue()
+
+    with temp_cwd():
+        user_id = "test_user_p1"
+        sha256 = user_store.save_resume(user_id, "resume1.pdf", make_pdf(["Python developer"] * 40))
+        assert user_store.get_resume_texts(user_id)["resume1.pdf"]["has_text"] is None
+
+        # First pass: extract from the PDF blob and store the text with this version
+        start = time.time()
+        with open(user_store.blob_path(user_id, sha256), "rb") as f:
+            text = extract_text_from_pdf(f.read())
+        user_store.set_resume_text(user_id, "resume1.pdf", sha256, text)
+        print(f"First pass (extract + save): {time.time() - start:.4f}s")
+
+        # Second pass: the stored text is served without touching the PDF
+        start = time.time()
+        entry = user_store.get_resume_texts(user_id)["resume1.pdf"]
+        print(f"Second pass (stored hit): {time.time() - start:.4f}s")
+        assert entry["has_text"] and entry["text"] == text and "Python developer" in text
+
+        # Uploading a new version drops the old text
+        user_store.save_resume(user_id, "resume1.pdf", make_pdf(["Go developer"]))
+        assert user_store.get_resume_texts(user_id)["resume1.pdf"]["text"] is None
 
 def test_github_ranking():
     print("\n--- Testing GitHub Ranking Optimization ---")
+    import github_scraper
     from github_project_agent import get_github_projects
-    
-    # This might make real API calls if we provide a real URL, 
-    # but we can see the logic in the code.
-    print("Ranking logic is now decoupled from README fetching. READMEs are only fetched for top candidates.")
+
+    # Ranking only reads the synced projects: nothing is fetched from GitHub at request time
+    def no_fetch(*args, **kwargs):
+        raise AssertionError("ranking must not fetch from GitHub")
+
+    cached = [{"name": "shop-api", "description": "Django REST API", "language": "Python", "summary": ""},
+              {"name": "dashboard", "description": "React admin dashboard", "language": "TypeScript", "summary": ""}]
+    with patched(github_scraper, fetch_projects=no_fetch, sync_projects=no_fetch):
+        assert get_github_projects("https://github.com/test", None, top_n=1, cached_data=cached) == cached[:1]
+        ranked = get_github_projects("https://github.com/test", "React frontend developer", top_n=1,
+                                     cached_data=cached)
+        assert [p["name"] for p in ranked] == ["dashboard"]
+        assert get_github_projects("https://github.com/test", "React", cached_data=None) == []
+
+def test_bm25_ranking():
+    print("\n--- Testing BM25 Project Ranking ---")
+    from github_project_agent import get_github_projects
+    from project_index import build_index, index_matches
+
+    projects = [
+        {"name": "good-notes", "description": "A good note taking app", "language": "JavaScript", "summary": ""},
+        {"name": "api-server", "description": "REST API server", "language": "Go", "summary": "Fast HTTP service written in Go."},
+        {"name": "ml-lab", "description": "Experiments", "language": "Python", "summary": "Machine learning notebooks."},
+    ]
+    index = build_index(projects)
+
+    start = time.time()
+    ranked = get_github_projects("", "Backend engineer, Go required", top_n=2, cached_data=projects, index=index)
+    print(f"Ranked {len(projects)} projects in {time.time() - start:.6f}s")
+
+    # "go" must not match "good" by substring
+    assert ranked[0]["name"] == "api-server"
+    assert len(ranked) == 2
+
+    # A re-summarized project makes the stored index stale even though the names are unchanged
+    assert index_matches(index, projects)
+    resummarized = [dict(projects[0], summary="Go microservice with gRPC.")] + projects[1:]
+    assert not index_matches(index, resummarized)
+
+def test_feature_ranking():
+    print("\n--- Testing Precomputed Feature Ranking ---")
+    from project_features import HAS_NUMPY, save_project_features, load_project_features
+    from github_project_agent import get_github_projects
+    if not HAS_NUMPY:
+        print("numpy not installed, skipping")
+        return
+
+    projects = [
+        {"name": f"repo-{i}", "description": f"Project number {i}", "language": lang, "topics": topics, "summary": ""}
+        for i, (lang, topics) in enumerate([("Python", ["flask", "llm"]), ("Go", ["grpc"]), ("Python", ["pandas"])] * 100)
+    ]
+    with tempfile.TemporaryDirectory() as data_dir:
+        save_project_features(data_dir, projects, "https://github.com/test")
+        features = load_project_features(data_dir)
+        query = "Python developer with Flask and LLM experience"
+
+        start = time.time()
+        top = features.top_projects(query, top_n=3)
+        print(f"Ranked {features.doc_count} projects in {time.time() - start:.6f}s")
+
+        expected = get_github_projects("", query, top_n=3, cached_data=projects)
+        assert [p["name"] for p in top] == [p["name"] for p in expected]
+        assert top[0]["topics"] == ["flask", "llm"]
+
+        # Both paths score alike, language bonus included
+        from project_index import build_index, score
+        index = build_index(projects)
+        for query in ("Go engineer for gRPC services", "Python developer", "pandas"):
+            bm25 = score(index, query)
+            assert all(abs(bm25.get(i, 0.0) - s) < 0.01 for i, s in enumerate(features.scores(query)))
+
+def test_graphql_fetch_backend():
+    print("\n--- Testing GraphQL Bulk Fetch (local stub) ---")
+    import threading
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from github_scraper import fetch_projects
+
+    repos = [
+        {"name": f"repo-{i}", "url": f"https://github.com/test/repo-{i}", "description": f"Repo {i}",
+         "pushedAt": "2024-01-01T00:00:00Z", "primaryLanguage": {"name": "Python"},
+         "repositoryTopics": {"nodes": [{"topic": {"name": "ai"}}]},
+         "readme0": {"text": f"# Repo {i}"} if i % 2 == 0 else None,
+         "readme1": None, "readme3": {"text": f"Repo {i} rst"} if i % 2 else None}
+        for i in range(150)
+    ]
+    calls = []
+
+    class GraphQLStub(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            calls.append(body["variables"])
+            start = int(body["variables"]["cursor"] or 0)
+            page = repos[start:start + 100]
+            has_next = start + 100 < len(repos)
+            data = {"data": {"user": {"repositories": {
+                "pageInfo": {"hasNextPage": has_next, "endCursor": str(start + 100) if has_next else None},
+                "nodes": page}}}}
+            payload = json.dumps(data).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), GraphQLStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with patched(os.environ, GITHUB_GRAPHQL_URL=f"http://127.0.0.1:{server.server_port}/graphql",
+                     GITHUB_TOKEN="stub-token"):
+            start = time.time()
+            projects = fetch_projects("test", backend="graphql")
+            print(f"Fetched {len(projects)} repos in {len(calls)} round trips ({time.time() - start:.4f}s)")
+    finally:
+        server.shutdown()
+
+    assert len(projects) == 150 and len(calls) == 2
+    assert projects[0]["readme"] == "# Repo 0" and projects[1]["readme"] == "Repo 1 rst"
+    assert projects[0]["topics"] == ["ai"] and projects[0]["pushed_at"] == "2024-01-01T00:00:00Z"
+
+def test_rate_limited_sync_resumes():
+    print("\n--- Testing Rate-Limit-Aware Sync (local stub) ---")
+    import threading
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    import github_client
+    import github_scraper
+    from github_client import GitHubClient
+    from github_scraper import sync_projects
+
+    repos = [{"name": f"repo-{i}", "html_url": f"https://github.com/test/repo-{i}", "description": f"Repo {i}",
+              "language": "Python", "pushed_at": "2024-01-01T00:00:00Z"} for i in range(5)]
+    state = {"budget": 4, "readmes": [], "llm_down": {"repo-0"}}
+
+    def summarize(name, readme, description, language):
+        if name in state["llm_down"]:
+            return f"{name}: {description}{github_scraper.SUMMARY_FAILED}", False
+        return f"{name} summary", True
+
+    class RestStub(BaseHTTPRequestHandler):
+        def do_GET(self):
+            reset = str(int(time.time()) + 3600)
+            if state["budget"] <= 0:
+                payload = b'{"message": "API rate limit exceeded"}'
+                self.send_response(403)
+            else:
+                state["budget"] -= 1
+                if self.path.startswith("/users/"):
+                    payload = json.dumps(repos).encode()
+                else:
+                    state["readmes"].append(self.path.split("/")[3])
+                    payload = b"# README"
+                self.send_response(200)
+            self.send_header("X-RateLimit-Remaining", str(state["budget"]))
+            self.send_header("X-RateLimit-Reset", reset)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), RestStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with patched(os.environ, GITHUB_API_URL=f"http://127.0.0.1:{server.server_port}",
+                     GITHUB_FETCH_BACKEND="rest"), patched(github_scraper, summarize_readme=summarize):
+            github_client._limits.clear()
+            first = sync_projects("test", client=GitHubClient(max_wait=0, pace_threshold=0))
+            print(f"First sync: {first['requests']} requests, incomplete={first['incomplete']}")
+            assert first["incomplete"] == ["repo-3", "repo-4"] and first["resume_at"]
+            assert first["projects"][0]["summary_ok"] is False
+
+            # Window resets: the next sync only fetches what was left incomplete or failed to summarize
+            github_client._limits.clear()
+            state["budget"], state["readmes"], state["llm_down"] = 60, [], set()
+            second = sync_projects("test", first["projects"], first["incomplete"], client=GitHubClient(max_wait=0, pace_threshold=0))
+            print(f"Second sync: {second['requests']} requests, incomplete={second['incomplete']}")
+            assert second["incomplete"] == [] and state["readmes"] == ["repo-0", "repo-3", "repo-4"]
+            assert second["projects"][0]["summary"] == "repo-0 summary" and "summary_ok" not in second["projects"][0]
+    finally:
+        server.shutdown()
+        github_client._limits.clear()
+
+def test_report_fingerprint_cache():
+    print("\n--- Testing Fingerprinted Report Cache ---")
+    import github_export
+    import user_store
+
+    user_id = "test_user_reports"
+    builds = []
+
+    def fake_report(user_id, projects, profile_url, output=None):
+        builds.append(len(projects))
+        output.write(b"%PDF" + json.dumps(projects).encode())
+        return output
+
+    with temp_cwd(), patched(github_export.REPORT_FORMATS, pdf=fake_report):
+        projects = [{"name": "a", "summary": "first"}]
+        path1, fp1 = github_export.get_report(user_id, "pdf", projects, "https://github.com/test")
+        start = time.time()
+        _, fp2 = github_export.get_report(user_id, "pdf", projects, "https://github.com/test")
+        print(f"Cache hit served in {time.time() - start:.6f}s")
+        assert fp1 == fp2 and len(builds) == 1
+
+        projects[0]["summary"] = "changed"
+        _, fp3 = github_export.get_report(user_id, "pdf", projects, "https://github.com/test")
+        assert fp3 != fp1 and len(builds) == 2
+        # Older versions are replaced, never rewritten in place, and removed after the grace period
+        assert os.path.exists(path1)
+        assert user_store.purge_orphan_blobs(user_id, grace=0) == 1 and not os.path.exists(path1)
+        assert len(user_store.list_report_runs(user_id)) == 2
+
+def test_report_queue():
+    print("\n--- Testing Background Report Queue ---")
+    from concurrent.futures import Future
+    from concurrent.futures.process import BrokenProcessPool
+    import github_export
+    import report_queue
+
+    user_id = "test_user_report_queue"
+    projects = [{"name": f"project-{i}", "url": f"https://github.com/test/project-{i}", "summary": "Flask API."}
+                for i in range(5)]
+    builds = []
+
+    def fake_report(user_id, projects, profile_url, output=None):
+        builds.append(len(projects))
+        output.write(b"PK" + json.dumps(projects).encode())
+        return output
+
+    with temp_cwd():
+        try:
+            # A download arriving while the queued render runs waits for it
+            start = time.time()
+            futures = report_queue.submit_reports(user_id, projects, "https://github.com/test", formats=("pdf",))
+            source, _ = report_queue.request_report(user_id, "pdf", projects, "https://github.com/test")
+            print(f"Queued PDF render served in {time.time() - start:.3f}s (incl. pool start)")
+            assert set(futures) == {"pdf"} and isinstance(source, str) and os.path.exists(source)
+
+            # A failed pool or a render that takes too long falls back to rendering inline
+            with patched(github_export.REPORT_FORMATS, docx=fake_report):
+                for pending, extra in ((Future(), 0), (Future(), 1)):
+                    if not extra:
+                        pending.set_exception(BrokenProcessPool("worker died"))
+                    docs = projects[:len(projects) - extra]
+                    fingerprint = github_export.projects_fingerprint(docs, "https://github.com/test")
+                    report_queue._pending[(user_id, "docx", fingerprint)] = pending
+                    source, _ = report_queue.request_report(user_id, "docx", docs, "https://github.com/test",
+                                                            timeout=0.01)
+                    with source:
+                        assert source.read().startswith(b"PK")
+                    assert github_export.find_report(user_id, "docx", fingerprint)
+            assert builds == [5, 4]
+        finally:
+            report_queue._pending.clear()
+            report_queue._reset_executor()
+
+def benchmark_report_rendering(sizes=(10, 100, 500)):
+    """Per-report render time for PDF and Word at several portfolio sizes (run manually)."""
+    print("\n--- Benchmark: Report Rendering ---")
+    import io
+    from github_export import generate_pdf_report, generate_word_report
+
+    summary = "Built a Flask service with Groq LLM integration, caching and PDF parsing. " * 6
+    for n in sizes:
+        projects = [{"name": f"project-{i}", "url": f"https://github.com/test/project-{i}", "summary": summary}
+                    for i in range(n)]
+        for label, generate in (("pdf", generate_pdf_report), ("docx", generate_word_report)):
+            start = time.perf_counter()
+            out = generate("bench", projects, "https://github.com/test", output=io.BytesIO())
+            elapsed = time.perf_counter() - start
+            print(f"{label:>4} {n:>4} projects: {elapsed:.3f}s, {len(out.getvalue()) / 1024:.0f} KB")
+
+def _start_smtp_sink(drop_after=None):
+    """Minimal local SMTP sink (EHLO, AUTH PLAIN, MAIL, RCPT, DATA, NOOP, RSET, QUIT)."""
+    import socketserver
+    import threading
+    stats = {"connections": 0, "messages": 0}
+
+    class SMTPSink(socketserver.StreamRequestHandler):
+        def handle(self):
+            stats["connections"] += 1
+            received = 0
+            self.wfile.write(b"220 sink ESMTP\r\n")
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    return
+                cmd = line[:4].upper()
+                if cmd == b"EHLO":
+                    self.wfile.write(b"250-sink\r\n250-AUTH PLAIN\r\n250 SIZE 10000000\r\n")
+                elif cmd == b"AUTH":
+                    self.wfile.write(b"235 2.7.0 Authentication successful\r\n")
+                elif cmd == b"DATA":
+                    self.wfile.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                    while self.rfile.readline() not in (b".\r\n", b""):
+                        pass
+                    stats["messages"] += 1
+                    received += 1
+                    self.wfile.write(b"250 OK\r\n")
+                    if drop_after and received >= drop_after:
+                        return
+                elif cmd == b"QUIT":
+                    self.wfile.write(b"221 Bye\r\n")
+                    return
+                else:
+                    self.wfile.write(b"250 OK\r\n")
+
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), SMTPSink)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+def test_smtp_connection_pool():
+    print("\n--- Testing Pooled SMTP Sends (local sink) ---")
+    from outlook_sender import SMTPConnectionPool
+
+    server, stats = _start_smtp_sink()
+    port = server.server_address[1]
+    message = "Subject: hi\r\n\r\n" + "x" * 2000
+    try:
+        results = {}
+        for label, pool in (("unpooled", SMTPConnectionPool(max_idle_per_key=0)), ("pooled", SMTPConnectionPool())):
+            before = stats["connections"]
+            start = time.perf_counter()
+            for _ in range(50):
+                pool.send("127.0.0.1", port, "me@example.com", "pw", "me@example.com", ["hr@example.com"], message,
+                          starttls=False)
+            elapsed = time.perf_counter() - start
+            results[label] = stats["connections"] - before
+            print(f"{label:>8}: 50 messages in {elapsed:.3f}s ({50 / elapsed:.0f} msg/s), "
+                  f"{results[label]} connections")
+            pool.close_all()
+        assert results["unpooled"] == 50 and results["pooled"] == 1
+    finally:
+        server.shutdown()
+
+    # Server hangs up after every message: the pool reconnects transparently
+    server, stats = _start_smtp_sink(drop_after=1)
+    pool = SMTPConnectionPool(health_check_after=3600)
+    try:
+        for _ in range(3):
+            pool.send("127.0.0.1", server.server_address[1], "me@example.com", "pw", "me@example.com",
+                      ["hr@example.com"], message, starttls=False)
+        assert stats["messages"] == 3 and pool.stats["reconnects"] == 2
+    finally:
+        pool.close_all()
+        server.shutdown()
+
+def test_resume_attachment_cache():
+    print("\n--- Testing Pre-encoded Resume Attachments ---")
+    import outlook_sender
+    from outlook_sender import get_resume_attachment, build_message_bytes
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "resume.pdf")
+        with open(path, "wb") as f:
+            f.write(os.urandom(300 * 1024))
+
+        start = time.perf_counter()
+        first = get_resume_attachment(path, "resume.pdf")
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(100):
+            part = get_resume_attachment(path, "resume.pdf")
+        warm = (time.perf_counter() - start) / 100
+        print(f"Encode 300 KB resume: {cold * 1000:.2f}ms cold, {warm * 1000:.3f}ms cached")
+        assert part is first
+
+        message = build_message_bytes("me@example.com", "hr@example.com", "Hi", "Body", part)
+        assert b"\r\n" in message and b"\n" not in message.replace(b"\r\n", b"")
+
+        # A rewritten file is re-encoded (its size and mtime changed)
+        with open(path, "wb") as f:
+            f.write(b"%PDF new")
+        assert get_resume_attachment(path, "resume.pdf") is not first
+
+        # Known files are bounded like the encodings
+        for i in range(outlook_sender.ATTACHMENT_FILES_SIZE + 10):
+            other = os.path.join(tmp, f"copy-{i}.pdf")
+            with open(other, "wb") as f:
+                f.write(b"%PDF new")
+            get_resume_attachment(other, "resume.pdf")
+        assert len(outlook_sender._attachment_files) == outlook_sender.ATTACHMENT_FILES_SIZE
+
+def test_outbox_delivery():
+    print("\n--- Testing Outbox Delivery ---")
+    import outbox
+    import user_store
+
+    calls = []
+
+    def flaky_send(to_email, subject, body, attachment_bytes, attachment_name, sender_email, sender_password, service,
+                   attachment_part=None):
+        calls.append(to_email)
+        if len(calls) == 1:
+            return False, "SMTP Error: temporary failure"
+        return True, "Email sent successfully!"
+
+    with temp_cwd(), patched(outbox, send_smtp_email=flaky_send, RETRY_DELAYS=[0, 0]), \
+            patched(outbox.PROVIDER_LIMITS, gmail={"per_minute": 6000, "per_day": 500}):
+        with open("resume.pdf", "wb") as f:
+            f.write(b"%PDF")
+        start = time.time()
+        job_id = outbox.enqueue("user-1", "hr@example.com", "Hi", "Body", "resume.pdf", "resume.pdf",
+                                "Engineer", "gmail", "me@gmail.com", "app-password")
+        print(f"Enqueued in {time.time() - start:.4f}s")
+
+        deadline = time.time() + 10
+        while outbox.get_job("user-1", job_id)["status"] != "sent" and time.time() < deadline:
+            time.sleep(0.05)
+        job = outbox.get_job("user-1", job_id)
+        assert job["status"] == "sent" and job["attempts"] == 2
+        # The tracker row is updated right after the job is marked sent
+        while time.time() < deadline:
+            statuses = [row["Status"] for row in user_store.list_applications("user-1")]
+            if statuses == ["Sent"]:
+                break
+            time.sleep(0.05)
+        assert statuses == ["Sent"]
+
+        # Spacing comes from the outbox table, so another worker process sees this send too
+        outbox.PROVIDER_LIMITS["gmail"] = {"per_minute": 1, "per_day": 500}
+        with outbox._db() as conn:
+            row = conn.execute("SELECT * FROM outbox WHERE id = ?", (job_id,)).fetchone()
+            assert 55 < outbox._throttle_delay(conn, row) <= 60
+
+        # If the tracker row can't be written, nothing is queued
+        with patched(outbox, save_application=lambda *args, **kwargs: False):
+            assert outbox.enqueue("user-1", "hr@example.com", "Hi", "Body", "resume.pdf", "resume.pdf",
+                                  "Engineer", "gmail", "me@gmail.com", "app-password") is None
+        assert [j["id"] for j in outbox.list_jobs("user-1")] == [job_id]
+
+        # A job queued by an earlier process with this same PID (worker restarted) is orphaned
+        with outbox._db() as conn:
+            conn.execute("UPDATE outbox SET status = 'queued', owner = ? WHERE id = ?",
+                         (f"{os.getpid()}-earlier", job_id))
+        job = outbox.get_job("user-1", job_id)
+        assert job["status"] == "failed" and "restart" in job["error"]
+
+def test_server_side_sessions():
+    print("\n--- Testing Server-Side Session Store ---")
+    from datetime import timedelta
+    from flask import Flask, session, request
+    from flask.sessions import SecureCookieSessionInterface
+    import session_store
+
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=365)
+    app.session_interface = session_store.SQLiteSessionInterface()
+
+    @app.route('/draft')
+    def draft():
+        session.permanent = True
+        session['email_data'] = {"body": "x" * 20000, "github_projects": [{"summary": "y" * 5000}] * 5}
+        return "ok"
+
+    @app.route('/read')
+    def read():
+        session.permanent = True
+        return str(len(session['email_data']['body']))
+
+    @app.route('/visit')
+    def visit():
+        session['user_id'] = "generated"
+        session.provisional = session.new
+        if request.args.get('write'):
+            session['github_profile'] = "https://github.com/test"
+        return "ok"
+
+    with temp_cwd():
+        client = app.test_client()
+        resp = client.get('/draft')
+        cookie = resp.headers['Set-Cookie'].split(';')[0]
+        print(f"Cookie for a 45 KB draft: {len(cookie)} bytes")
+        assert len(cookie) < 200
+
+        with session_store._db() as conn:
+            written = conn.execute("SELECT updated_at FROM sessions").fetchone()[0]
+        resp = client.get('/read')
+        assert resp.data == b"20000" and 'Set-Cookie' not in resp.headers
+        with session_store._db() as conn:
+            assert conn.execute("SELECT updated_at FROM sessions").fetchone()[0] == written
+
+        # A legacy signed-cookie session is carried over
+        legacy = SecureCookieSessionInterface().get_signing_serializer(app).dumps({"user_id": "abc"})
+        legacy_client = app.test_client()
+        legacy_client.set_cookie(app.config['SESSION_COOKIE_NAME'], legacy)
+        with legacy_client.session_transaction() as sess:
+            assert sess['user_id'] == "abc"
+
+        # Visitors that only got a generated id (probes, crawlers) cost no rows or cookies
+        def rows():
+            with session_store._db() as conn:
+                return conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        before = rows()
+        for _ in range(3):
+            resp = app.test_client().get('/visit')
+            assert 'Set-Cookie' not in resp.headers
+        assert rows() == before
+        assert 'Set-Cookie' in app.test_client().get('/visit?write=1').headers and rows() == before + 1
+
+        assert session_store.purge_expired_sessions(time.time() + 400 * 86400) >= 1
+
+def test_user_store():
+    print("\n--- Testing Per-User Store ---")
+    import pandas as pd
+    import user_store
+
+    with temp_cwd() as tmp:
+        # Previous layout: resumes dir, resume text cache, tracker workbook
+        os.makedirs("resumes/user-1")
+        os.makedirs("github_cache/user-1")
+        with open("resumes/user-1/old.pdf", "wb") as f:
+            f.write(b"%PDF old")
+        mtime = os.path.getmtime("resumes/user-1/old.pdf")
+        with open("github_cache/user-1/resume_cache.json", "w") as f:
+            json.dump({"old.pdf": {"text": "Old resume", "mtime": mtime}}, f)
+        pd.DataFrame({"Date Applied": ["2024-01-01 10:00:00"], "Job Title": ["Engineer"],
+                      "Email Address": ["hr@example.com"], "Status": ["Sent"]}).to_excel(
+            "user-1_job_application_tracker.xlsx", index=False)
+
+        resumes = user_store.get_resume_texts("user-1")
+        assert resumes["old.pdf"]["text"] == "Old resume"
+        assert user_store.list_applications("user-1")[0]["Job Title"] == "Engineer"
+        assert user_store.get_store_path("user-1").startswith(os.path.join(tmp, "data", "users"))
+
+        # Identical uploads share one blob; re-uploading the same content keeps the text
+        for i in range(20):
+            user_store.save_resume("user-1", f"resume_{i}.pdf", b"%PDF same")
+        user_store.save_resume("user-1", "old.pdf", b"%PDF old")
+        start = time.perf_counter()
+        for _ in range(1000):
+            names = user_store.list_resumes("user-1")
+        print(f"List 21 resumes: {(time.perf_counter() - start):.6f}s for 1000 lookups")
+        assert len(names) == 21 and user_store.get_resume_texts("user-1")["old.pdf"]["has_text"]
+        assert len(os.listdir(os.path.dirname(os.path.dirname(user_store.get_resume_path("user-1", "old.pdf"))))) == 2
+
+        # A deleted resume's blob outlives the grace period only if still referenced
+        old_blob = user_store.get_resume_path("user-1", "old.pdf")
+        assert user_store.delete_resume("user-1", "old.pdf") and os.path.exists(old_blob)
+        assert user_store.purge_orphan_blobs("user-1", grace=0) == 1 and not os.path.exists(old_blob)
+
+        job = user_store.add_application("user-1", "Data Engineer", "jobs@example.com", status="Queued",
+                                         outbox_id=7)
+        assert job and user_store.update_application_status("user-1", 7, "Sent") == 1
+        stats = user_store.application_stats("user-1")
+        assert stats == {'total_applications': 2, 'today_applications': 1, 'this_week': 1}
+
+        # Duplicate guard: normalized recipient/title/company, rebuilt from the tracker when missing
+        with user_store._db("user-1") as conn:
+            conn.execute("DELETE FROM application_index")
+            conn.execute("DELETE FROM meta WHERE key = 'application_index'")
+        user_store._check_application_index(user_store._connect("user-1"))
+        start = time.perf_counter()
+        for _ in range(1000):
+            found = user_store.find_applications("user-1", " HR@example.com", "Engineer (Remote)", "Acme Inc")
+        print(f"Duplicate check: {(time.perf_counter() - start):.6f}s for 1000 lookups")
+        assert found[0]["Date Applied"] == "2024-01-01 10:00:00"
+        user_store.add_application("user-1", "Sr. Data Engineer", "talent@example.com", company="Acme Corp")
+        assert user_store.find_applications("user-1", "talent@example.com", "Senior Data Engineer", "ACME")
+        assert not user_store.find_applications("user-1", "talent@example.com", "Senior Data Engineer", "Globex")
+
+        # Cache values written as JSON text before the binary format are still read
+        with user_store._db("user-1") as conn:
+            conn.execute("INSERT INTO cache (key, value, updated_at) VALUES ('old', ?, 0)",
+                         (json.dumps({"projects": [{"name": "a"}]}, indent=2),))
+        assert user_store.get_cache("user-1", "old") == {"projects": [{"name": "a"}]}
+        user_store.set_cache("user-1", "old", {"n": 1})
+        assert user_store.get_cache("user-1", "old") == {"n": 1}
+
+def test_jd_analyzer():
+    print("\n--- Testing Local JD Analysis ---")
+    import jd_analyzer
+
+    jd = """Senior Backend Developer (Remote)
+
+About Us
+DataPulse is hiring engineers to build analytics tools for retailers.
+
+Requirements:
+- 5+ years of Python and Django
+- Experience with Postgres, Redis and Docker; k8s is a plus
+
+Benefits:
+- Health insurance
+
+We are an equal opportunity employer.
+Questions: noreply@datapulse.io. Please send your resume to careers@datapulse.io
+"""
+    analysis = jd_analyzer.analyze(jd)
+    assert analysis["emails"] == ["careers@datapulse.io", "noreply@datapulse.io"]
+    assert analysis["title"] == "Senior Backend Developer" and analysis["company"] == "DataPulse"
+    assert analysis["location"] == "Remote"
+    assert analysis["skills"] == ["Python", "Django", "PostgreSQL", "Redis", "Docker"]
+    assert analysis["preferred_skills"] == ["Kubernetes"]
+
+    condensed = jd_analyzer.condense(jd)
+    assert "Health insurance" not in condensed and "equal opportunity" not in condensed and "@" not in condensed
+    print(f"Prompt JD: {len(jd)} -> {len(condensed)} chars")
+
+    resumes = {"frontend.pdf": "React, CSS, HTML", "backend.pdf": "Python, Django, PostgreSQL, Docker, Redis"}
+    assert jd_analyzer.pick_resume_locally(analysis, resumes) == "backend.pdf"
+    assert jd_analyzer.pick_resume_locally(analysis, {"a.pdf": "Python", "b.pdf": "Django"}) is None
+
+    with temp_cwd():
+        start = time.perf_counter()
+        first = jd_analyzer.get_analysis("test_user_jd", jd)
+        miss = time.perf_counter() - start
+        start = time.perf_counter()
+        second = jd_analyzer.get_analysis("test_user_jd", jd.replace("\n", "\n\n  "))
+        hit = time.perf_counter() - start
+        print(f"Analysis: {miss * 1000:.2f}ms first, {hit * 1000:.2f}ms cached")
+        assert first == second == analysis
+
+def test_near_duplicate_postings(postings=1000):
+    print("\n--- Testing Near-Duplicate Postings ---")
+    import random
+    import load_test
+    import near_duplicates
+    import user_store
+    from jd_analyzer import jd_hash
+
+    jd = ("Machine Learning Engineer at DataWorks, Berlin. You will build and deploy PyTorch models for search "
+          "ranking and NLP, own the MLOps pipeline on Kubernetes, and work with product teams on experiments. "
+          "Requirements: 3+ years of Python, deep learning, transformers and SQL. Experience with A/B testing, "
+          "feature stores and model monitoring is a plus. We offer a yearly learning budget, flexible hours and "
+          "a small team that ships weekly. Send your CV to talent@dataworks.example.com")
+    repost = jd.replace("Berlin", "Berlin (Hybrid)").replace("talent@dataworks.example.com", "via our portal") \
+        + " Posted 2 days ago."
+    sig, repost_sig = near_duplicates.signature(jd), near_duplicates.signature(repost)
+    assert near_duplicates.similarity(sig, repost_sig) >= near_duplicates.DUPLICATE_THRESHOLD
+    other = near_duplicates.signature(load_test.JOB_DESCRIPTIONS[1])
+    assert near_duplicates.similarity(sig, other) < 0.5
+
+    rng = random.Random(1)
+    words = " ".join(load_test.JOB_DESCRIPTIONS).split()
+    with temp_cwd():
+        user_id = "test_user_postings"
+        for _ in range(postings):
+            text = " ".join(rng.choice(words) for _ in range(120))
+            near_duplicates.remember(user_id, jd_hash(text), near_duplicates.signature(text))
+        near_duplicates.remember(user_id, jd_hash(jd), sig, draft={"subject": "Application"})
+        assert near_duplicates.find(user_id, other) is None
+
+        start = time.perf_counter()
+        for _ in range(100):
+            match = near_duplicates.find(user_id, repost_sig)
+        lookup = (time.perf_counter() - start) / 100
+        start = time.perf_counter()
+        for _ in range(100):
+            near_duplicates.signature(repost)
+        signing = (time.perf_counter() - start) / 100
+        print(f"{postings} postings: signature {signing * 1000:.3f}ms, lookup {lookup * 1000:.3f}ms")
+        assert match["sha256"] == jd_hash(jd) and match["draft"] == {"subject": "Application"}
+        assert match["applied_at"] is None
+
+        row_id = user_store.add_application(user_id, "ML Engineer", "talent@dataworks.example.com")
+        near_duplicates.mark_applied(user_id, jd_hash(jd), application_id=row_id)
+        assert near_duplicates.find(user_id, repost_sig)["status"] == "Sent"
+
+        # An application already in the tracker (imported, never linked) is found by recipient and role
+        other_jd = load_test.JOB_DESCRIPTIONS[1]
+        near_duplicates.remember(user_id, jd_hash(other_jd), other, draft={
+            "recruiter_email": "jobs@globex.example.com", "job_title": "Data Engineer", "company": "Globex"})
+        assert near_duplicates.find(user_id, other)["applied_at"] is None
+        user_store.add_applications(user_id, [("2024-01-02 10:00:00", "Data Engineer (Remote)",
+                                               "Jobs@Globex.example.com", "Sent", None)])
+        assert near_duplicates.find(user_id, other)["applied_at"] == "2024-01-02 10:00:00"
+
+def test_working_set(projects=500):
+    print("\n--- Testing Working Set Cache ---")
+    import sqlite3
+    import user_store
+    import working_set
+    from github_export import load_projects_cache, save_projects_cache
+
+    repos = [{"name": f"repo-{i}", "description": "Flask API with PostgreSQL and Docker " * 5,
+              "language": "Python", "topics": ["api", "flask"], "readme_summary": "Service " * 60}
+             for i in range(projects)]
+    with temp_cwd():
+        try:
+            working_set.invalidate()
+            user_id = "test_user_working_set"
+            save_projects_cache(user_id, repos, "https://github.com/test")
+            working_set.invalidate()
+
+            start = time.perf_counter()
+            cold = load_projects_cache(user_id)
+            cold_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            for _ in range(100):
+                warm = load_projects_cache(user_id)
+            warm_ms = (time.perf_counter() - start) * 1000 / 100
+            print(f"{projects} projects: cold load {cold_ms:.2f}ms, warm {warm_ms:.3f}ms")
+            assert warm is cold and warm_ms < cold_ms
+
+            # Any write to the user's store makes the next read reload
+            user_store.set_cache(user_id, "projects", dict(cold, project_count=1))
+            assert load_projects_cache(user_id)["project_count"] == 1
+            loads = []
+            working_set.get(user_id, "texts", lambda: loads.append(1) or {})
+            working_set.get(user_id, "texts", lambda: loads.append(1) or {})
+            user_store.save_resume(user_id, "cv.pdf", b"%PDF-1.4 test")
+            working_set.get(user_id, "texts", lambda: loads.append(1) or {})
+            assert len(loads) == 2
+            # Downloading the tracker rewrites its export cache but leaves the working set warm
+            user_store.add_application(user_id, "Engineer", "hr@example.com")
+            user_store.export_applications(user_id)
+            working_set.get(user_id, "texts", lambda: loads.append(1) or {})
+            assert len(loads) == 2
+
+            # Warm hits don't query the store; another process's write is seen once the version TTL passes
+            queries = []
+            data_version = user_store.data_version
+            with patched(user_store, data_version=lambda uid: queries.append(uid) or data_version(uid)), \
+                    patched(working_set, VERSION_TTL=0.2):
+                for _ in range(100):
+                    working_set.get(user_id, "texts", lambda: loads.append(1) or {})
+                assert len(queries) <= 1 and len(loads) == 2
+                with sqlite3.connect(user_store.get_store_path(user_id)) as other_process:
+                    other_process.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1"
+                                          " WHERE key = 'data_version'")
+                time.sleep(0.25)
+                working_set.get(user_id, "texts", lambda: loads.append(1) or {})
+                assert len(loads) == 3
+
+            # Least recently used users go first when over the user or memory cap
+            with patched(working_set, MAX_USERS=2):
+                for uid in ("ws_a", "ws_b", "ws_c"):
+                    working_set.get(uid, "value", lambda: {"x": 1})
+                assert working_set.stats()["users"] == 2
+            with patched(working_set, MAX_BYTES=working_set.estimate_size(cold)):
+                load_projects_cache(user_id)
+                assert working_set.stats()["users"] == 1 and working_set.stats()["bytes"] <= working_set.MAX_BYTES
+        finally:
+            working_set.invalidate()
+
+def test_request_tracing():
+    print("\n--- Testing Request Tracing ---")
+    import json
+    import logging
+    from flask import Flask
+    import tracing
+
+    start = time.perf_counter()
+    for _ in range(100000):
+        with tracing.span("noop", bytes=1) as s:
+            s.set(rows=1)
+    print(f"Disabled span overhead: {(time.perf_counter() - start) / 100000 * 1e9:.0f}ns")
+
+    records = []
+
+    class Capture(logging.Handler):
+        def emit(self, record):
+            records.append(json.loads(record.getMessage()))
+
+    handler = Capture()
+    with patched(tracing, ENABLED=True, SERVER_TIMING=True):
+        tracing.logger.addHandler(handler)
+        try:
+            app = Flask(__name__)
+            tracing.init_app(app)
+
+            @app.route('/work')
+            def work():
+                with tracing.span("cache.load", bytes=2048):
+                    with tracing.span("pdf.extract") as s:
+                        s.set(pages=2)
+                return "ok"
+
+            resp = app.test_client().get('/work')
+            assert "0-pdf.extract;dur=" in resp.headers["Server-Timing"]
+            trace = [r for r in records if r.get("trace") == "work"][0]
+            print(json.dumps(trace))
+            assert [sp["name"] for sp in trace["spans"]] == ["pdf.extract", "cache.load"]
+            assert trace["spans"][0]["parent"] == "cache.load" and trace["spans"][1]["bytes"] == 2048
+            assert trace["status"] == 200 and tracing.current_trace() is None
+        finally:
+            tracing.logger.removeHandler(handler)
+
+def test_static_assets():
+    print("\n--- Testing Fingerprinted Static Assets ---")
+    import re
+    import gzip
+    from app import app
+
+    client = app.test_client()
+    page = client.get('/tracker').get_data(as_text=True)
+    css_url = re.search(r'href="(/assets/css/style\.[0-9a-f]{12}\.css)"', page).group(1)
+    assert re.search(r'src="/assets/js/app\.[0-9a-f]{12}\.js"', page)
+    assert "jquery.dataTables.min" in page
+
+    resp = client.get(css_url, headers={'Accept-Encoding': 'gzip, br'})
+    original = open(os.path.join(app.static_folder, 'css', 'style.css'), 'rb').read()
+    body = resp.get_data()
+    print(f"style.css: {len(original)} bytes, sent {len(body)} bytes ({resp.headers['Content-Encoding']})")
+    assert resp.headers['Cache-Control'] == "public, max-age=31536000, immutable"
+    assert 'Accept-Encoding' in resp.headers['Vary'] and 'Set-Cookie' not in resp.headers
+    if resp.headers['Content-Encoding'] == 'gzip':
+        assert gzip.decompress(body) == original
+
+    plain = client.get(css_url)
+    assert plain.get_data() == original and 'Content-Encoding' not in plain.headers
+    assert client.get(css_url, headers={'If-None-Match': plain.headers['ETag']}).status_code == 304
+
+    # An outdated hash still gets the current file, without the immutable header
+    stale = client.get(re.sub(r'\.[0-9a-f]{12}\.', '.000000000000.', css_url))
+    assert stale.status_code == 200 and stale.headers['Cache-Control'] == "no-cache"
+    assert client.get('/assets/../app.py').status_code == 404
+
+def _metrics_worker(n):
+    import metrics
+    metrics.counter("test_jobs", "Test jobs", ("kind",)).inc(n, kind="render")
+    metrics.histogram("test_job_seconds", "Test job latency").observe(0.2)
+    metrics.gauge("test_queue_depth", "Test queue depth").set(n)
+    metrics.flush()
+
+def test_metrics_across_workers():
+    print("\n--- Testing Metrics Aggregation Across Workers ---")
+    import multiprocessing
+    import metrics
+
+    with tempfile.TemporaryDirectory() as tmp, patched(os.environ, METRICS_DIR=tmp):
+        ctx = multiprocessing.get_context("fork")
+        workers = [ctx.Process(target=_metrics_worker, args=(n,)) for n in (1, 2, 3)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+
+        start = time.perf_counter()
+        text = metrics.render_prometheus()
+        print(f"Rendered /metrics from {len(os.listdir(tmp))} snapshots in {time.perf_counter() - start:.4f}s")
+        # Exited workers still count towards totals; their gauges are dropped
+        assert 'test_jobs_total{kind="render"} 6' in text
+        assert 'test_job_seconds_bucket{le="0.25"} 3' in text and "test_job_seconds_count 3" in text
+        assert "test_queue_depth " not in text
+        assert "# TYPE http_request_duration_seconds histogram" in text
+
+# Heavy libraries that importing the app must not pull in
+DEFERRED_IMPORTS = ("pandas", "groq", "gspread", "oauth2client", "PyPDF2", "numpy", "docx", "reportlab")
+# Cold-start budget for `import app`, measured with -X importtime
+STARTUP_TARGET_MS = 350
+
+def _import_profile(module="app"):
+    """
+    Runs `python -X importtime -c "import <module>"`. Returns {name: (cumulative ms, depth)}
+    and the set of modules loaded afterwards.
+    """
+    import subprocess
+    import sys
+    code = f"import sys, {module}; print(' '.join(sorted(sys.modules)))"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            profile[name.strip()] = (int(cumulative) / 1000, depth)
+    return profile, set(result.stdout.split())
+
+def test_lazy_imports():
+    print("\n--- Testing Lazy Imports ---")
+    profile, loaded = _import_profile("app")
+    print(f"import app: {profile['app'][0]:.0f}ms")
+    eager = [m for m in DEFERRED_IMPORTS if m in loaded]
+    assert not eager, f"imported at start-up: {eager}"
+
+def benchmark_cold_start(runs=5):
+    """Import-time profile of the app; fails if the median start-up exceeds STARTUP_TARGET_MS."""
+    print("\n--- Benchmark: Cold Start (import app) ---")
+    timings = []
+    for _ in range(runs):
+        profile, _ = _import_profile("app")
+        timings.append(profile["app"][0])
+    # Direct imports of app, slowest first
+    top = sorted(((ms, name) for name, (ms, depth) in profile.items() if depth == 1), reverse=True)[:8]
+    for ms, name in top:
+        print(f"  {name:<30} {ms:8.1f}ms")
+    median = sorted(timings)[len(timings) // 2]
+    print(f"import app: median {median:.0f}ms over {runs} runs (target {STARTUP_TARGET_MS}ms)")
+    assert median <= STARTUP_TARGET_MS
+
+def benchmark_worker_classes(users=16, duration=15):
+    """Sync vs threaded gunicorn workers under the load-test stand-ins (see load_test.py)."""
+    print("\n--- Benchmark: Gunicorn Worker Classes ---")
+    import load_test
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report = load_test.main(["--users", str(users), "--duration", str(duration), "--workers", "2",
+                                 "--worker-class", "sync,gthread", "--threads", "8",
+                                 "--output", os.path.join(tmp, "report.json")])
+    runs = {run["worker_class"]: run for run in report["runs"]}
+    assert runs["gthread"]["errors"] == 0
+    assert runs["gthread"]["throughput_rps"] > runs["sync"]["throughput_rps"]
+
+# Audit events counted by benchmark_storage_io (hooks can't be removed, so it's installed once)
+_IO_EVENTS = {"open": "opens", "os.listdir": "listdirs", "os.scandir": "listdirs", "os.mkdir": "mkdirs",
+              "os.rename": "renames", "os.remove": "removes", "sqlite3.connect": "db_connects"}
+_io_counts = None
+
+def _io_snapshot():
+    counts = dict(_io_counts)
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                key, value = line.split(":")
+                if key in ("syscr", "syscw", "rchar", "wchar"):
+                    counts[key] = int(value)
+    except OSError:
+        pass
+    counts["opens"] -= 1  # the /proc/self/io read above
+    return counts
+
+def benchmark_storage_io(rounds=20, repos=30, tracker_rows=200):
+    """File-system work per request on the main pages (audit-hook event counts plus /proc/self/io)."""
+    print("\n--- Benchmark: Storage I/O per Request ---")
+    import sys
+    import load_test
+    global _io_counts
+
+    if _io_counts is None:
+        _io_counts = dict.fromkeys(_IO_EVENTS.values(), 0)
+
+        def hook(event, args):
+            key = _IO_EVENTS.get(event)
+            if key is not None:
+                _io_counts[key] += 1
+        sys.addaudithook(hook)
+
+    jd = load_test.JOB_DESCRIPTIONS[0]
+    routes = [("GET", "/", None), ("GET", "/profile", None), ("GET", "/tracker", None),
+              ("POST", "/generate", {"job_description": jd}),
+              ("GET", "/download_github_pdf", None), ("GET", "/download_tracker", None)]
+    results = {}
+    with temp_cwd() as tmp:
+        user = load_test.seed_users(tmp, 1, repos, tracker_rows)[0]
+        import app as app_module
+        # Storage only: the LLM calls are replaced by constant answers
+        with patched(app_module, find_best_resume=lambda jd, texts: {"best_resume_filename": sorted(texts)[0]},
+                     generate_job_application_email=lambda jd, text, github_projects=None, job_details=None: {
+                         "subject": "Application", "body": "Hello", "job_title": "Engineer"}):
+            client = app_module.app.test_client()
+            client.get(f"/?sync_user_id={user['user_id']}")
+            with client.session_transaction() as sess:
+                sess['github_profile'] = user['profile_url']
+            for method, path, form in routes:
+                client.open(path, method=method, data=form)  # warm caches and reports
+                before = _io_snapshot()
+                for _ in range(rounds):
+                    resp = client.open(path, method=method, data=form)
+                    assert resp.status_code == 200, (path, resp.status_code)
+                after = _io_snapshot()
+                results[f"{method} {path}"] = {k: (after[k] - before[k]) / rounds for k in after}
+
+    columns = ["opens", "listdirs", "mkdirs", "renames", "db_connects", "syscr", "syscw", "rchar", "wchar"]
+    print(f"{'request':<26}" + "".join(f"{c:>12}" for c in columns))
+    for name, row in results.items():
+        print(f"{name:<26}" + "".join(f"{row.get(c, 0):>12.1f}" for c in columns))
+    return results
+
+def benchmark_cache_serialization(repos=(100, 1000, 5000), rounds=5):
+    """Save/load time and size of the projects cache and ranking index per encoding (run manually)."""
+    print("\n--- Benchmark: Cache Serialization ---")
+    import cache_codec
+    from project_index import build_index
+
+    summary = "Built a Flask service with Groq LLM integration, caching and PDF parsing. " * 6
+    codecs = [("json indent=2 (old)", None), ("json compact", cache_codec.JSON)]
+    if cache_codec.HAS_ORJSON:
+        codecs.append(("orjson", cache_codec.ORJSON))
+        if cache_codec.HAS_ZSTD:
+            codecs.append(("orjson + zstd", cache_codec.ORJSON_ZSTD))
+
+    results = {}
+    for n in repos:
+        projects = [{"name": f"project-{i}", "url": f"https://github.com/test/project-{i}",
+                     "description": f"Service number {i}", "language": "Python",
+                     "topics": ["flask", "llm", f"topic-{i % 50}"], "stars": i, "summary": summary}
+                    for i in range(n)]
+        caches = {"projects": {"profile_url": "https://github.com/test", "scraped_at": "2024-01-01 10:00:00",
+                               "project_count": n, "incomplete": [], "projects": projects},
+                  "index": build_index(projects)}
+        for label, codec in codecs:
+            save = load = size = 0
+            for _ in range(rounds):
+                for value in caches.values():
+                    start = time.perf_counter()
+                    data = json.dumps(value, indent=2) if codec is None else cache_codec.encode(value, codec)
+                    save += time.perf_counter() - start
+                    start = time.perf_counter()
+                    decoded = json.loads(data) if codec is None else cache_codec.decode(data)
+                    load += time.perf_counter() - start
+                    size += len(data)
+                    assert decoded == value
+            results[(n, label)] = {"save_ms": save / rounds * 1000, "load_ms": load / rounds * 1000,
+                                   "size_kb": size / rounds / 1024}
+            row = results[(n, label)]
+            print(f"{n:>5} repos  {label:<20} save {row['save_ms']:8.2f} ms  load {row['load_ms']:8.2f} ms"
+                  f"  {row['size_kb']:9.0f} KB")
+
+    if cache_codec.HAS_ORJSON:
+        for n in repos:
+            assert results[(n, "orjson")]["load_ms"] < results[(n, "json indent=2 (old)")]["load_ms"]
+    return results
 
 if __name__ == "__main__":
     test_resume_performance()
     test_github_ranking()
+    test_bm25_ranking()
+    test_feature_ranking()
+    test_graphql_fetch_backend()
+    test_rate_limited_sync_resumes()
+    test_report_fingerprint_cache()
+    test_report_queue()
+    test_smtp_connection_pool()
+    test_resume_attachment_cache()
+    test_outbox_delivery()
+    test_server_side_sessions()
+    test_user_store()
+    test_jd_analyzer()
+    test_near_duplicate_postings()
+    test_working_set()
+    test_request_tracing()
+    test_static_assets()
+    test_metrics_across_workers()
+    test_lazy_imports()
+    benchmark_report_rendering()
+    benchmark_cold_start()
+    benchmark_worker_classes()
+    benchmark_storage_io()
+    benchmark_cache_serialization()
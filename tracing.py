@@ -0,0 +1,209 @@
+"""
+Tracing Module
+Handles: lightweight per-request spans (durations plus sizes such as
+tokens, bytes and rows) logged as one structured JSON line per request,
+optionally exposed in a Server-Timing response header.
+
+Tracing is off unless TRACING_ENABLED=1; when off, span() returns a shared
+no-op object, so instrumented code pays one flag check per call. Set
+TRACING_SERVER_TIMING=1 to also send the span timings to the browser.
+Spans opened outside a request (e.g. the outbox delivery thread) are
+logged on their own.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import functools
+import contextvars
+
+ENABLED = os.getenv("TRACING_ENABLED", "").lower() in ("1", "true", "yes")
+SERVER_TIMING = os.getenv("TRACING_SERVER_TIMING", "").lower() in ("1", "true", "yes")
+
+logger = logging.getLogger("job_sender.trace")
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_current_trace = contextvars.ContextVar("trace", default=None)
+_current_span = contextvars.ContextVar("span", default=None)
+
+
+class _NoopSpan:
+    """Stand-in returned while tracing is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        return self
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """A timed, named unit of work with free-form attributes."""
+
+    __slots__ = ("name", "attrs", "parent", "start", "duration_ms", "error", "_token")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.parent = None
+        self.start = 0.0
+        self.duration_ms = None
+        self.error = None
+        self._token = None
+
+    def set(self, **attrs):
+        """Attach sizes or outcomes (tokens, bytes, rows, status, ...)."""
+        self.attrs.update(attrs)
+        return self
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.parent = parent.name if parent is not None else None
+        self._token = _current_span.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration_ms = (time.perf_counter() - self.start) * 1000
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.spans.append(self)
+        else:
+            _log({"span": self.name, **self.to_dict()})
+        return False
+
+    def to_dict(self):
+        data = {"name": self.name, "ms": round(self.duration_ms or 0.0, 2)}
+        if self.parent:
+            data["parent"] = self.parent
+        if self.error:
+            data["error"] = self.error
+        data.update(self.attrs)
+        return data
+
+
+class Trace:
+    """Collects the spans of one request."""
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.spans = []
+        self.start = time.perf_counter()
+        self._token = None
+
+    def server_timing(self):
+        """Server-Timing header value: one metric per span, plus the total."""
+        parts = []
+        for i, s in enumerate(self.spans):
+            metric = f"{i}-{s.name}".replace(" ", "_").replace(",", "_").replace(";", "_")
+            parts.append(f'{metric};dur={s.duration_ms:.1f}')
+        parts.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.1f}")
+        return ", ".join(parts)
+
+
+def _log(record):
+    try:
+        logger.info(json.dumps(record, default=str))
+    except Exception as e:
+        print(f"Error writing trace: {e}")
+
+
+def span(name, **attrs):
+    """Context manager timing a block: `with span("smtp.send", bytes=n) as s: ... s.set(...)`."""
+    if not ENABLED:
+        return NOOP_SPAN
+    return Span(name, attrs)
+
+
+def traced(name):
+    """Decorator form of span() for whole functions."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+            with Span(name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def token_usage(response):
+    """Token counts of an OpenAI-style chat completion, as span attributes."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return {}
+    return {"prompt_tokens": getattr(usage, "prompt_tokens", None),
+            "completion_tokens": getattr(usage, "completion_tokens", None)}
+
+
+def start_trace(name, **attrs):
+    """Begin collecting spans for the current request. Returns the Trace, or None when disabled."""
+    if not ENABLED:
+        return None
+    trace = Trace(name, attrs)
+    trace._token = _current_trace.set(trace)
+    return trace
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def finish_trace(trace, **attrs):
+    """Log the request's spans as one JSON line and stop collecting."""
+    if trace is None:
+        return
+    record = {
+        "trace": trace.name,
+        "ms": round((time.perf_counter() - trace.start) * 1000, 2),
+        **trace.attrs,
+        **attrs,
+        "spans": [s.to_dict() for s in trace.spans],
+    }
+    try:
+        _current_trace.reset(trace._token)
+    except ValueError:
+        _current_trace.set(None)
+    _log(record)
+
+
+def init_app(app):
+    """Trace every request of a Flask app (no-op unless tracing is enabled)."""
+    if not ENABLED:
+        return
+    from flask import g, request
+
+    @app.before_request
+    def _start_request_trace():
+        g._trace = start_trace(request.endpoint or request.path, method=request.method, path=request.path)
+
+    @app.after_request
+    def _add_server_timing(response):
+        trace = g.get("_trace")
+        if trace is not None and SERVER_TIMING:
+            response.headers["Server-Timing"] = trace.server_timing()
+        if trace is not None:
+            trace.attrs["status"] = response.status_code
+        return response
+
+    @app.teardown_request
+    def _finish_request_trace(exc):
+        trace = g.pop("_trace", None)
+        finish_trace(trace, **({"error": type(exc).__name__} if exc else {}))
@@ -0,0 +1,829 @@
+"""
+User Store Module
+Handles: everything kept per user in one layout: a SQLite database for
+resume metadata and extracted text, GitHub caches, the report manifest and
+the application tracker, plus content-addressed blobs for resume PDFs and
+rendered reports.
+
+Layout under the data root (/home/data on Azure, ./data locally, or DATA_DIR):
+    users/<shard>/<user>/store.sqlite3
+    users/<shard>/<user>/blobs/<sha256[:2]>/<sha256>
+    users/<shard>/<user>/features-<version>/    (memory-mapped ranking arrays)
+
+`<shard>` is the first two hex digits of the user id's hash, so no
+directory holds more than a few hundred entries however many users there
+are. Blobs are immutable and named by their hash: they are written once,
+never rewritten in place, and stay valid for queued emails and in-flight
+downloads; unreferenced blobs are deleted after BLOB_GRACE.
+
+Each thread keeps a few connections open, and a user's directories and
+schema are set up once per process. Data from the previous layout (tracker
+.xlsx, resumes/<user>/, github_cache/<user>/) is imported the first time a
+user's store is opened, or in bulk with `python user_store.py migrate`.
+"""
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import cache_codec
+from tracing import span
+
+# Unreferenced blobs are kept this long (queued emails may still attach an old resume)
+BLOB_GRACE = 7 * 24 * 3600
+# Open connections kept per thread (least recently used are closed first)
+MAX_CONNECTIONS_PER_THREAD = 4
+# Analyzed job descriptions and indexed postings kept per user (oldest are dropped first)
+MAX_JOB_DESCRIPTIONS = 500
+MAX_POSTINGS = 1000
+# Bump when _title_key/_company_key change so the application index is rebuilt
+APPLICATION_INDEX_VERSION = 1
+TRACKER_COLUMNS = ["Date Applied", "Job Title", "Email Address", "Status", "Outbox ID"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS resumes (
+    name TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    uploaded_at REAL NOT NULL,
+    text TEXT,
+    has_text INTEGER
+);
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reports (
+    format TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    built_at TEXT,
+    render_seconds REAL,
+    size_bytes INTEGER
+);
+CREATE TABLE IF NOT EXISTS report_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    format TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    built_at TEXT,
+    render_seconds REAL,
+    size_bytes INTEGER
+);
+CREATE TABLE IF NOT EXISTS applications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date_applied TEXT NOT NULL,
+    job_title TEXT,
+    email_address TEXT,
+    status TEXT NOT NULL,
+    outbox_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS applications_date ON applications (date_applied);
+CREATE INDEX IF NOT EXISTS applications_outbox ON applications (outbox_id);
+CREATE TABLE IF NOT EXISTS application_index (
+    application_id INTEGER PRIMARY KEY,
+    recipient TEXT NOT NULL,
+    title_key TEXT NOT NULL,
+    company_key TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS application_index_lookup ON application_index (recipient, title_key);
+CREATE TABLE IF NOT EXISTS job_descriptions (
+    sha256 TEXT PRIMARY KEY,
+    analysis BLOB NOT NULL,
+    seen_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS job_descriptions_seen ON job_descriptions (seen_at);
+CREATE TABLE IF NOT EXISTS postings (
+    sha256 TEXT PRIMARY KEY,
+    signature BLOB NOT NULL,
+    draft BLOB,
+    application_id INTEGER,
+    seen_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS postings_seen ON postings (seen_at);
+CREATE TABLE IF NOT EXISTS posting_bands (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    PRIMARY KEY (band, bucket, sha256)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS orphan_blobs (
+    sha256 TEXT PRIMARY KEY,
+    since REAL NOT NULL
+);
+"""
+
+_SAFE_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+_schema_ready = set()
+_dirs_ready = set()
+_local = threading.local()
+_local_changes = 0
+_changes_lock = threading.Lock()
+
+
+def get_data_root():
+    """Root of all per-user data (persistent /home/data on Azure)."""
+    root = os.getenv("DATA_DIR")
+    if not root:
+        root = "/home/data" if os.name == 'posix' and os.getenv('WEBSITE_SITE_NAME') else "data"
+    return os.path.abspath(root)
+
+
+def _makedirs_once(path):
+    if path not in _dirs_ready:
+        os.makedirs(path, exist_ok=True)
+        _dirs_ready.add(path)
+    return path
+
+
+def _user_path(user_id):
+    user_id = user_id or "default"
+    digest = hashlib.sha256(user_id.encode("utf-8")).hexdigest()
+    name = user_id if _SAFE_ID.match(user_id) else digest
+    return os.path.join(get_data_root(), "users", digest[:2], name)
+
+
+def user_dir(user_id=None):
+    """The user's directory, `users/<shard>/<user>` (created once per process)."""
+    return _makedirs_once(_user_path(user_id))
+
+
+def get_store_path(user_id=None):
+    return os.path.join(user_dir(user_id), "store.sqlite3")
+
+
+def has_store(user_id=None):
+    """Whether the user has any data (a store, or files in the previous layout), without creating anything."""
+    if os.path.exists(os.path.join(_user_path(user_id), "store.sqlite3")):
+        return True
+    return any(os.path.exists(p) for p in _legacy_paths(user_id or "default").values())
+
+
+# ─── Database ───────────────────────────────────────────────────────
+
+def _connections():
+    """This thread's open connections by path (dropped after a fork; they belong to the parent)."""
+    if getattr(_local, "pid", None) != os.getpid():
+        _local.pid = os.getpid()
+        _local.conns = OrderedDict()
+    return _local.conns
+
+
+def _connect(user_id):
+    path = get_store_path(user_id)
+    conns = _connections()
+    conn = conns.get(path)
+    if conn is not None:
+        conns.move_to_end(path)
+        return conn
+
+    conn = sqlite3.connect(path, timeout=10)
+    conn.row_factory = sqlite3.Row
+    conns[path] = conn
+    while len(conns) > MAX_CONNECTIONS_PER_THREAD:
+        conns.popitem(last=False)[1].close()
+
+    if path not in _schema_ready:
+        # Azure's /home is a network share: no WAL there (its shared-memory index needs a local disk)
+        conn.execute("PRAGMA journal_mode=DELETE" if os.getenv('WEBSITE_SITE_NAME') else "PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        _schema_ready.add(path)
+        _check_application_index(conn)
+        _import_legacy(user_id)
+    return conn
+
+
+@contextmanager
+def _db(user_id):
+    """The thread's connection to the user's store, in a transaction that commits on success."""
+    global _local_changes
+    conn = _connect(user_id)
+    with conn:
+        yield conn
+    if getattr(_local, "data_changed", False):
+        _local.data_changed = False
+        with _changes_lock:
+            _local_changes += 1
+
+
+def _data_changed(conn):
+    """Bump the version in-process copies of resumes and caches are checked against (see working_set)."""
+    conn.execute("INSERT INTO meta (key, value) VALUES ('data_version', '1')"
+                 " ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1")
+    _local.data_changed = True
+
+
+def local_changes():
+    """Counts data_version bumps committed by this process, for a check that needs no query."""
+    return _local_changes
+
+
+def data_version(user_id):
+    """Changes whenever the user's resumes or caches do (in any process)."""
+    with _db(user_id) as conn:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'data_version'").fetchone()
+    return int(row[0]) if row else 0
+
+
+# ─── Blobs ──────────────────────────────────────────────────────────
+
+def blob_path(user_id, sha256):
+    return os.path.join(user_dir(user_id), "blobs", sha256[:2], sha256)
+
+
+def put_blob(user_id, source):
+    """
+    Store bytes or a binary file object (read from its start, then rewound)
+    under its SHA-256. Identical content is stored once. Returns (sha256, size).
+    """
+    blobs_dir = _makedirs_once(os.path.join(user_dir(user_id), "blobs"))
+    tmp_path = os.path.join(blobs_dir, f".tmp-{os.getpid()}-{threading.get_ident()}")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, "wb") as f:
+            if isinstance(source, (bytes, bytearray, memoryview)):
+                digest.update(source)
+                f.write(source)
+                size = len(source)
+            else:
+                source.seek(0)
+                for chunk in iter(lambda: source.read(1024 * 1024), b""):
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+                source.seek(0)
+        sha256 = digest.hexdigest()
+        path = blob_path(user_id, sha256)
+        if not os.path.exists(path):
+            _makedirs_once(os.path.dirname(path))
+            os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return sha256, size
+
+
+def _blob_referenced(conn, sha256):
+    return conn.execute("SELECT 1 FROM resumes WHERE sha256 = ? UNION ALL "
+                        "SELECT 1 FROM reports WHERE sha256 = ? LIMIT 1", (sha256, sha256)).fetchone() is not None
+
+
+def _release_blob(conn, sha256):
+    """Mark a blob for deletion once nothing references it."""
+    if sha256 and not _blob_referenced(conn, sha256):
+        conn.execute("INSERT OR IGNORE INTO orphan_blobs (sha256, since) VALUES (?, ?)", (sha256, time.time()))
+
+
+def purge_orphan_blobs(user_id, grace=BLOB_GRACE):
+    """Delete blobs that have been unreferenced for longer than `grace` seconds. Returns the number removed."""
+    removed = 0
+    with _db(user_id) as conn:
+        rows = conn.execute("SELECT sha256 FROM orphan_blobs WHERE since <= ?", (time.time() - grace,)).fetchall()
+        for row in rows:
+            if not _blob_referenced(conn, row["sha256"]):
+                try:
+                    os.remove(blob_path(user_id, row["sha256"]))
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    print(f"Error removing blob {row['sha256']}: {e}")
+                    continue
+            conn.execute("DELETE FROM orphan_blobs WHERE sha256 = ?", (row["sha256"],))
+    return removed
+
+
+# ─── Resumes ────────────────────────────────────────────────────────
+
+def _resume_entry(row):
+    return {"size": row["size"], "mtime": row["uploaded_at"], "sha256": row["sha256"],
+            "has_text": None if row["has_text"] is None else bool(row["has_text"])}
+
+
+def list_resumes(user_id):
+    """Returns {filename: {size, mtime, sha256, has_text}} for the user's resumes, by name."""
+    with _db(user_id) as conn:
+        rows = conn.execute("SELECT name, sha256, size, uploaded_at, has_text FROM resumes ORDER BY name").fetchall()
+    return {row["name"]: _resume_entry(row) for row in rows}
+
+
+def get_resume_texts(user_id):
+    """Returns {filename: entry} like list_resumes, with the extracted `text` (None if not extracted yet)."""
+    with _db(user_id) as conn:
+        rows = conn.execute("SELECT name, sha256, size, uploaded_at, has_text, text FROM resumes "
+                            "ORDER BY name").fetchall()
+    return {row["name"]: dict(_resume_entry(row), text=row["text"]) for row in rows}
+
+
+def save_resume(user_id, filename, source, uploaded_at=None):
+    """Store an uploaded resume (bytes or file object). Re-uploading identical content keeps its extracted text."""
+    sha256, size = put_blob(user_id, source)
+    with _db(user_id) as conn:
+        previous = conn.execute("SELECT sha256 FROM resumes WHERE name = ?", (filename,)).fetchone()
+        conn.execute(
+            "INSERT INTO resumes (name, sha256, size, uploaded_at) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT(name) DO UPDATE SET sha256 = excluded.sha256, size = excluded.size,"
+            " uploaded_at = excluded.uploaded_at,"
+            " text = CASE WHEN resumes.sha256 = excluded.sha256 THEN resumes.text END,"
+            " has_text = CASE WHEN resumes.sha256 = excluded.sha256 THEN resumes.has_text END",
+            (filename, sha256, size, uploaded_at or time.time()))
+        conn.execute("DELETE FROM orphan_blobs WHERE sha256 = ?", (sha256,))
+        if previous and previous["sha256"] != sha256:
+            _release_blob(conn, previous["sha256"])
+        _data_changed(conn)
+    return sha256
+
+
+def delete_resume(user_id, filename):
+    """Remove a resume. Returns False if it did not exist."""
+    with _db(user_id) as conn:
+        row = conn.execute("SELECT sha256 FROM resumes WHERE name = ?", (filename,)).fetchone()
+        if row is None:
+            return False
+        conn.execute("DELETE FROM resumes WHERE name = ?", (filename,))
+        _release_blob(conn, row["sha256"])
+        _data_changed(conn)
+    purge_orphan_blobs(user_id)
+    return True
+
+
+def get_resume_path(user_id, filename):
+    """Path of the resume's blob, or None."""
+    with _db(user_id) as conn:
+        row = conn.execute("SELECT sha256 FROM resumes WHERE name = ?", (filename,)).fetchone()
+    return blob_path(user_id, row["sha256"]) if row else None
+
+
+def set_resume_text(user_id, filename, sha256, text):
+    """Store the text extracted from one version of a resume (ignored if it was replaced meanwhile)."""
+    with _db(user_id) as conn:
+        conn.execute("UPDATE resumes SET text = ?, has_text = ? WHERE name = ? AND sha256 = ?",
+                     (text or None, 1 if text else 0, filename, sha256))
+        _data_changed(conn)
+
+
+# ─── Caches ─────────────────────────────────────────────────────────
+
+def get_cache(user_id, key):
+    """A cached value, or None (also if it can't be decoded here, e.g. written with a newer format)."""
+    with _db(user_id) as conn:
+        row = conn.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+    if row is None:
+        return None
+    try:
+        return cache_codec.decode(row["value"])
+    except ValueError as e:
+        print(f"Error decoding cache {key!r}: {e}")
+        return None
+
+
+def set_cache(user_id, key, value, bump=True):
+    """
+    Store a JSON-compatible value (encoded with cache_codec). bump=False
+    leaves data_version alone, for keys no in-process copy depends on.
+    """
+    with _db(user_id) as conn:
+        conn.execute("INSERT OR REPLACE INTO cache (key, value, updated_at) VALUES (?, ?, ?)",
+                     (key, cache_codec.encode(value), time.time()))
+        if bump:
+            _data_changed(conn)
+
+
+# ─── Job descriptions ───────────────────────────────────────────────
+
+def get_job_description(user_id, sha256):
+    """The cached analysis of the job description with this hash (see jd_analyzer), or None."""
+    with _db(user_id) as conn:
+        row = conn.execute("SELECT analysis FROM job_descriptions WHERE sha256 = ?", (sha256,)).fetchone()
+    if row is None:
+        return None
+    try:
+        return cache_codec.decode(row["analysis"])
+    except ValueError:
+        return None
+
+
+def save_job_description(user_id, sha256, analysis):
+    with _db(user_id) as conn:
+        conn.execute("INSERT OR REPLACE INTO job_descriptions (sha256, analysis, seen_at) VALUES (?, ?, ?)",
+                     (sha256, cache_codec.encode(analysis), time.time()))
+        conn.execute("DELETE FROM job_descriptions WHERE sha256 IN (SELECT sha256 FROM job_descriptions"
+                     " ORDER BY seen_at DESC LIMIT -1 OFFSET ?)", (MAX_JOB_DESCRIPTIONS,))
+
+
+# ─── Posting index (see near_duplicates) ───────────────────────────
+
+def find_postings(user_id, buckets):
+    """[(sha256, signature)] of the postings sharing at least one (band, bucket) with `buckets`."""
+    where = " OR ".join(["(band = ? AND bucket = ?)"] * len(buckets))
+    params = [v for pair in buckets for v in pair]
+    with _db(user_id) as conn:
+        return [(row[0], row[1]) for row in conn.execute(
+            f"SELECT sha256, signature FROM postings WHERE sha256 IN "
+            f"(SELECT sha256 FROM posting_bands WHERE {where})", params)]
+
+
+def get_posting(user_id, sha256):
+    """{sha256, seen_at, draft, applied_at, status} of an indexed posting, or None."""
+    with _db(user_id) as conn:
+        row = conn.execute("SELECT p.sha256, p.seen_at, p.draft, a.date_applied, a.status FROM postings p"
+                           " LEFT JOIN applications a ON a.id = p.application_id WHERE p.sha256 = ?",
+                           (sha256,)).fetchone()
+    if row is None:
+        return None
+    try:
+        draft = cache_codec.decode(row["draft"]) if row["draft"] is not None else None
+    except ValueError:
+        draft = None
+    return {"sha256": row["sha256"], "seen_at": row["seen_at"], "draft": draft,
+            "applied_at": row["date_applied"], "status": row["status"]}
+
+
+def save_posting(user_id, sha256, signature, buckets, draft=None):
+    """Index a posting's signature under its LSH buckets. A posting seen again keeps its application link."""
+    with _db(user_id) as conn:
+        conn.execute("INSERT INTO postings (sha256, signature, draft, seen_at) VALUES (?, ?, ?, ?)"
+                     " ON CONFLICT(sha256) DO UPDATE SET signature = excluded.signature,"
+                     " draft = COALESCE(excluded.draft, postings.draft), seen_at = excluded.seen_at",
+                     (sha256, signature, cache_codec.encode(draft) if draft is not None else None, time.time()))
+        conn.execute("DELETE FROM posting_bands WHERE sha256 = ?", (sha256,))
+        conn.executemany("INSERT OR IGNORE INTO posting_bands (band, bucket, sha256) VALUES (?, ?, ?)",
+                         [(band, bucket, sha256) for band, bucket in buckets])
+        pruned = conn.execute("DELETE FROM postings WHERE sha256 IN (SELECT sha256 FROM postings"
+                              " ORDER BY seen_at DESC LIMIT -1 OFFSET ?)", (MAX_POSTINGS,)).rowcount
+        if pruned:
+            conn.execute("DELETE FROM posting_bands WHERE sha256 NOT IN (SELECT sha256 FROM postings)")
+
+
+def link_posting(user_id, sha256, application_id=None, outbox_id=None):
+    """Record the tracker row of the application sent for a posting (given directly or by its outbox job)."""
+    with _db(user_id) as conn:
+        if application_id is None and outbox_id is not None:
+            row = conn.execute("SELECT MAX(id) FROM applications WHERE outbox_id = ?", (outbox_id,)).fetchone()
+            application_id = row[0]
+        if application_id is not None:
+            conn.execute("UPDATE postings SET application_id = ? WHERE sha256 = ?", (application_id, sha256))
+
+
+def link_posting_to_tracker(user_id, sha256, email_address, job_title, company=None):
+    """
+    Link a posting that has no application yet to the newest matching one in
+    the tracker (same recipient and role, see find_applications): rows
+    imported from old trackers, or sent before the posting was indexed.
+    Returns whether a link was made.
+    """
+    with _db(user_id) as conn:
+        rows = _matching_applications(conn, email_address, job_title, company)
+        if not rows:
+            return False
+        return conn.execute("UPDATE postings SET application_id = ? WHERE sha256 = ? AND application_id IS NULL",
+                            (rows[0][0], sha256)).rowcount > 0
+
+
+# ─── Reports ────────────────────────────────────────────────────────
+
+def find_report(user_id, fmt, fingerprint):
+    """Blob path of the `fmt` report if it was built from `fingerprint`, else None."""
+    with _db(user_id) as conn:
+        row = conn.execute("SELECT sha256 FROM reports WHERE format = ? AND fingerprint = ?",
+                           (fmt, fingerprint)).fetchone()
+    if row is None:
+        return None
+    path = blob_path(user_id, row["sha256"])
+    return path if os.path.exists(path) else None
+
+
+def record_report(user_id, fmt, fingerprint, sha256, built_at, render_seconds, size_bytes, history=20):
+    """Point `fmt` at a newly rendered blob and keep the last `history` render runs."""
+    with _db(user_id) as conn:
+        previous = conn.execute("SELECT sha256 FROM reports WHERE format = ?", (fmt,)).fetchone()
+        conn.execute("INSERT OR REPLACE INTO reports (format, fingerprint, sha256, built_at, render_seconds,"
+                     " size_bytes) VALUES (?, ?, ?, ?, ?, ?)",
+                     (fmt, fingerprint, sha256, built_at, render_seconds, size_bytes))
+        conn.execute("INSERT INTO report_runs (format, fingerprint, built_at, render_seconds, size_bytes)"
+                     " VALUES (?, ?, ?, ?, ?)", (fmt, fingerprint, built_at, render_seconds, size_bytes))
+        conn.execute("DELETE FROM report_runs WHERE id <= (SELECT MAX(id) FROM report_runs) - ?", (history,))
+        conn.execute("DELETE FROM orphan_blobs WHERE sha256 = ?", (sha256,))
+        if previous and previous["sha256"] != sha256:
+            _release_blob(conn, previous["sha256"])
+    purge_orphan_blobs(user_id)
+
+
+def list_report_runs(user_id):
+    with _db(user_id) as conn:
+        return [dict(row) for row in conn.execute(
+            "SELECT format, fingerprint, built_at, render_seconds, size_bytes FROM report_runs ORDER BY id")]
+
+
+# ─── Application tracker ────────────────────────────────────────────
+
+def _tracker_changed(conn):
+    conn.execute("INSERT INTO meta (key, value) VALUES ('tracker_version', '1')"
+                 " ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1")
+
+
+def add_application(user_id, job_title, email_address, status="Sent", outbox_id=None, date_applied=None,
+                    company=None):
+    """Append one application. Returns its row id."""
+    date_applied = date_applied or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with _db(user_id) as conn:
+        cur = conn.execute("INSERT INTO applications (date_applied, job_title, email_address, status, outbox_id)"
+                           " VALUES (?, ?, ?, ?, ?)", (date_applied, job_title, email_address, status, outbox_id))
+        _index_application(conn, cur.lastrowid, email_address, job_title, company)
+        _tracker_changed(conn)
+        return cur.lastrowid
+
+
+def add_applications(user_id, rows):
+    """Append many applications at once: rows of (date_applied, job_title, email_address, status, outbox_id)."""
+    with _db(user_id) as conn:
+        for row in rows:
+            cur = conn.execute("INSERT INTO applications (date_applied, job_title, email_address, status, outbox_id)"
+                               " VALUES (?, ?, ?, ?, ?)", row)
+            _index_application(conn, cur.lastrowid, row[2], row[1])
+        _tracker_changed(conn)
+    return len(rows)
+
+
+def update_application_status(user_id, outbox_id, status):
+    """Set the status of the application(s) queued as `outbox_id`. Returns the number of rows changed."""
+    with _db(user_id) as conn:
+        updated = conn.execute("UPDATE applications SET status = ? WHERE outbox_id = ?", (status, outbox_id)).rowcount
+        if updated:
+            _tracker_changed(conn)
+        return updated
+
+
+# ─── Duplicate-application index ────────────────────────────────────
+
+_KEY_WORD_RE = re.compile(r"[a-z0-9+#]+")
+_TITLE_ABBREVIATIONS = {"sr": "senior", "jr": "junior", "snr": "senior", "mid": "mid", "eng": "engineer",
+                        "engr": "engineer", "dev": "developer", "mgr": "manager", "ml": "machine learning",
+                        "ai": "ai", "swe": "software engineer", "sde": "software engineer"}
+# Dropped from titles: "Senior Engineer (Remote)" and "Senior Engineer" are the same role
+_TITLE_NOISE = {"a", "an", "the", "remote", "hybrid", "onsite", "on", "site", "position", "role", "job",
+                "opening", "vacancy", "m", "f", "d", "w", "x", "fulltime", "full", "time", "parttime", "part",
+                "contract", "permanent"}
+_COMPANY_SUFFIXES = {"inc", "incorporated", "ltd", "limited", "llc", "llp", "plc", "corp", "corporation", "co",
+                     "company", "gmbh", "ag", "sa", "bv", "pvt", "private", "pte", "pty", "the", "group"}
+
+
+def _title_key(job_title):
+    words = []
+    for word in _KEY_WORD_RE.findall((job_title or "").lower()):
+        word = _TITLE_ABBREVIATIONS.get(word, word)
+        if word not in _TITLE_NOISE:
+            words.append(word)
+    return " ".join(words)
+
+
+def _company_key(company):
+    return " ".join(w for w in _KEY_WORD_RE.findall((company or "").lower()) if w not in _COMPANY_SUFFIXES)
+
+
+def _index_application(conn, application_id, email_address, job_title, company=None):
+    recipient = (email_address or "").strip().lower()
+    if recipient:
+        conn.execute("INSERT OR REPLACE INTO application_index (application_id, recipient, title_key, company_key)"
+                     " VALUES (?, ?, ?, ?)", (application_id, recipient, _title_key(job_title), _company_key(company)))
+
+
+def _check_application_index(conn):
+    """Rebuild the index from the tracker when it was built by an older version (or never)."""
+    row = conn.execute("SELECT value FROM meta WHERE key = 'application_index'").fetchone()
+    if row and row[0] == str(APPLICATION_INDEX_VERSION):
+        return
+    with conn:
+        # Rows indexed with a company keep it; tracker rows don't record one
+        companies = dict(conn.execute("SELECT application_id, company_key FROM application_index"))
+        conn.execute("DELETE FROM application_index")
+        for app_id, title, email in conn.execute("SELECT id, job_title, email_address FROM applications").fetchall():
+            recipient = (email or "").strip().lower()
+            if recipient:
+                conn.execute("INSERT INTO application_index (application_id, recipient, title_key, company_key)"
+                             " VALUES (?, ?, ?, ?)", (app_id, recipient, _title_key(title), companies.get(app_id, "")))
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('application_index', ?)",
+                     (str(APPLICATION_INDEX_VERSION),))
+
+
+def find_applications(user_id, email_address, job_title, company=None, statuses=("Sent", "Queued")):
+    """
+    Earlier applications to the same recipient for the same role, newest
+    first, as tracker-keyed dicts. A company only has to match when both
+    sides recorded one (rows imported from old trackers have none).
+    """
+    with _db(user_id) as conn:
+        rows = _matching_applications(conn, email_address, job_title, company, statuses)
+    return [dict(zip(TRACKER_COLUMNS, (r[1], r[2], r[3], r[4], "" if r[5] is None else r[5]))) for r in rows]
+
+
+def _matching_applications(conn, email_address, job_title, company=None, statuses=("Sent", "Queued")):
+    recipient = (email_address or "").strip().lower()
+    if not recipient:
+        return []
+    company_key = _company_key(company)
+    return conn.execute(
+        "SELECT a.id, a.date_applied, a.job_title, a.email_address, a.status, a.outbox_id FROM application_index i"
+        " JOIN applications a ON a.id = i.application_id"
+        " WHERE i.recipient = ? AND i.title_key = ? AND (i.company_key = '' OR ? = '' OR i.company_key = ?)"
+        f" AND a.status IN ({', '.join('?' * len(statuses))}) ORDER BY a.id DESC",
+        (recipient, _title_key(job_title), company_key, company_key, *statuses)).fetchall()
+
+
+def list_applications(user_id):
+    """All applications, oldest first, keyed by the tracker's column names."""
+    with _db(user_id) as conn:
+        rows = conn.execute("SELECT date_applied, job_title, email_address, status, outbox_id "
+                            "FROM applications ORDER BY id").fetchall()
+    return [dict(zip(TRACKER_COLUMNS, (r[0], r[1], r[2], r[3], "" if r[4] is None else r[4]))) for r in rows]
+
+
+def application_stats(user_id):
+    """Counts of all applications, today's, and the last seven days'."""
+    today = datetime.now().date()
+    with _db(user_id) as conn:
+        row = conn.execute(
+            "SELECT COUNT(*), COUNT(CASE WHEN date_applied >= ? THEN 1 END),"
+            " COUNT(CASE WHEN date_applied >= ? THEN 1 END) FROM applications",
+            (today.isoformat(), (today - timedelta(days=7)).isoformat())).fetchone()
+    return {'total_applications': row[0], 'today_applications': row[1], 'this_week': row[2]}
+
+
+def export_applications(user_id):
+    """Path of the tracker as an .xlsx workbook blob, rebuilt only after the tracker changed."""
+    import io
+    import pandas as pd
+    with _db(user_id) as conn:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'tracker_version'").fetchone()
+    version = row["value"] if row else "0"
+    cached = get_cache(user_id, "tracker_export")
+    if cached and cached.get("version") == version and os.path.exists(blob_path(user_id, cached["sha256"])):
+        return blob_path(user_id, cached["sha256"])
+
+    buffer = io.BytesIO()
+    pd.DataFrame(list_applications(user_id), columns=TRACKER_COLUMNS).to_excel(buffer, index=False)
+    sha256, _ = put_blob(user_id, buffer.getvalue())
+    # Not part of the working set: a download must not evict the user's resumes and projects
+    set_cache(user_id, "tracker_export", {"version": version, "sha256": sha256}, bump=False)
+    with _db(user_id) as conn:
+        conn.execute("DELETE FROM orphan_blobs WHERE sha256 = ?", (sha256,))
+        if cached and cached.get("sha256") != sha256:
+            _release_blob(conn, cached["sha256"])
+    return blob_path(user_id, sha256)
+
+
+# ─── Migration from the previous layout ─────────────────────────────
+
+def _legacy_base():
+    return "/home/data" if os.name == 'posix' and os.getenv('WEBSITE_SITE_NAME') else "."
+
+
+def _legacy_paths(user_id):
+    base = _legacy_base()
+    return {
+        "tracker": os.path.join(base, f"{user_id}_job_application_tracker.xlsx"),
+        "resumes": os.path.join(base, "resumes", user_id),
+        "github": os.path.join(base, "github_cache", user_id),
+    }
+
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _legacy_tracker_rows(path):
+    import pandas as pd
+    df = pd.read_excel(path)
+    if "Recipient Email" in df.columns and "Email Address" not in df.columns:
+        df = df.rename(columns={"Recipient Email": "Email Address"})
+    rows = []
+    for record in df.to_dict("records"):
+        def value(col):
+            v = record.get(col)
+            return None if v is None or (isinstance(v, float) and v != v) else v
+        date = value("Date Applied")
+        date = date.strftime("%Y-%m-%d %H:%M:%S") if hasattr(date, "strftime") else str(date or "")
+        outbox_id = value("Outbox ID")
+        rows.append((date, value("Job Title"), value("Email Address"), value("Status") or "Sent",
+                     int(outbox_id) if isinstance(outbox_id, (int, float)) else None))
+    return rows
+
+
+def _import_legacy(user_id):
+    """Import the user's data from the previous layout, once (the first process to open the store claims it)."""
+    paths = _legacy_paths(user_id or "default")
+    if not any(os.path.exists(p) for p in paths.values()):
+        return None
+    with _db(user_id) as conn:
+        claimed = conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('legacy_import', 'started')").rowcount
+    if not claimed:
+        return None
+
+    summary = {"resumes": 0, "resume_texts": 0, "projects": 0, "applications": 0}
+    with span("store.migrate", user=user_id) as s:
+        try:
+            if os.path.isdir(paths["resumes"]):
+                texts = _read_json(os.path.join(paths["github"], "resume_cache.json")) or {}
+                for name in sorted(os.listdir(paths["resumes"])):
+                    path = os.path.join(paths["resumes"], name)
+                    if not name.lower().endswith(".pdf") or not os.path.isfile(path):
+                        continue
+                    mtime = os.path.getmtime(path)
+                    with open(path, "rb") as f:
+                        sha256 = save_resume(user_id, name, f, uploaded_at=mtime)
+                    summary["resumes"] += 1
+                    cached = texts.get(name) or {}
+                    if cached.get("text") and cached.get("mtime") == mtime:
+                        set_resume_text(user_id, name, sha256, cached["text"])
+                        summary["resume_texts"] += 1
+
+            projects = _read_json(os.path.join(paths["github"], "projects.json"))
+            if projects and projects.get("projects") is not None:
+                from github_export import save_projects_cache
+                save_projects_cache(user_id, projects["projects"], projects.get("profile_url", ""),
+                                    incomplete=projects.get("incomplete"), scraped_at=projects.get("scraped_at"))
+                summary["projects"] = len(projects["projects"])
+
+            if os.path.isfile(paths["tracker"]):
+                try:
+                    summary["applications"] = add_applications(user_id, _legacy_tracker_rows(paths["tracker"]))
+                except Exception as e:
+                    print(f"Error importing tracker for {user_id}: {e}")
+        except Exception as e:
+            # Leave the claim open so the next process retries
+            print(f"Error importing previous data for {user_id}: {e}")
+            with _db(user_id) as conn:
+                conn.execute("DELETE FROM meta WHERE key = 'legacy_import'")
+            return None
+        s.set(**summary)
+
+    with _db(user_id) as conn:
+        conn.execute("UPDATE meta SET value = ? WHERE key = 'legacy_import'", (json.dumps(summary),))
+    return summary
+
+
+def _legacy_user_ids():
+    base = _legacy_base()
+    ids = set()
+    for sub in ("resumes", "github_cache"):
+        try:
+            ids.update(n for n in os.listdir(os.path.join(base, sub)) if os.path.isdir(os.path.join(base, sub, n)))
+        except OSError:
+            pass
+    suffix = "_job_application_tracker.xlsx"
+    ids.update(n[:-len(suffix)] for n in os.listdir(base) if n.endswith(suffix) and len(n) > len(suffix))
+    return sorted(ids)
+
+
+def migrate(remove=False):
+    """Import every user found in the previous layout; with `remove`, delete the old files once imported."""
+    users = _legacy_user_ids()
+    print(f"Found {len(users)} user(s) in the previous layout under {os.path.abspath(_legacy_base())}")
+    totals = {}
+    for user_id in users:
+        _connect(user_id)
+        with _db(user_id) as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'legacy_import'").fetchone()
+        try:
+            summary = json.loads(row["value"]) if row else {}
+        except ValueError:
+            summary = {}
+        if not summary:
+            print(f"  {user_id}: import incomplete, old files kept")
+            continue
+        print(f"  {user_id}: " + ", ".join(f"{v} {k}" for k, v in summary.items()) + f" -> {user_dir(user_id)}")
+        for k, v in summary.items():
+            totals[k] = totals.get(k, 0) + v
+        if remove:
+            paths = _legacy_paths(user_id)
+            for path in (paths["resumes"], paths["github"]):
+                shutil.rmtree(path, ignore_errors=True)
+            if os.path.isfile(paths["tracker"]):
+                os.remove(paths["tracker"])
+    print("Imported " + (", ".join(f"{v} {k}" for k, v in totals.items()) or "nothing"))
+    return totals
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["migrate"]:
+        migrate(remove="--remove" in sys.argv[2:])
+    else:
+        print("Usage: python user_store.py migrate [--remove]")
@@ -1,63 +1,48 @@
 import re
-import pandas as pd
 import os
 import urllib.parse
 import json
+import threading
+import importlib.util
 from datetime import datetime
 
-try:
-    import gspread
-    from oauth2client.service_account import ServiceAccountCredentials
-    HAS_GSPREAD = True
-except ImportError:
-    HAS_GSPREAD = False
+import user_store
+from tracing import span
+from metrics import SHEETS_APPENDS, TRACKER_ROWS, TRACKER_UPDATES
 
-def get_tracker_path(user_id=None):
-    """
-    Returns the persistent path for the Excel tracker file.
-    On Azure (Linux), it uses /home/data to persist across deployments.
-    On Local (Windows/Mac), it uses the current directory.
-    """
-    filename = "job_application_tracker.xlsx"
-    if user_id:
-        filename = f"{user_id}_{filename}"
-
-    # Check if running on Azure (Linux environment generally)
-    if os.name == 'posix' and os.getenv('WEBSITE_SITE_NAME'):
-        # Azure App Service specific persistence path
-        data_dir = "/home/data"
-        if not os.path.exists(data_dir):
-            try:
-                os.makedirs(data_dir)
-            except OSError:
-                # Fallback if permission denied
-                return filename
-        return os.path.join(data_dir, filename)
-    
-    # Local development
-    return filename
+# gspread and oauth2client are imported on first use to keep start-up fast
+HAS_GSPREAD = (importlib.util.find_spec("gspread") is not None
+               and importlib.util.find_spec("oauth2client") is not None)
+
+_env_loaded = False
 
-def get_resumes_dir(user_id=None):
+def load_env():
+    """Loads .env into the environment once per process."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+_groq_client = None
+_groq_client_key = None
+_groq_lock = threading.Lock()
+
+def get_groq_client():
     """
-    Returns the persistent directory for storing resumes.
+    Shared Groq client for this process. The client is thread-safe and keeps
+    its HTTP connections alive, so concurrent requests reuse them instead of
+    building a new client (and TLS session) per call.
     """
-    if os.name == 'posix' and os.getenv('WEBSITE_SITE_NAME'):
-        # Azure persistent storage
-        resume_path = "/home/data/resumes"
-    else:
-        # Local storage
-        resume_path = "resumes"
-    
-    if user_id:
-        resume_path = os.path.join(resume_path, user_id)
-        
-    if not os.path.exists(resume_path):
-        try:
-            os.makedirs(resume_path, exist_ok=True)
-        except OSError:
-            pass # Handle permission issues if any
-            
-    return resume_path
+    global _groq_client, _groq_client_key
+    load_env()
+    key = (os.getpid(), os.getenv("GROQ_API_KEY"), os.getenv("GROQ_BASE_URL"))
+    with _groq_lock:
+        if _groq_client is None or _groq_client_key != key:
+            from groq import Groq
+            _groq_client = Groq(api_key=key[1])
+            _groq_client_key = key
+        return _groq_client
 
 def create_gmail_url(to_email, subject, body):
     """
@@ -73,7 +58,7 @@ def create_gmail_url(to_email, subject, body):
 
 def extract_email(text: str) -> str:
     """
-    Extracts the first email address found in the text using regex.
+    Extracts the most likely recruiter email address in the text.
     
     Args:
         text (str): The text to search.
@@ -81,11 +66,9 @@ def extract_email(text: str) -> str:
     Returns:
         str: The extracted email or None if not found.
     """
-    email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-    match = re.search(email_pattern, text)
-    if match:
-        return match.group(0)
-    return None
+    from jd_analyzer import extract_emails
+    emails = extract_emails(text)
+    return emails[0] if emails else None
 
 def save_to_google_sheet(job_title, email_address):
     """
@@ -95,6 +78,9 @@ def save_to_google_sheet(job_title, email_address):
         return False, "Google Sheets support not available (module 'gspread' missing)."
         
     try:
+        import gspread
+        from oauth2client.service_account import ServiceAccountCredentials
+
         # Check for credentials in environment variable
         creds_json = os.getenv("GOOGLE_CREDENTIALS_JSON")
         sheet_name = os.getenv("GOOGLE_SHEET_NAME", "Job Application Tracker")
@@ -122,58 +108,65 @@ def save_to_google_sheet(job_title, email_address):
         # Append row
         date_applied = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         row = [job_title, email_address, date_applied, "Sent"]
-        sheet.append_row(row)
+        with span("sheets.append_row", rows=1):
+            sheet.append_row(row)
+        SHEETS_APPENDS.inc(outcome="ok")
         
         return True, "Saved to Google Sheet successfully."
         
     except Exception as e:
+        SHEETS_APPENDS.inc(outcome="error")
         return False, f"Google Sheet Error: {str(e)}"
 
-def save_to_excel(job_title, email_address, user_id=None):
+def save_application(job_title, email_address, user_id=None, status="Sent", outbox_id=None, company=None):
     """
-    Saves the job application details to an Excel file AND Google Sheets.
-    
+    Records a job application in the user's tracker AND Google Sheets.
+
     Args:
         job_title (str): The title of the job.
         email_address (str): The recruiter's email address.
-        user_id (str): Unique user ID for file isolation.
+        user_id (str): Unique user ID for data isolation.
+        status (str): Delivery status ("Sent", "Queued", "Failed").
+        outbox_id (int): Outbox job that delivers this application, if queued.
+        company (str): The hiring company, if known (used to spot duplicate applications).
+
+    Returns:
+        int: The tracker row id, or False if it could not be saved.
     """
-    # 1. Save to Google Sheets (Cloud Persistence)
-    gs_success, gs_msg = save_to_google_sheet(job_title, email_address)
-    if not gs_success:
-        print(f"Google Sheets Sync Problem: {gs_msg}")
-
-    # 2. Save to Local/Persistent Excel (Backup)
-    file_path = get_tracker_path(user_id)
-    # Ensure recipient is included as requested ("date, title, and recipient")
-    date_applied = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    new_data = {
-        "Date Applied": [date_applied],
-        "Job Title": [job_title],
-        "Email Address": [email_address],
-        "Status": ["Sent"]
-    }
-    
-    df_new = pd.DataFrame(new_data)
-    
+    # 1. Save to Google Sheets (Cloud Persistence) — only once actually sent
+    if status == "Sent":
+        gs_success, gs_msg = save_to_google_sheet(job_title, email_address)
+        if not gs_success:
+            print(f"Google Sheets Sync Problem: {gs_msg}")
+
+    # 2. Save to the user's store (date, title and recipient)
+    try:
+        with span("tracker.append", status=status):
+            row_id = user_store.add_application(user_id, job_title, email_address, status=status,
+                                                outbox_id=outbox_id, company=company)
+        TRACKER_ROWS.inc(status=status)
+        return row_id
+    except Exception as e:
+        print(f"CRITICAL ERROR saving application: {e}")
+        return False
+
+def update_tracker_status(user_id, outbox_id, status, job_title=None, email_address=None):
+    """
+    Updates the Status of the tracker row written for an outbox job.
+    When the job is delivered, the application is also appended to Google Sheets.
+    """
+    if status == "Sent" and job_title is not None:
+        gs_success, gs_msg = save_to_google_sheet(job_title, email_address)
+        if not gs_success:
+            print(f"Google Sheets Sync Problem: {gs_msg}")
+
     try:
-        if os.path.exists(file_path):
-            df_existing = pd.read_excel(file_path)
-            # Ensure columns exist in case of old file versions
-            # If they had "Recipient Email" from my previous bug, we should handle it
-            if "Recipient Email" in df_existing.columns and "Email Address" not in df_existing.columns:
-                df_existing.rename(columns={"Recipient Email": "Email Address"}, inplace=True)
-            
-            for col in new_data.keys():
-                if col not in df_existing.columns:
-                    df_existing[col] = ""
-            df_combined = pd.concat([df_existing, df_new], ignore_index=True)
-            df_combined.to_excel(file_path, index=False)
-        else:
-            df_new.to_excel(file_path, index=False)
-        print(f"Successfully saved to tracker: {file_path}")
-        return True
+        with span("tracker.update_status", status=status) as s:
+            updated = user_store.update_application_status(user_id, outbox_id, status)
+            s.set(rows=updated)
+        if updated:
+            TRACKER_UPDATES.inc(updated, status=status)
+        return bool(updated)
     except Exception as e:
-        print(f"CRITICAL ERROR saving to Excel: {e}")
+        print(f"Error updating tracker status: {e}")
         return False
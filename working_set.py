@@ -0,0 +1,174 @@
+"""
+Working Set Module
+Handles: keeping each active user's working set (resume texts, synced
+projects, ranking index and feature arrays) parsed in memory, so repeated
+generations skip the store and the decode entirely.
+
+Entries are checked against the user's store version (user_store.data_version,
+bumped by every resume or cache write in any process). A hit re-reads that
+version at most every WORKING_SET_VERSION_TTL seconds, or as soon as this
+process wrote to any store (user_store.local_changes). So a worker sees its
+own writes immediately and another worker's within the TTL.
+
+The cache is an LRU over users, capped by WORKING_SET_MAX_USERS and an
+estimated WORKING_SET_MAX_MB. Evictions are counted by reason in /metrics.
+Values are shared between requests and must not be modified.
+
+Visiting the home or profile page pre-warms the user's working set in the
+background (WORKING_SET_PREWARM=0 turns this off).
+"""
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+import user_store
+
+MAX_USERS = int(os.getenv("WORKING_SET_MAX_USERS", "200"))
+MAX_BYTES = int(float(os.getenv("WORKING_SET_MAX_MB", "64")) * 1024 * 1024)
+PREWARM = os.getenv("WORKING_SET_PREWARM", "1") != "0"
+VERSION_TTL = float(os.getenv("WORKING_SET_VERSION_TTL", "1"))
+
+# user_id -> {"version": int, "checked": (monotonic time, local_changes), "values": {key: value}, "bytes": int}
+_sets = OrderedDict()
+_total_bytes = 0
+_lock = threading.Lock()
+_prewarm_pool = None
+_prewarm_pid = None
+_prewarming = set()
+
+
+def estimate_size(value):
+    """Approximate heap size of a JSON-like value. Other objects (e.g. memory-mapped features) count shallowly."""
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def _drop(user_id, reason):
+    global _total_bytes
+    entry = _sets.pop(user_id, None)
+    if entry is not None:
+        _total_bytes -= entry["bytes"]
+        metrics.WORKING_SET_EVICTIONS.inc(reason=reason)
+
+
+def _report():
+    metrics.WORKING_SET_USERS.set(len(_sets))
+    metrics.WORKING_SET_BYTES.set(_total_bytes)
+
+
+def _version(user_id):
+    """(data_version, check) for the user: re-read from the store only when the entry's check is out of date."""
+    checked = (time.monotonic(), user_store.local_changes())
+    with _lock:
+        entry = _sets.get(user_id)
+        if (entry is not None and entry["checked"][1] == checked[1]
+                and checked[0] - entry["checked"][0] < VERSION_TTL):
+            return entry["version"], entry["checked"]
+    version = user_store.data_version(user_id)
+    with _lock:
+        entry = _sets.get(user_id)
+        if entry is not None and entry["version"] == version:
+            entry["checked"] = checked
+    return version, checked
+
+
+def get(user_id, key, loader):
+    """
+    `loader()` for this user, kept in memory until the user's store changes
+    or the entry is evicted. A loader returning None is not cached.
+    """
+    global _total_bytes
+    user_id = user_id or "default"
+    version, checked = _version(user_id)
+    with _lock:
+        entry = _sets.get(user_id)
+        if entry is not None and entry["version"] != version:
+            _drop(user_id, "stale")
+            entry = None
+        if entry is not None and key in entry["values"]:
+            _sets.move_to_end(user_id)
+            metrics.CACHE_REQUESTS.inc(cache="working_set", result="hit")
+            return entry["values"][key]
+    metrics.CACHE_REQUESTS.inc(cache="working_set", result="miss")
+
+    value = loader()
+    if value is None:
+        return None
+    size = estimate_size(value)
+    with _lock:
+        entry = _sets.get(user_id)
+        if entry is not None and entry["version"] != version:
+            # Loaded under an older version than another thread already holds (or vice versa)
+            if entry["version"] > version:
+                return value
+            _drop(user_id, "stale")
+            entry = None
+        if entry is None:
+            entry = _sets[user_id] = {"version": version, "checked": checked, "values": {}, "bytes": 0}
+        if entry["bytes"] + size > MAX_BYTES:
+            # One user's set may not take the whole budget; serve it uncached
+            metrics.WORKING_SET_EVICTIONS.inc(reason="too_large")
+            if not entry["values"]:
+                del _sets[user_id]
+            _report()
+            return value
+        if key not in entry["values"]:
+            entry["values"][key] = value
+            entry["bytes"] += size
+            _total_bytes += size
+        _sets.move_to_end(user_id)
+
+        while len(_sets) > MAX_USERS:
+            _drop(next(iter(_sets)), "users")
+        while _total_bytes > MAX_BYTES and len(_sets) > 1:
+            _drop(next(iter(_sets)), "memory")
+        _report()
+        return entry["values"][key]
+
+
+def invalidate(user_id=None):
+    """Forget one user's working set, or everyone's."""
+    with _lock:
+        for uid in ([user_id or "default"] if user_id is not None else list(_sets)):
+            _drop(uid, "invalidated")
+        _report()
+
+
+def stats():
+    with _lock:
+        return {"users": len(_sets), "bytes": _total_bytes,
+                "keys": sum(len(entry["values"]) for entry in _sets.values())}
+
+
+def prewarm(user_id, loaders):
+    """Run `loader(user_id)` for each loader in the background, once at a time per user."""
+    global _prewarm_pool, _prewarm_pid
+    if not PREWARM or not user_id:
+        return
+    with _lock:
+        if user_id in _prewarming:
+            return
+        _prewarming.add(user_id)
+        # A pool created before a fork has no thread in the child
+        if _prewarm_pool is None or _prewarm_pid != os.getpid():
+            _prewarm_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="working-set")
+            _prewarm_pid = os.getpid()
+
+    def run():
+        try:
+            for loader in loaders:
+                loader(user_id)
+        except Exception as e:
+            print(f"Error pre-warming working set for {user_id}: {e}")
+        finally:
+            with _lock:
+                _prewarming.discard(user_id)
+
+    _prewarm_pool.submit(run)